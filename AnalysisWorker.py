@@ -0,0 +1,125 @@
+import logging
+import queue
+import threading
+import time
+from Metrics import get_metrics
+
+class AnalysisCancelled(Exception):
+    """
+    Analiza została anulowana przez użytkownika.
+    """
+
+class AnalysisAborted(Exception):
+    def __init__(self, title: str, message: str, level: str = "warning"):
+        """
+        Analiza została przerwana z powodu, który należy pokazać użytkownikowi.
+        args:
+            title: str - Tytuł komunikatu
+            message: str - Treść komunikatu
+            level: str - Rodzaj komunikatu ("warning" lub "error")
+        """
+        super().__init__(message)
+        self.title = title
+        self.message = message
+        self.level = level
+
+class AnalysisWorker:
+    def __init__(self, root, stages: list, logger: logging.Logger, on_progress=None, on_done=None, on_error=None, poll_interval_ms: int = 50):
+        """
+        Uruchamia kolejne etapy analizy w wątku w tle i przekazuje ich wyniki do wątku Tk przez root.after.
+        args:
+            root: tk.Tk - Główne okno aplikacji
+            stages: list - Lista etapów [(nazwa, funkcja(context))]; context["check_cancelled"] przerywa etap
+                           po anulowaniu tej analizy
+            logger: logging.Logger - Wspólny logger
+            on_progress: callable(indeks, liczba_etapów, nazwa) - Wywoływane na początku każdego etapu
+            on_done: callable(context) - Wywoływane po zakończeniu wszystkich etapów
+            on_error: callable(wyjątek) - Wywoływane po błędzie w którymś z etapów
+            poll_interval_ms: int - Co ile milisekund sprawdzać kolejkę komunikatów
+        """
+        self.root = root
+        self.stages = stages
+        self.logger = logger
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.poll_interval_ms = poll_interval_ms
+
+        self.context = {"check_cancelled": self.check_cancelled}
+        self._messages = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Uruchamia wątek analizy i cykliczne sprawdzanie komunikatów.
+        """
+        self._thread = threading.Thread(target=self._run, name="AnalysisWorker", daemon=True)
+        self._thread.start()
+        self.root.after(self.poll_interval_ms, self._poll)
+
+    def cancel(self):
+        """
+        Anuluje analizę. Bieżący etap zostanie dokończony, ale jego wynik zostanie pominięty.
+        """
+        if not self._cancel_event.is_set():
+            self.logger.info("Anulowano analizę.")
+            self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def check_cancelled(self):
+        """
+        Przerywa etap, jeśli analiza została anulowana.
+        """
+        if self._cancel_event.is_set():
+            raise AnalysisCancelled()
+
+    def _run(self):
+        total = len(self.stages)
+        try:
+            for index, (name, stage) in enumerate(self.stages):
+                self.check_cancelled()
+                self._messages.put(("progress", (index, total, name)))
+
+                start = time.perf_counter()
+                with get_metrics().span("analysis_stage", stage=name):
+                    stage(self.context)
+                self.logger.info("Etap '%s' zakończono w %.3f s.", name, time.perf_counter() - start)
+
+            self.check_cancelled()
+            self._messages.put(("done", self.context))
+        except AnalysisCancelled:
+            self._messages.put(("cancelled", None))
+        except Exception as e:
+            self._messages.put(("error", e))
+
+    def _poll(self):
+        # Po anulowaniu żadne wyniki nie są już przekazywane do GUI
+        if self._cancel_event.is_set():
+            return
+
+        try:
+            while True:
+                kind, payload = self._messages.get_nowait()
+                if kind == "progress" and self.on_progress:
+                    self.on_progress(*payload)
+                elif kind == "done":
+                    if self.on_done:
+                        self.on_done(payload)
+                    return
+                elif kind == "error":
+                    if self.on_error:
+                        self.on_error(payload)
+                    return
+                elif kind == "cancelled":
+                    return
+        except queue.Empty:
+            pass
+
+        self.root.after(self.poll_interval_ms, self._poll)
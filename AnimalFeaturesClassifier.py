@@ -1,31 +1,53 @@
-import io
+import json
+import time
 import requests
 import sqlite3
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import GridSearchCV
 from sklearn.model_selection import train_test_split
 from sklearn.impute import SimpleImputer
-from sklearn.metrics import classification_report
+from sklearn.metrics import classification_report, accuracy_score, f1_score
+import sklearn
 import joblib
 import logging
 import os
+import threading
+from CompiledForest import CompiledForest
+from ModelBundle import ModelBundle, MANIFEST_NAME, bundle_exists, library_mismatches
+from ForestSearch import ForestSearch
+from AssetStore import get_asset_store
+from Metrics import get_metrics
+
+# Powyżej tej liczby wierszy predict_proba sklearn (Cython) jest szybsze od skompilowanego lasu
+COMPILED_FOREST_MAX_BATCH = 256
+FEATURES_BUNDLE_KIND = "animal_features"
 
 class AnimalFeaturesClassifier:
-    def __init__(self, drive_file_id : str, local_path: str, logger: logging.Logger):
+    def __init__(self, drive_file_id : str, local_path: str, logger: logging.Logger, search_mode: str = "halving"):
         """
         Inicjalizacja klasyfikatora obrazów.
         args:
             drive_file_id: str - Id pliku na Google Drive
             local_path: str - Lokalna ścieżka do zapisu danych
             logger: logging.Logger - Wspólny logger
+            search_mode: str - Tryb wyszukiwania parametrów: "grid" (pełna siatka) lub "halving" (successive halving)
         """
         self.drive_file_id = drive_file_id
         self.path = local_path
+        self.search_mode = search_mode
+        self.bundle_dir = os.path.join(self.path, 'models', 'animal_features')
+        self.bundle = None
         self.model = None
         self.imputer = None
         self.features = None
+        self.classes = None
+        self.compiled_forest = None
+        self.data_sha256 = None
+        self.conn = None
         self.logger = logger
+        self._fast_path_lock = threading.Lock()
+        self._model_lock = threading.Lock()
 
         if not os.path.exists(self.path):
             os.makedirs(self.path)
@@ -33,12 +55,14 @@ class AnimalFeaturesClassifier:
         self.logger.info("Inicjalizacja klasyfikatora cech zwierząt.")
 
         try:
-            self.model = joblib.load(os.path.join(self.path, 'models', 'animal_features_model.joblib'))
-            self.imputer = joblib.load(os.path.join(self.path, 'models', 'animal_features_imputer.joblib'))
-            self.features = joblib.load(os.path.join(self.path, 'models', 'animal_features_features.joblib'))
-            self.logger.info("Model wczytano pomyślnie.")
+            self.load_model()
+            self.logger.info("Model wczytano pomyślnie (wersja %s).", self.bundle.version)
         except FileNotFoundError:
             self.logger.info("Model nie istnieje. Należy go wytrenować.")
+        except ValueError as e:
+            self.logger.error("Zapisany model jest niezgodny: %s. Model zostanie wytrenowany ponownie.", str(e))
+
+        if self.bundle is None:
             try:
                 self.conn = self.load_data_from_drive()
                 self.train_model()
@@ -46,34 +70,57 @@ class AnimalFeaturesClassifier:
                 self.logger.critical("Nie udało się wytrenować modelu: %s", str(e))
                 raise RuntimeError(f"Błąd inicjalizacji: {e}")
 
-    def load_data_from_drive(self):
+    def load_data_from_drive(self, refresh: bool = False):
         """
-        Pobiera bazę danych SQLite z Google Drive.
+        Pobiera bazę danych SQLite ze źródła plików (domyślnie Google Drive). Plik jest pobierany strumieniowo
+        na dysk, do lokalnej pamięci pobranych plików, i otwierany tylko do odczytu z mapowaniem w pamięci (mmap).
+        args:
+            refresh: bool - Czy sprawdzić w źródle (ETag), czy baza się zmieniła
+        return:
+            sqlite3.Connection - Połączenie z bazą (tylko do odczytu)
         """
         try:
-            self.logger.info("Pobieranie bazy danych z Google Drive...")
-            download_url = f"https://drive.google.com/uc?id={self.drive_file_id}&export=download"
-            response = requests.get(download_url, timeout=60)
-            response.raise_for_status()  # Wywołuje wyjątek dla kodów błędów HTTP
+            self.logger.info("Pobieranie bazy danych...")
+            store = get_asset_store(self.path, self.logger)
+            db_path = store.get('animal_db.sqlite', refresh=refresh, source_id=self.drive_file_id)
+            self.data_sha256 = store.manifest['animal_db.sqlite']['sha256']
         except requests.exceptions.Timeout:
             self.logger.error("Przekroczono limit czasu podczas próby połączenia z Google Drive.")
             raise ConnectionError("Przekroczono limit czasu podczas próby połączenia z Google Drive.")
-        except requests.exceptions.RequestException as e:
+        except Exception as e:
             self.logger.error("Wystąpił błąd podczas pobierania danych: %s", str(e))
             raise ConnectionError(f"Błąd pobierania danych: {e}")
 
-        db_bytes = io.BytesIO(response.content)
-        temp_db_path = os.path.join(self.path, 'animal_db.sqlite')
+        # Plik w pamięci pobranych plików nigdy nie jest modyfikowany (nowa wersja to nowy plik), stąd immutable=1
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA mmap_size={os.path.getsize(db_path)}")
 
-        with open(temp_db_path, 'wb') as temp_file:
-            temp_file.write(db_bytes.read()) 
+        self.logger.info("Baza danych otwarta tylko do odczytu: %s", db_path)
+        return conn
 
-        conn = sqlite3.connect(':memory:') 
-        with sqlite3.connect(temp_db_path) as file_conn:
-            file_conn.backup(conn) 
+    def trained_data_sha256(self) -> str:
+        """
+        Zwraca skrót SHA-256 bazy, na której wytrenowano zapisany model (None, jeśli nieznany).
+        """
+        return self.bundle.manifest["data_sha256"] if self.bundle is not None else None
 
-        self.logger.info("Baza danych załadowana do pamięci.")
-        return conn
+    def update_if_data_changed(self) -> bool:
+        """
+        Sprawdza w źródle, czy baza danych się zmieniła (żądanie warunkowe), i trenuje model ponownie
+        tylko wtedy, gdy zmieniła się jej zawartość.
+        return:
+            bool - True, jeśli model został wytrenowany ponownie
+        """
+        conn = self.load_data_from_drive(refresh=True)
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = conn
+        if self.bundle is not None and self.data_sha256 == self.trained_data_sha256():
+            self.logger.info("Baza danych nie zmieniła się - ponowny trening nie jest potrzebny.")
+            return False
+        self.logger.info("Baza danych zmieniła się - trening modelu na nowych danych.")
+        self.train_model()
+        return True
 
     def load_data(self) -> pd.DataFrame:
         """
@@ -100,13 +147,14 @@ class AnimalFeaturesClassifier:
         Trenuje model na danych z bazy SQLite i zapisuje go lokalnie.
         """
         data = self.load_data()
-        self.features = data.columns.drop(['id', 'zwierze'])
+        # Atrybuty są podmieniane dopiero po udanym treningu - wcześniej wczytany model działa do końca
+        features = data.columns.drop(['id', 'zwierze'])
 
-        X = data[self.features]
+        X = data[features]
         y = data['zwierze']
 
-        self.imputer = SimpleImputer(strategy="median") # Uzupełnianie braków medianą
-        X_imputed = self.imputer.fit_transform(X)
+        imputer = SimpleImputer(strategy="median") # Uzupełnianie braków medianą
+        X_imputed = imputer.fit_transform(X)
 
         X_train, X_test, y_train, y_test = train_test_split(X_imputed, y, test_size=0.2, random_state=42)
         
@@ -114,10 +162,10 @@ class AnimalFeaturesClassifier:
             self.logger.critical("Zbiór treningowy jest pusty. Nie można wytrenować modelu.")
             raise ValueError("Zbiór treningowy jest pusty. Sprawdź dane wejściowe.")
         
-        best_model = self.tune_model(X_train, y_train) # Przeprowadzenie Grid Search do znalezienia najlepszych parametrów
+        best_model = self.tune_model(X_train, y_train) # Wyszukiwanie najlepszych parametrów
 
         if not best_model:
-            self.logger.critical("GridSearchCV nie zwrócił modelu. Trening nie powiódł się.")
+            self.logger.critical("Wyszukiwanie parametrów nie zwróciło modelu. Trening nie powiódł się.")
             raise RuntimeError("Trening modelu nie powiódł się.")
         
         y_pred = best_model.predict(X_test)
@@ -125,51 +173,197 @@ class AnimalFeaturesClassifier:
         self.logger.info(classification_report(y_test, y_pred))
 
         self.model = best_model
+        self.imputer = imputer
+        self.features = list(features)
+        self.save_model(metrics={
+            "accuracy": float(accuracy_score(y_test, y_pred)),
+            "f1_macro": float(f1_score(y_test, y_pred, average="macro")),
+            "train_rows": int(X_train.shape[0]),
+            "test_rows": int(X_test.shape[0]),
+        })
+
+    def save_model(self, metrics: dict = None):
+        """
+        Zapisuje model, imputer i listę cech jako jeden pakiet modelu (models/animal_features) i przełącza
+        predykcję na jego tablice mapowane w pamięci.
+        args:
+            metrics: dict - Metryki modelu na zbiorze testowym
+        """
+        arrays = {"imputer_statistics": np.asarray(self.imputer.statistics_, dtype=np.float64)}
+        extra = {}
+        compiled_forest = self._compile_forest()
+        if compiled_forest is not None:
+            arrays.update({f"forest_{name}": array for name, array in compiled_forest.to_arrays().items()})
+            extra["max_depth"] = compiled_forest.max_depth
+
+        model, imputer = self.model, self.imputer
+        bundle = ModelBundle.write(
+            self.bundle_dir, kind=FEATURES_BUNDLE_KIND, classes=list(model.classes_), features=list(self.features),
+            data_sha256=self.data_sha256, metrics=metrics, arrays=arrays,
+            # Nieskompresowany joblib - las sklearn (dla dużych paczek) można wczytać z mmap_mode
+            files={"model.joblib": lambda model_path: joblib.dump({"model": model, "imputer": imputer}, model_path)},
+            libraries={"scikit-learn": sklearn.__version__}, extra=extra,
+        )
+        self._use_bundle(bundle)
+        self.model, self.imputer = model, imputer
+        self.logger.info("Model, imputer i cechy zapisano w pakiecie %s (wersja %s).", self.bundle_dir, bundle.version)
 
+    def load_model(self):
+        """
+        Wczytuje pakiet modelu i sprawdza jego zgodność. Model zapisany w starym formacie (osobne pliki joblib)
+        jest jednorazowo przepisywany do pakietu.
+        """
+        if not bundle_exists(self.bundle_dir) and os.path.exists(os.path.join(self.path, 'models', 'animal_features_model.joblib')):
+            self._convert_legacy_model()
+            return
+        self._use_bundle(ModelBundle.load(self.bundle_dir, kind=FEATURES_BUNDLE_KIND))
+
+    def _convert_legacy_model(self):
         models_path = os.path.join(self.path, 'models')
-        if not os.path.exists(models_path):
-            os.makedirs(models_path)
-        
-        joblib.dump(self.model, os.path.join(models_path, 'animal_features_model.joblib'))
-        joblib.dump(self.imputer, os.path.join(models_path, 'animal_features_imputer.joblib'))
-        joblib.dump(self.features.tolist(), os.path.join(models_path, 'animal_features_features.joblib'))
-        self.logger.info("Model, imputer i cechy zapisano lokalnie.")
+        self.logger.info("Przepisywanie modelu ze starego formatu (joblib) do pakietu %s.", self.bundle_dir)
+        try:
+            self.model = joblib.load(os.path.join(models_path, 'animal_features_model.joblib'))
+            self.imputer = joblib.load(os.path.join(models_path, 'animal_features_imputer.joblib'))
+            self.features = list(joblib.load(os.path.join(models_path, 'animal_features_features.joblib')))
+        except Exception as e:
+            raise ValueError(f"Nie udało się wczytać modelu w starym formacie: {e}")
+
+        data_info_path = os.path.join(models_path, 'animal_features_data.json')
+        if os.path.exists(data_info_path):
+            with open(data_info_path, "r", encoding="utf-8") as data_info_file:
+                self.data_sha256 = json.load(data_info_file).get("sha256")
+        self.save_model()
+
+    def _use_bundle(self, bundle: ModelBundle):
+        """
+        Przygotowuje predykcję z pakietu modelu: szybką ścieżkę bez pandas (mapa nazw cech na indeksy kolumn,
+        mediany z SimpleImputer, wielokrotnie używany wektor wejściowy) i skompilowany las.
+        Las sklearn jest wczytywany dopiero wtedy, gdy jest potrzebny.
+        """
+        features = bundle.features
+        statistics = bundle.array("imputer_statistics")
+        if statistics.shape != (len(features),):
+            raise ValueError(f"Mediany imputera ({statistics.shape[0]}) nie pasują do listy cech ({len(features)}).")
+        # SimpleImputer pomija cechy, które w danych treningowych nie miały żadnej wartości
+        kept = ~np.isnan(statistics)
+        kept_features = [feature for feature, keep in zip(features, kept) if keep]
+        classes = np.asarray(bundle.classes, dtype=object)
+
+        compiled_forest = None
+        if bundle.has_array("forest_value"):
+            compiled_forest = CompiledForest.from_arrays(bundle.arrays("forest_"), classes=classes,
+                                                         max_depth=bundle.manifest["extra"]["max_depth"], n_features=len(kept_features))
+            if compiled_forest.value.shape[1] != len(classes) or compiled_forest.feature.max(initial=0) >= len(kept_features):
+                raise ValueError("Skompilowany las nie pasuje do listy klas lub cech z manifestu.")
+
+        mismatches = library_mismatches(bundle.manifest["libraries"], {"scikit-learn": sklearn.__version__})
+        if mismatches:
+            self.logger.warning("Model zapisano przy innych wersjach bibliotek (%s).", ", ".join(mismatches))
+
+        with self._fast_path_lock, self._model_lock:
+            self.bundle = bundle
+            self.features = list(features)
+            self.classes = classes
+            self.model = None
+            self.imputer = None
+            self._kept = kept
+            self._feature_index = {feature: i for i, feature in enumerate(kept_features)}
+            self._medians = np.array(statistics[kept])
+            self._input_buffer = np.empty((1, len(kept_features)), dtype=np.float64)
+            self.compiled_forest = compiled_forest
+        if compiled_forest is not None:
+            self.logger.info("Wczytano skompilowany las: %d węzłów.", len(compiled_forest.feature))
+
+    def _sklearn_model(self) -> RandomForestClassifier:
+        """
+        Zwraca las sklearn z pakietu (potrzebny przy dużych paczkach lub bez skompilowanego lasu).
+        """
+        with self._model_lock:
+            if self.model is None:
+                start = time.perf_counter()
+                saved = joblib.load(self.bundle.file_path("model.joblib"), mmap_mode="r")
+                self.bundle.check(features=getattr(saved["imputer"], "feature_names_in_", None), classes=saved["model"].classes_)
+                self.model, self.imputer = saved["model"], saved["imputer"]
+                self.logger.info("Las sklearn wczytano w %.3f s.", time.perf_counter() - start)
+            return self.model
         
     def tune_model(self, X_train: pd.DataFrame, y_train: pd.Series) -> RandomForestClassifier:
         """
-        Używa GridSearchCV do wyszukania najlepszych parametrów dla Random Forest
+        Wyszukuje najlepsze parametry dla Random Forest (pełna siatka lub successive halving).
+        Wyniki walidacji krzyżowej są zapamiętywane dla skrótu danych treningowych, więc ponowny
+        trening na niezmienionych danych nie powtarza wyszukiwania.
         args:
             X_train: pd.DataFrame - Zbiór treningowy cech
             y_train: pd.Series - Zbiór treningowy etykiet
         return:
             RandomForestClassifier - Najlepszy model
         """
-        self.logger.info("Rozpoczynanie Grid Search...")
-        rf = RandomForestClassifier(random_state=42)
-
-        # Definicja siatki parametrów
-        param_grid = {
-            'n_estimators': [50, 100, 200],       # liczba drzew
-            'max_depth': [10, 20, 30],            # maksymalna głębokość drzewa
-            'min_samples_split': [2, 5, 10],      # minimalna liczba próbek do podziału w węźle
-            'min_samples_leaf': [1, 2, 4],        # minimalna liczba próbek w liściu
-            'max_features': ['sqrt', 'log2'],     # liczba cech do rozważenia przy każdym podziale
-        }
-
-        grid_search = GridSearchCV(
-            estimator=rf,
-            param_grid=param_grid,
+        self.logger.info("Rozpoczynanie wyszukiwania parametrów (%s)...", self.search_mode)
+        search = ForestSearch(
+            cache_path=os.path.join(self.path, 'models', 'animal_features_cv_cache.json'),
+            logger=self.logger,
             cv=5,               # 5-krotna walidacja krzyżowa
+            random_state=42,
             n_jobs=-1,          # Wykorzystanie wszystkich procesorów
-            scoring='accuracy', # Metryka do optymalizacji
         )
+        return search.fit_best(X_train, y_train, mode=self.search_mode)
+
+    def model_files(self) -> list:
+        """
+        Zwraca manifest pakietu modelu (do wyznaczania wersji modelu).
+        """
+        return [os.path.join(self.bundle_dir, MANIFEST_NAME)]
 
-        grid_search.fit(X_train, y_train)
+    def _compile_forest(self):
+        """
+        Kompiluje las do płaskich tablic NumPy. Skompilowany las jest używany tylko wtedy,
+        gdy jego prawdopodobieństwa zgadzają się z predict_proba sklearn.
+        return:
+            CompiledForest | None - Skompilowany las lub None, gdy nie można go użyć
+        """
+        if not isinstance(self.model, RandomForestClassifier):
+            return None
 
-        self.logger.info(f"Najlepsze parametry: {grid_search.best_params_}")
-        self.logger.info(f"Najlepsza dokladnosc walidacji krzyzowej: {grid_search.best_score_}")
+        compiled_forest = CompiledForest.from_sklearn(self.model)
 
-        return grid_search.best_estimator_    
+        # Weryfikacja na losowych wartościach z zakresu suwaków (0-100)
+        check_data = np.random.default_rng(42).uniform(0, 100, size=(256, self.model.n_features_in_))
+        difference = compiled_forest.verify(self.model, check_data)
+        if difference > 1e-12:
+            self.logger.error("Skompilowany las różni się od modelu sklearn (maks. różnica %g). Używany będzie sklearn.", difference)
+            return None
+
+        self.logger.info("Skompilowano las (%d węzłów, maks. różnica względem sklearn: %g).", len(compiled_forest.feature), difference)
+        return compiled_forest
+
+    def _predict_top_k_fast(self, input_features: dict, k: int) -> list:
+        """
+        Przewiduje k najbardziej prawdopodobnych zwierząt dla jednego słownika cech bez użycia pandas.
+        args:
+            input_features: dict - Zwalidowany słownik cech
+            k: int - Liczba zwracanych zwierząt
+        return:
+            list - Lista [(zwierzę, prawdopodobieństwo)] posortowana malejąco
+        """
+        with self._fast_path_lock:
+            row = self._input_buffer[0]
+            np.copyto(row, self._medians) # Uzupełnianie braków medianą
+            for feature, value in input_features.items():
+                index = self._feature_index.get(feature)
+                if index is not None and value == value: # NaN traktowany jak brak wartości
+                    row[index] = value
+
+            # Przewidywanie prawdopodobieństw
+            if self.compiled_forest is not None:
+                probabilities = self.compiled_forest.predict_proba_row(row)
+            else:
+                probabilities = self._sklearn_model().predict_proba(self._input_buffer)[0]
+
+        classes = self.classes
+        k = min(k, len(classes))
+        top_indices = np.argpartition(-probabilities, k - 1)[:k]
+        top_indices = top_indices[np.argsort(-probabilities[top_indices], kind="stable")]
+        return [(classes[i], probabilities[i]) for i in top_indices]
 
     def predict_top_10(self, input_features: dict) -> list:
         """
@@ -179,7 +373,7 @@ class AnimalFeaturesClassifier:
         return:
             list - Lista 10 zwierząt z prawdopodobieństwami
         """
-        if self.model is None or self.imputer is None:
+        if self.bundle is None:
             self.logger.critical("Model i imputer muszą zostać wczytane lub wytrenowane.")
         if self.features is None:
             self.logger.critical("Lista cech modelu nie zostala wczytana.")
@@ -197,25 +391,97 @@ class AnimalFeaturesClassifier:
                 self.logger.warning("Nieprawidłowa wartość cechy %s: %s (typ: %s). Oczekiwano liczby.", key, value, type(value))
                 raise ValueError(f"Nieprawidłowa wartość cechy '{key}': {value}. Oczekiwano liczby.")
 
-        input_vector = pd.DataFrame([input_features])
-        input_vector = input_vector.loc[:, input_vector.columns.isin(self.features)]
+        with get_metrics().span("predict", classifier="features"):
+            top_10_predictions = self._predict_top_k_fast(input_features, 10)
 
-        # Dodawanie brakujących cech
-        for feature in self.features:
-            if feature not in input_vector.columns:
-                input_vector[feature] = None
-        
-        input_vector = input_vector[self.features]
-        input_vector_imputed = self.imputer.transform(input_vector)
+        self.logger.info("Top 10 przewidywań: %s", top_10_predictions)
+        return top_10_predictions
 
-        # Przewidywanie prawdopodobieństw
-        probabilities = self.model.predict_proba(input_vector_imputed)[0]
-        classes = self.model.classes_
+    def _align_features(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Dopasowuje kolumny do cech modelu: pomija nieznane cechy, a brakujące uzupełnia wartościami NaN.
+        args:
+            data: pd.DataFrame - Dane wejściowe z cechami
+        return:
+            pd.DataFrame - Dane z kolumnami w kolejności self.features
+        """
+        aligned = data.reindex(columns=list(self.features))
+        try:
+            return aligned.apply(pd.to_numeric).astype(float)
+        except (ValueError, TypeError) as e:
+            self.logger.error("Nieprawidłowe wartości cech w danych wsadowych: %s", str(e))
+            raise ValueError(f"Nieprawidłowe wartości cech: {e}. Oczekiwano liczb.")
 
-        # Tworzenie listy zwierząt z prawdopodobieństwami
-        predictions = sorted(zip(classes, probabilities), key=lambda x: x[1], reverse=True)
-        top_10_predictions = predictions[:10]
+    def _impute(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Uzupełnia braki medianami z pakietu modelu tak samo jak SimpleImputer.transform (bez wczytywania imputera).
+        """
+        matrix = matrix[:, self._kept]
+        missing = np.isnan(matrix)
+        if missing.any():
+            matrix[missing] = self._medians[np.nonzero(missing)[1]]
+        return matrix
 
-        self.logger.info(f"Top 10 przewidywań: {top_10_predictions}")
-        return top_10_predictions
+    def predict_batch(self, data, top_k: int = 10) -> list:
+        """
+        Przewiduje najbardziej prawdopodobne zwierzęta dla wielu zestawów cech w jednym wywołaniu modelu.
+        args:
+            data: pd.DataFrame | list - DataFrame lub lista słowników z cechami
+            top_k: int - Liczba zwracanych zwierząt dla każdego wiersza
+        return:
+            list - Lista list [(zwierzę, prawdopodobieństwo)] w kolejności wierszy
+        """
+        if self.bundle is None or self.features is None:
+            self.logger.critical("Model, imputer i lista cech muszą zostać wczytane lub wytrenowane.")
+            raise RuntimeError("Model musi zostać wczytany lub wytrenowany przed użyciem.")
+
+        if not isinstance(data, pd.DataFrame):
+            data = pd.DataFrame(list(data))
+
+        if data.empty:
+            return []
+
+        input_matrix = self._impute(self._align_features(data).to_numpy())
+        if self.compiled_forest is not None and len(input_matrix) <= COMPILED_FOREST_MAX_BATCH:
+            probabilities = self.compiled_forest.predict_proba(input_matrix)
+        else:
+            probabilities = self._sklearn_model().predict_proba(input_matrix)
+        classes = self.classes
+
+        top_k = min(top_k, len(classes))
+        top_indices = np.argpartition(-probabilities, top_k - 1, axis=1)[:, :top_k]
+        top_probabilities = np.take_along_axis(probabilities, top_indices, axis=1)
+        order = np.argsort(-top_probabilities, axis=1, kind="stable")
+        top_indices = np.take_along_axis(top_indices, order, axis=1)
+        top_probabilities = np.take_along_axis(top_probabilities, order, axis=1)
+
+        self.logger.info("Przewidziano zwierzęta dla %d wierszy.", len(data))
+        return [list(zip(classes[indices], row_probabilities)) for indices, row_probabilities in zip(top_indices, top_probabilities)]
+
+    def predict_batch_from_csv(self, csv_path: str, top_k: int = 10) -> list:
+        """
+        Przewiduje zwierzęta dla wszystkich wierszy pliku CSV z cechami.
+        args:
+            csv_path: str - Ścieżka do pliku CSV (nagłówek z nazwami cech)
+            top_k: int - Liczba zwracanych zwierząt dla każdego wiersza
+        return:
+            list - Lista list [(zwierzę, prawdopodobieństwo)] w kolejności wierszy
+        """
+        return self.predict_batch(pd.read_csv(csv_path), top_k=top_k)
 
+    def predict_batch_from_sqlite(self, db_path: str, table: str = "cechy", top_k: int = 10) -> list:
+        """
+        Przewiduje zwierzęta dla wszystkich wierszy tabeli SQLite o strukturze jak tabela "cechy".
+        args:
+            db_path: str - Ścieżka do bazy SQLite
+            table: str - Nazwa tabeli z cechami
+            top_k: int - Liczba zwracanych zwierząt dla każdego wiersza
+        return:
+            list - Lista list [(zwierzę, prawdopodobieństwo)] w kolejności wierszy
+        """
+        conn = sqlite3.connect(db_path)
+        try:
+            data = pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
+        finally:
+            conn.close()
+        return self.predict_batch(data, top_k=top_k)
@@ -1,31 +1,87 @@
 import os
-import zipfile
+import time
+import hashlib
+import random
 import logging
+import shutil
+import threading
 import joblib
-import gdown
 import numpy as np
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from ImagePipeline import MODEL_INPUT_VERSION, decode_model_input
+from ImageShardCache import ImageShardCache
+from EmbeddingStore import EmbeddingStore
+from AssetStore import get_asset_store
+from ModelBundle import ModelBundle, MANIFEST_NAME, bundle_exists, library_mismatches
+from StreamingZipExtractor import StreamingZipExtractor, iter_zip_entries
+from Metrics import get_metrics
 import tensorflow as tf
-from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
+from tensorflow.keras.callbacks import Callback, ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
 from tensorflow.keras.optimizers import Adam
 
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+BACKBONE_WEIGHTS = "imagenet"  # Wagi modelu bazowego dla trybu treningu "head" (None - losowe, bez pobierania)
+IMAGE_BUNDLE_KIND = "animal_image"
+TFLITE_QUANTIZATIONS = ("float16", "int8", "dynamic")
+
+class EpochTimer(Callback):
+    def __init__(self, logger: logging.Logger):
+        """
+        Loguje czas trwania każdej epoki treningu.
+        args:
+            logger: logging.Logger - Wspólny logger
+        """
+        super().__init__()
+        self.logger = logger
+        self.epoch_times = []
+        self._start = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        self.epoch_times.append(elapsed)
+        self.logger.info("Epoka %d zakończona w %.1f s.", epoch + 1, elapsed)
+
 class AnimalImageClassifier:
-    def __init__(self, drive_folder_id: str, local_path: str, logger: logging.Logger):
+    def __init__(self, drive_folder_id: str, local_path: str, logger: logging.Logger, engine: str = "keras", quantization: str = "float16",
+                 batch_size: int = 10, cache_dir: str = None, use_shard_cache: bool = False, training_mode: str = "full", epochs: int = None):
         """
         Inicjalizacja klasyfikatora obrazów.
         args:
             drive_folder_id: str - Id folderu na Google Drive
             local_path: str - Lokalna ścieżka do zapisu danych
             logger: logging.Logger - Logger do logowania informacji
+            engine: str - Silnik predykcji: "keras" (pełny model Keras) lub "tflite" (model skwantyzowany)
+            quantization: str - Rodzaj kwantyzacji modelu TFLite ("float16", "int8" lub "dynamic")
+            batch_size: int - Rozmiar paczki podczas treningu
+            cache_dir: str - Folder na pamięć podręczną zdekodowanych zdjęć treningowych (domyślnie pamięć RAM)
+            use_shard_cache: bool - Czy trenować na zdjęciach z pamięci podręcznej mapowanej w pamięci (cache/image_shards)
+            training_mode: str - "full" (trening całej sieci) lub "head" (zamrożony model bazowy i trening samej głowicy)
+            epochs: int - Maksymalna liczba epok treningu (domyślnie 50, a w trybie "head" 100)
         """
         self.drive_folder_id = drive_folder_id
         self.path = local_path
+        self.bundle_dir = os.path.join(self.path, 'models', 'animal_image')
+        self.bundle = None
         self.model = None
+        self.interpreter = None
         self.classes = None
         self.logger = logger
         self.image_size = (224, 224)
-        self.batch_size = 10
+        self.batch_size = batch_size
+        self.cache_dir = cache_dir
+        self.use_shard_cache = use_shard_cache
+        self.training_mode = training_mode
+        self.epochs = epochs
+        self.engine = engine
+        self.quantization = quantization
+        self.epoch_times = []  # Czasy epok ostatniego treningu w sekundach
+        self._interpreter_lock = threading.Lock()
+
+        if engine not in ("keras", "tflite"):
+            raise ValueError(f"Nieznany silnik predykcji: {engine}")
 
         if not os.path.exists(self.path):
             os.makedirs(self.path)
@@ -33,36 +89,285 @@ class AnimalImageClassifier:
         self.logger.info("Inicjalizacja klasyfikatora obrazów.")
 
         try:
-            model_path = os.path.join(self.path, 'models', 'animal_image_model.h5')
-            classes_path = os.path.join(self.path, 'models', 'animal_image_classes.joblib')
-            
-            if os.path.exists(model_path) and os.path.exists(classes_path):
-                self.model = tf.keras.models.load_model(model_path)
-                self.classes = joblib.load(classes_path)
-                self.logger.info("Model i klasy zostały pomyślnie wczytane.")
-            else:
+            try:
+                self.load_model()
+            except FileNotFoundError:
                 self.logger.info("Model nie istnieje. Należy go wytrenować.")
-                self.download_images_from_drive()
+            except ValueError as e:
+                self.logger.error("Zapisany model jest niezgodny: %s. Model zostanie wytrenowany ponownie.", str(e))
+
+            if self.bundle is None:
+                self.engine = "keras"
+                if self.use_shard_cache and self.training_mode == "full":
+                    self.update_shard_cache_from_archive()
+                else:
+                    self.download_images_from_drive()
                 self.train_model()
         except Exception as e:
             self.logger.critical("Nie udało się wczytać lub wytrenować modelu: %s", str(e))
             raise RuntimeError(f"Błąd inicjalizacji: {e}")
-    
+
+    def tflite_model_path(self, quantization: str) -> str:
+        return self.bundle.file_path(f"model_{quantization}.tflite")
+
+    def model_files(self) -> list:
+        """
+        Zwraca manifest pakietu modelu (do wyznaczania wersji modelu).
+        """
+        return [os.path.join(self.bundle_dir, MANIFEST_NAME)]
+
+    def load_model(self):
+        """
+        Wczytuje pakiet modelu (architektura, wagi .npy mapowane w pamięci i opcjonalnie modele TFLite)
+        i sprawdza jego zgodność. Model zapisany w starym formacie (.h5 i lista klas w joblib) jest
+        jednorazowo przepisywany do pakietu.
+        """
+        legacy_model_path = os.path.join(self.path, 'models', 'animal_image_model.h5')
+        legacy_classes_path = os.path.join(self.path, 'models', 'animal_image_classes.joblib')
+        if not bundle_exists(self.bundle_dir) and os.path.exists(legacy_model_path) and os.path.exists(legacy_classes_path):
+            self._convert_legacy_model(legacy_model_path, legacy_classes_path)
+
+        bundle = ModelBundle.load(self.bundle_dir, kind=IMAGE_BUNDLE_KIND)
+        if bundle.manifest["extra"].get("image_size") != list(self.image_size):
+            raise ValueError(f"Model przyjmuje zdjęcia {bundle.manifest['extra'].get('image_size')}, a oczekiwano {list(self.image_size)}.")
+        mismatches = library_mismatches(bundle.manifest["libraries"], {"tensorflow": tf.__version__})
+        if mismatches:
+            self.logger.warning("Model zapisano przy innych wersjach bibliotek (%s).", ", ".join(mismatches))
+
+        tflite_name = f"model_{self.quantization}.tflite"
+        if self.engine == "tflite" and bundle.has_file(tflite_name):
+            self._load_tflite(bundle.file_path(tflite_name))
+            outputs = self.interpreter.get_output_details()[0]["shape"][-1]
+            self.logger.info("Model TFLite (%s) i klasy zostały pomyślnie wczytane (wersja %s).", self.quantization, bundle.version)
+        else:
+            if self.engine == "tflite":
+                self.logger.warning("Brak modelu TFLite (%s) w pakiecie. Używany jest model Keras.", self.quantization)
+                self.engine = "keras"
+            if self.model is None:
+                self.model = self._model_from_bundle(bundle)
+            outputs = self.model.output_shape[-1]
+            self.logger.info("Model i klasy zostały pomyślnie wczytane (wersja %s).", bundle.version)
+
+        if outputs != len(bundle.classes):
+            raise ValueError(f"Model zwraca {outputs} klas, a manifest zawiera {len(bundle.classes)}.")
+        self.bundle = bundle
+        self.classes = list(bundle.classes)
+
+    def _model_from_bundle(self, bundle: ModelBundle):
+        with open(bundle.file_path("model.json"), "r", encoding="utf-8") as model_file:
+            model = tf.keras.models.model_from_json(model_file.read())
+        # Wagi są kopiowane do zmiennych TensorFlow prosto z plików mapowanych w pamięci
+        model.set_weights([bundle.array(f"weight_{i:03d}") for i in range(bundle.manifest["extra"]["weights"])])
+        return model
+
+    def save_model(self, metrics: dict = None):
+        """
+        Zapisuje model jako pakiet (models/animal_image): architekturę w JSON, wagi jako nieskompresowane
+        tablice .npy i manifest z klasami, skrótem archiwum zdjęć i metrykami treningu.
+        args:
+            metrics: dict - Metryki ostatniej epoki treningu
+        """
+        weights = self.model.get_weights()
+        model_json = self.model.to_json()
+
+        def write_model_json(model_path: str):
+            with open(model_path, "w", encoding="utf-8") as model_file:
+                model_file.write(model_json)
+
+        archive = get_asset_store(self.path, self.logger).manifest.get("drive_images.zip", {})
+        self.bundle = ModelBundle.write(
+            self.bundle_dir, kind=IMAGE_BUNDLE_KIND, classes=self.classes, data_sha256=archive.get("sha256"), metrics=metrics,
+            arrays={f"weight_{i:03d}": weight for i, weight in enumerate(weights)},
+            files={"model.json": write_model_json},
+            libraries={"tensorflow": tf.__version__},
+            extra={"weights": len(weights), "image_size": list(self.image_size), "training_mode": self.training_mode},
+        )
+        self.logger.info("Model zapisano w pakiecie %s (wersja %s).", self.bundle_dir, self.bundle.version)
+
+    def _convert_legacy_model(self, model_path: str, classes_path: str):
+        self.logger.info("Przepisywanie modelu ze starego formatu (.h5) do pakietu %s.", self.bundle_dir)
+        try:
+            self.model = tf.keras.models.load_model(model_path)
+            self.classes = list(joblib.load(classes_path))
+        except Exception as e:
+            raise ValueError(f"Nie udało się wczytać modelu w starym formacie: {e}")
+        self.save_model()
+        for quantization in TFLITE_QUANTIZATIONS:
+            tflite_path = os.path.join(self.path, 'models', f'animal_image_model_{quantization}.tflite')
+            if os.path.exists(tflite_path):
+                self.bundle.add_file(f"model_{quantization}.tflite", lambda target, source=tflite_path: shutil.copyfile(source, target))
+
+    @staticmethod
+    def _history_metrics(history) -> dict:
+        metrics = {name: float(values[-1]) for name, values in history.history.items() if values}
+        metrics["epochs"] = len(history.epoch)
+        return metrics
+
+    def _load_tflite(self, tflite_path: str):
+        self.interpreter = tf.lite.Interpreter(model_path=tflite_path, num_threads=os.cpu_count())
+        self.interpreter.allocate_tensors()
+        self._tflite_batch_size = 1
+
+    def is_ready(self) -> bool:
+        """
+        Sprawdza, czy model wybranego silnika i lista klas zostały wczytane.
+        """
+        model = self.interpreter if self.engine == "tflite" else self.model
+        return model is not None and bool(self.classes)
+
+    def predict_arrays(self, batch: np.ndarray, engine: str = None) -> np.ndarray:
+        """
+        Zwraca prawdopodobieństwa klas dla paczki przygotowanych obrazów, korzystając z wybranego silnika.
+        args:
+            batch: np.ndarray - Obrazy o wymiarach (n, 224, 224, 3) typu float32 w zakresie [0, 1]
+            engine: str - Silnik predykcji (domyślnie self.engine)
+        return:
+            np.ndarray - Prawdopodobieństwa o wymiarach (n, liczba_klas)
+        """
+        batch = np.asarray(batch, dtype=np.float32)
+        if (engine or self.engine) == "keras":
+            return np.asarray(self.model.predict_on_batch(batch))
+
+        # Interpreter TFLite nie jest bezpieczny wątkowo
+        with self._interpreter_lock:
+            input_details = self.interpreter.get_input_details()[0]
+            output_details = self.interpreter.get_output_details()[0]
+            if batch.shape[0] != self._tflite_batch_size:
+                self.interpreter.resize_tensor_input(input_details["index"], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._tflite_batch_size = batch.shape[0]
+            self.interpreter.set_tensor(input_details["index"], batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(output_details["index"]).copy()
+
+    def sample_training_images(self, limit: int = 100) -> list:
+        """
+        Zwraca losową (powtarzalną) próbkę zdjęć z folderu baza_zdjecia.
+        args:
+            limit: int - Maksymalna liczba zdjęć
+        return:
+            list - Lista ścieżek do zdjęć
+        """
+        data_dir = os.path.join(self.path, 'baza_zdjecia')
+        image_paths = []
+        for root, dirs, files in os.walk(data_dir):
+            image_paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS))
+        random.Random(42).shuffle(image_paths)
+        return image_paths[:limit]
+
+    def export_tflite(self, quantization: str = "float16", representative_limit: int = 100) -> str:
+        """
+        Eksportuje model Keras do pliku TFLite z kwantyzacją po treningu.
+        args:
+            quantization: str - "float16" (wagi float16), "int8" (wagi i aktywacje int8, wymaga zdjęć
+                                z baza_zdjecia do kalibracji) lub "dynamic" (wagi int8)
+            representative_limit: int - Liczba zdjęć używanych do kalibracji kwantyzacji int8
+        return:
+            str - Ścieżka do zapisanego modelu TFLite
+        """
+        if self.model is None:
+            raise RuntimeError("Eksport wymaga wczytanego modelu Keras.")
+
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if quantization == "float16":
+            converter.target_spec.supported_types = [tf.float16]
+        elif quantization == "int8":
+            image_paths = self.sample_training_images(representative_limit)
+            if not image_paths:
+                raise RuntimeError("Kwantyzacja int8 wymaga zdjęć w folderze baza_zdjecia.")
+
+            def representative_dataset():
+                for image_path in image_paths:
+                    yield [np.expand_dims(self._load_image_array(image_path), axis=0)]
+
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        elif quantization != "dynamic":
+            raise ValueError(f"Nieznany rodzaj kwantyzacji: {quantization}")
+
+        start = time.perf_counter()
+        tflite_model = converter.convert()
+
+        def write_tflite(tflite_path: str):
+            with open(tflite_path, "wb") as tflite_file:
+                tflite_file.write(tflite_model)
+
+        tflite_path = self.bundle.add_file(f"model_{quantization}.tflite", write_tflite)
+
+        self.logger.info("Model TFLite (%s) zapisano w %s (%.1f MB) w %.1f s.", quantization, tflite_path, len(tflite_model) / 2**20, time.perf_counter() - start)
+        return tflite_path
+
+    def compare_engines(self, image_paths: list, quantization: str = "float16") -> dict:
+        """
+        Porównuje model TFLite z modelem Keras: opóźnienie, rozmiar modelu i zgodność top-1/top-5.
+        args:
+            image_paths: list - Zdjęcia użyte do porównania
+            quantization: str - Rodzaj kwantyzacji porównywanego modelu TFLite
+        return:
+            dict - Raport porównania
+        """
+        if self.model is None:
+            raise RuntimeError("Porównanie wymaga wczytanego modelu Keras.")
+
+        with self._interpreter_lock:
+            self._load_tflite(self.tflite_model_path(quantization))
+
+        report = {"images": 0, "quantization": quantization}
+        latencies = {"keras": [], "tflite": []}
+        top_1_agreement = 0
+        top_5_overlap = 0.0
+
+        for image_path in image_paths:
+            try:
+                image = np.expand_dims(self._load_image_array(image_path), axis=0)
+            except Exception as e:
+                self.logger.warning("Pominięto zdjęcie %s: %s", image_path, str(e))
+                continue
+
+            outputs = {}
+            for engine in ("keras", "tflite"):
+                start = time.perf_counter()
+                outputs[engine] = self.predict_arrays(image, engine=engine)[0]
+                latencies[engine].append(time.perf_counter() - start)
+
+            keras_top_5 = np.argsort(outputs["keras"])[::-1][:5]
+            tflite_top_5 = np.argsort(outputs["tflite"])[::-1][:5]
+            top_1_agreement += int(keras_top_5[0] == tflite_top_5[0])
+            top_5_overlap += len(set(keras_top_5) & set(tflite_top_5)) / 5
+            report["images"] += 1
+
+        if report["images"] == 0:
+            raise ValueError("Brak zdjęć do porównania.")
+
+        model_sizes = {
+            "keras": sum(weight.nbytes for weight in self.bundle.arrays("weight_").values()),
+            "tflite": os.path.getsize(self.tflite_model_path(quantization)),
+        }
+        for engine in ("keras", "tflite"):
+            # Pierwsze wywołanie pomijane jako rozgrzewka
+            samples = np.array(latencies[engine][1:] or latencies[engine]) * 1000
+            report[engine] = {
+                "mean_ms": float(samples.mean()),
+                "p95_ms": float(np.percentile(samples, 95)),
+                "model_size_mb": model_sizes[engine] / 2**20,
+            }
+        report["top_1_agreement"] = top_1_agreement / report["images"]
+        report["top_5_overlap"] = top_5_overlap / report["images"]
+
+        self.logger.info("Porównanie silników Keras i TFLite: %s", report)
+        return report
+
     def download_images_from_drive(self):
         """
-        Pobiera zdjęcia z Google Drive do lokalnego folderu.
+        Pobiera zdjęcia ze źródła plików (domyślnie Google Drive) i rozpakowuje je do lokalnego folderu.
+        Pliki są rozpakowywane w trakcie pobierania; niezmienione pliki są pomijane, a usunięte z archiwum - kasowane.
         """
         try:
-            self.logger.info("Pobieranie zdjęć z Google Drive za pomocą gdown...")
-            output_zip_path = os.path.join(self.path, "drive_images.zip")
-            folder_url = f"https://drive.google.com/uc?id={self.drive_folder_id}&export=download"
-            gdown.download(folder_url, output_zip_path, quiet=False, fuzzy=True)
-            self.logger.info(f"Rozpakowywanie zdjęć z: {output_zip_path}...")
-            with zipfile.ZipFile(output_zip_path, 'r') as zip_ref:
-                zip_ref.extractall(self.path)
-            os.remove(output_zip_path)
-
-            self.logger.info(f"Zdjęcia pobrano i rozpakowano do: {self.path}\\baza_zdjecia")
+            self.logger.info("Pobieranie i rozpakowywanie zdjęć...")
+            extractor = StreamingZipExtractor(self.path, self.logger, state_name=".drive_images.json")
+            get_asset_store(self.path, self.logger).stream_to("drive_images.zip", extractor.extract, source_id=self.drive_folder_id)
+            self.logger.info("Zdjęcia pobrano i rozpakowano do: %s", os.path.join(self.path, "baza_zdjecia"))
         except Exception as e:
             self.logger.critical("Błąd podczas pobierania lub rozpakowywania zdjęć: %s", str(e))
             raise RuntimeError("Nie udało się pobrać zdjęć z Google Drive.")
@@ -71,15 +376,18 @@ class AnimalImageClassifier:
         """
         Trenuje model klasyfikacji obrazów.
         """
+        if self.training_mode == "head":
+            return self.train_head_model(epochs=self.epochs or 100)
+
         try:
             self.logger.info("Rozpoczynanie treningu modelu...")
             data_dir = os.path.join(self.path, 'baza_zdjecia')
 
-            train_generator, val_generator = self._prepare_data_generators(data_dir)
+            train_dataset, val_dataset, class_names = self._prepare_datasets(data_dir)
             checkpoint_path = os.path.join(self.path, "models", "animals_classification_checkpoint.weights.h5")
 
             input_shape = (*self.image_size, 3)
-            num_classes = len(train_generator.class_indices)
+            num_classes = len(class_names)
 
             model = self._build_custom_model(input_shape=input_shape, num_classes=num_classes)
             model.compile(
@@ -88,26 +396,143 @@ class AnimalImageClassifier:
                 metrics=['accuracy']
             )
 
-            early_stopping = EarlyStopping(monitor="val_loss", patience=5, restore_best_weights=True)
-            checkpoint_callback = ModelCheckpoint(checkpoint_path, save_weights_only=True, monitor="val_accuracy", save_best_only=True)
-            reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.2, patience=3, min_lr=1e-6)
+            # Przy bardzo małych klasach (mniej niż 5 zdjęć) nie ma zbioru walidacyjnego - monitorowany jest zbiór treningowy
+            prefix = "val_" if val_dataset is not None else ""
+            early_stopping = EarlyStopping(monitor=f"{prefix}loss", patience=5, restore_best_weights=True)
+            checkpoint_callback = ModelCheckpoint(checkpoint_path, save_weights_only=True, monitor=f"{prefix}accuracy", save_best_only=True)
+            reduce_lr = ReduceLROnPlateau(monitor=f"{prefix}loss", factor=0.2, patience=3, min_lr=1e-6)
+
+            epoch_timer = EpochTimer(self.logger)
 
-            model.fit(
-                train_generator,
-                validation_data=val_generator,
-                epochs=50,
-                callbacks=[early_stopping, checkpoint_callback, reduce_lr]
+            history = model.fit(
+                train_dataset,
+                validation_data=val_dataset,
+                epochs=self.epochs or 50,
+                callbacks=[early_stopping, checkpoint_callback, reduce_lr, epoch_timer]
             )
+            self.epoch_times = epoch_timer.epoch_times
+            if epoch_timer.epoch_times:
+                self.logger.info("Średni czas epoki: %.1f s (%d epok).", np.mean(epoch_timer.epoch_times), len(epoch_timer.epoch_times))
 
             self.model = model
-            self.classes = list(train_generator.class_indices.keys())
-            joblib.dump(self.classes, os.path.join(self.path, 'models', 'animal_image_classes.joblib'))
-            model.save(os.path.join(self.path, 'models', 'animal_image_model.h5'))
+            self.classes = class_names
+            self.save_model(metrics=self._history_metrics(history))
             self.logger.info("Model wytrenowano i zapisano.")
         except Exception as e:
             self.logger.critical("Błąd podczas treningu modelu: %s", str(e))
             raise RuntimeError("Nie udało się wytrenować modelu.")
         
+    def _build_backbone(self):
+        # Model bazowy przyjmuje obrazy [0, 1], tak jak model budowany przez _build_custom_model
+        inputs = tf.keras.Input(shape=(*self.image_size, 3))
+        x = tf.keras.layers.Rescaling(2.0, offset=-1.0)(inputs)  # MobileNetV2 oczekuje wartości [-1, 1]
+        base = tf.keras.applications.MobileNetV2(input_shape=(*self.image_size, 3), include_top=False, pooling="avg", weights=BACKBONE_WEIGHTS)
+        base.trainable = False
+        return tf.keras.Model(inputs, base(x, training=False), name="backbone")
+
+    def _build_head(self, embedding_size: int, num_classes: int):
+        return tf.keras.Sequential([
+            tf.keras.Input(shape=(embedding_size,)),
+            tf.keras.layers.Dropout(0.2),
+            tf.keras.layers.Dense(num_classes, activation='softmax')
+        ], name="head")
+
+    def _try_load_image_array(self, image_path: str) -> np.ndarray:
+        try:
+            return self._load_image_array(image_path)
+        except (OSError, ValueError) as e:  # Uszkodzony lub nieobsługiwany plik nie przerywa treningu
+            self.logger.warning("Pominięto zdjęcie, którego nie udało się wczytać (%s): %s", image_path, str(e))
+            return None
+
+    def _compute_embeddings(self, backbone, image_paths: list) -> tuple:
+        """
+        Liczy embeddingi zdjęć modelem bazowym. Zdjęcia, których nie udało się wczytać, są pomijane.
+        return:
+            tuple - (embeddingi, ścieżki zdjęć, dla których je policzono)
+        """
+        embeddings, loaded_paths = [], []
+        with ThreadPoolExecutor() as executor:
+            for start in range(0, len(image_paths), 32):
+                chunk = image_paths[start:start + 32]
+                loaded = [(image_path, array) for image_path, array in zip(chunk, executor.map(self._try_load_image_array, chunk)) if array is not None]
+                if loaded:
+                    embeddings.append(np.asarray(backbone.predict_on_batch(np.stack([array for _, array in loaded]))))
+                    loaded_paths += [image_path for image_path, _ in loaded]
+                self.logger.info("Embeddingi: %d/%d zdjęć.", min(start + 32, len(image_paths)), len(image_paths))
+        return (np.concatenate(embeddings) if embeddings else None), loaded_paths
+
+    @staticmethod
+    def _drop_unreadable(image_paths: list, labels: list, hashes: dict, unreadable: set) -> tuple:
+        kept = [(image_path, label) for image_path, label in zip(image_paths, labels) if hashes[image_path] not in unreadable]
+        return [image_path for image_path, _ in kept], [label for _, label in kept]
+
+    def train_head_model(self, epochs: int = 100):
+        """
+        Trenuje tylko głowicę klasyfikacyjną na embeddingach zamrożonego modelu bazowego (MobileNetV2).
+        Embeddingi są liczone raz dla każdego zdjęcia i zapisywane na dysku wg skrótu pliku,
+        więc dodanie zdjęć lub nowej klasy wymaga przeliczenia tylko nowych plików.
+        args:
+            epochs: int - Maksymalna liczba epok treningu głowicy
+        """
+        try:
+            self.logger.info("Rozpoczynanie treningu głowicy na embeddingach...")
+            start = time.perf_counter()
+            data_dir = os.path.join(self.path, 'baza_zdjecia')
+            train_paths, train_labels, val_paths, val_labels, class_names = self._list_images(data_dir)
+
+            backbone = self._build_backbone()
+            store = EmbeddingStore(os.path.join(self.path, 'cache', 'embeddings', f"mobilenet_v2_{self.image_size[0]}_input{MODEL_INPUT_VERSION}"), self.logger)
+
+            hashes = {image_path: store.file_hash(image_path) for image_path in train_paths + val_paths}
+            missing_hashes = set(store.missing(list(hashes.values())))
+            missing_paths = list({digest: image_path for image_path, digest in hashes.items() if digest in missing_hashes}.values())
+            embeddings, loaded_paths = self._compute_embeddings(backbone, missing_paths) if missing_paths else (None, [])
+            if loaded_paths:
+                store.add([hashes[image_path] for image_path in loaded_paths], embeddings)
+            else:
+                store.save()
+            self.logger.info("Embeddingi gotowe: %d nowych, %d z magazynu (%.1f s).", len(loaded_paths), len(hashes) - len(missing_paths), time.perf_counter() - start)
+
+            unreadable = set(store.missing(list(hashes.values())))
+            if unreadable:
+                self.logger.warning("Liczba zdjęć pominiętych w treningu, bo nie udało się ich wczytać: %d.", len(unreadable))
+                train_paths, train_labels = self._drop_unreadable(train_paths, train_labels, hashes, unreadable)
+                val_paths, val_labels = self._drop_unreadable(val_paths, val_labels, hashes, unreadable)
+            if not train_paths:
+                raise ValueError("Brak zdjęć treningowych, które udało się wczytać.")
+
+            X_train = store.get([hashes[image_path] for image_path in train_paths])
+            y_train = tf.keras.utils.to_categorical(train_labels, len(class_names))
+            validation_data = None
+            if val_paths:
+                validation_data = (store.get([hashes[image_path] for image_path in val_paths]), tf.keras.utils.to_categorical(val_labels, len(class_names)))
+
+            head = self._build_head(X_train.shape[1], len(class_names))
+            head.compile(optimizer=Adam(learning_rate=1e-3), loss='categorical_crossentropy', metrics=['accuracy'])
+            monitor = "val_loss" if validation_data else "loss"
+            epoch_timer = EpochTimer(self.logger)
+            history = head.fit(
+                X_train, y_train,
+                validation_data=validation_data,
+                epochs=epochs,
+                batch_size=max(self.batch_size, 32),
+                callbacks=[EarlyStopping(monitor=monitor, patience=10, restore_best_weights=True), epoch_timer],
+                verbose=0
+            )
+            self.epoch_times = epoch_timer.epoch_times
+
+            # Pełny model (model bazowy + głowica) przyjmuje te same dane co model z _build_custom_model
+            inputs = tf.keras.Input(shape=(*self.image_size, 3))
+            model = tf.keras.Model(inputs, head(backbone(inputs)), name="animal_head_model")
+
+            self.model = model
+            self.classes = class_names
+            self.save_model(metrics=self._history_metrics(history))
+            self.logger.info("Głowicę wytrenowano i zapisano w %.1f s.", time.perf_counter() - start)
+        except Exception as e:
+            self.logger.critical("Błąd podczas treningu głowicy: %s", str(e))
+            raise RuntimeError("Nie udało się wytrenować modelu.")
+
     def _build_custom_model(self, input_shape, num_classes):
         model = tf.keras.Sequential([
             tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=input_shape),
@@ -123,59 +548,294 @@ class AnimalImageClassifier:
         ])
         return model
     
-    def _prepare_data_generators(self, data_dir):
-        train_datagen = ImageDataGenerator(
-            rescale=1.0 / 255.0,
-            rotation_range=30,
-            width_shift_range=0.2,
-            height_shift_range=0.2,
-            shear_range=0.2,
-            zoom_range=0.2,
-            horizontal_flip=True,
-            validation_split=0.2
-        )
+    def _list_images(self, data_dir: str, validation_split: float = 0.2):
+        """
+        Wyszukuje zdjęcia w podfolderach klas i dzieli je na zbiór treningowy i walidacyjny.
+        Podział jest deterministyczny: pierwsze validation_split zdjęć każdej klasy (wg nazwy) trafia do walidacji.
+        return:
+            tuple - (ścieżki treningowe, etykiety treningowe, ścieżki walidacyjne, etykiety walidacyjne, nazwy klas)
+        """
+        files_by_class = {}
+        for class_name in os.listdir(data_dir):
+            class_dir = os.path.join(data_dir, class_name)
+            if os.path.isdir(class_dir):
+                files_by_class[class_name] = [os.path.join(class_dir, name) for name in os.listdir(class_dir) if name.lower().endswith(IMAGE_EXTENSIONS)]
 
-        train_generator = train_datagen.flow_from_directory(
-            data_dir,
-            target_size=self.image_size,
-            batch_size=self.batch_size,
-            class_mode='categorical',
-            subset='training'
-        )
+        if not any(files_by_class.values()):
+            raise ValueError(f"Brak zdjęć treningowych w folderze {data_dir}.")
+        return self._split_images(files_by_class, validation_split)
 
-        val_generator = train_datagen.flow_from_directory(
-            data_dir,
-            target_size=self.image_size,
-            batch_size=self.batch_size,
-            class_mode='categorical',
-            subset='validation'
-        )
-        return train_generator, val_generator
-    
-    def predict_top_10(self, image_path: str) -> list:
+    def _split_images(self, files_by_class: dict, validation_split: float = 0.2):
+        """
+        Dzieli zdjęcia klas ({klasa: [ścieżki]}) na zbiór treningowy i walidacyjny tak samo jak _list_images.
+        """
+        class_names = sorted(files_by_class)
+        train_paths, train_labels, val_paths, val_labels = [], [], [], []
+        for label, class_name in enumerate(class_names):
+            files = sorted(files_by_class[class_name])
+            n_val = int(len(files) * validation_split)
+            for i, image_path in enumerate(files):
+                if i < n_val:
+                    val_paths.append(image_path)
+                    val_labels.append(label)
+                else:
+                    train_paths.append(image_path)
+                    train_labels.append(label)
+
+        if not train_paths:
+            raise ValueError("Brak zdjęć treningowych.")
+        return train_paths, train_labels, val_paths, val_labels, class_names
+
+    def _build_augmentation(self):
+        # Odpowiednik ustawień ImageDataGenerator (bez ścinania), działający na całej paczce naraz
+        return tf.keras.Sequential([
+            tf.keras.layers.RandomRotation(30 / 360),
+            tf.keras.layers.RandomTranslation(0.2, 0.2),
+            tf.keras.layers.RandomZoom(0.2),
+            tf.keras.layers.RandomFlip("horizontal"),
+        ], name="augmentation")
+
+    def _decode_image(self, image_path, label):
+        # To samo przygotowanie zdjęcia co przy predykcji (_load_image_array), a nie tf.io.decode_image i tf.image.resize
+        image = tf.numpy_function(lambda path: decode_model_input(np.asarray(path).item().decode("utf-8"), self.image_size), [image_path], tf.uint8)
+        image.set_shape((self.image_size[1], self.image_size[0], 3))
+        return image, label
+
+    def _make_dataset(self, image_dataset, num_classes: int, training: bool, cache_name: str):
+        """
+        Buduje potok tf.data z datasetu par (obraz uint8 224x224x3, etykieta): pamięć podręczna
+        zdekodowanych zdjęć, tasowanie, paczkowanie, augmentacja całych paczek i prefetch.
+        """
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            image_dataset = image_dataset.cache(os.path.join(self.cache_dir, cache_name))
+        else:
+            image_dataset = image_dataset.cache()
+
+        if training:
+            image_dataset = image_dataset.shuffle(1000, reshuffle_each_iteration=True)
+        return self._finish_dataset(image_dataset.batch(self.batch_size), num_classes, training)
+
+    def _finish_dataset(self, batched_dataset, num_classes: int, training: bool):
+        """
+        Normalizuje i augmentuje paczki obrazów uint8, koduje etykiety one-hot i dodaje prefetch.
+        """
+        autotune = tf.data.AUTOTUNE
+        augmentation = self._build_augmentation() if training else None
+
+        def prepare_batch(images, labels):
+            images = tf.cast(images, tf.float32) / 255.0  # Normalizacja
+            if augmentation is not None:
+                images = augmentation(images, training=True)
+            return images, tf.one_hot(labels, num_classes)
+
+        return batched_dataset.map(prepare_batch, num_parallel_calls=autotune).prefetch(autotune)
+
+    def _make_shard_dataset(self, shard_cache: ImageShardCache, slots: np.ndarray, labels: list, num_classes: int, training: bool):
+        """
+        Buduje potok tf.data czytający przeskalowane zdjęcia bezpośrednio z plików mapowanych w pamięci.
+        """
+        dataset = tf.data.Dataset.from_tensor_slices((slots, np.asarray(labels, dtype=np.int32)))
+        if training:
+            dataset = dataset.shuffle(len(slots), reshuffle_each_iteration=True)
+
+        def read_batch(batch_slots, batch_labels):
+            images = tf.numpy_function(shard_cache.read_batch, [batch_slots], tf.uint8)
+            images.set_shape((None, *self.image_size, 3))
+            return images, batch_labels
+
+        dataset = dataset.batch(self.batch_size).map(read_batch, num_parallel_calls=tf.data.AUTOTUNE)
+        return self._finish_dataset(dataset, num_classes, training)
+
+    def update_shard_cache(self, data_dir: str = None) -> ImageShardCache:
+        """
+        Aktualizuje pamięć podręczną przeskalowanych zdjęć treningowych (tylko nowe i zmienione pliki).
+        args:
+            data_dir: str - Folder ze zdjęciami (domyślnie baza_zdjecia)
+        return:
+            ImageShardCache - Zaktualizowana pamięć podręczna
+        """
+        data_dir = data_dir or os.path.join(self.path, 'baza_zdjecia')
+        train_paths, _, val_paths, _, _ = self._list_images(data_dir)
+        shard_cache = ImageShardCache(os.path.join(self.path, 'cache', 'image_shards'), self.logger, image_size=self.image_size)
+        shard_cache.update(train_paths + val_paths, data_dir)
+        return shard_cache
+
+    def update_shard_cache_from_archive(self) -> ImageShardCache:
+        """
+        Wypełnia pamięć podręczną zdjęć treningowych prosto z archiwum ZIP (czytanego w trakcie pobierania),
+        bez rozpakowywania zdjęć na dysk.
+        return:
+            ImageShardCache - Zaktualizowana pamięć podręczna
+        """
+        shard_cache = ImageShardCache(os.path.join(self.path, 'cache', 'image_shards'), self.logger, image_size=self.image_size)
+        prefix = "baza_zdjecia/"
+
+        def consume(stream):
+            def images():
+                for entry in iter_zip_entries(stream):
+                    if not entry.is_dir and entry.name.startswith(prefix) and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield entry.name[len(prefix):], entry.read()
+            return shard_cache.update_from_archive(images())
+
+        get_asset_store(self.path, self.logger).stream_to("drive_images.zip", consume, source_id=self.drive_folder_id)
+        return shard_cache
+
+    def _prepare_datasets(self, data_dir):
+        """
+        Przygotowuje potoki tf.data (treningowy i walidacyjny). Zdjęcia są czytane z pamięci podręcznej
+        mapowanej w pamięci (use_shard_cache) albo dekodowane równolegle z plików JPEG.
+        return:
+            tuple - (dataset treningowy, dataset walidacyjny lub None przy braku zdjęć walidacyjnych, nazwy klas)
+        """
+        if self.use_shard_cache and not os.path.isdir(data_dir):
+            # Zdjęcia trafiły do pamięci podręcznej prosto z archiwum (update_shard_cache_from_archive), bez rozpakowywania
+            shard_cache = ImageShardCache(os.path.join(self.path, 'cache', 'image_shards'), self.logger, image_size=self.image_size)
+            files_by_class = {}
+            for key in shard_cache.keys():
+                class_name, _, name = key.partition("/")
+                if name and "/" not in name:
+                    files_by_class.setdefault(class_name, []).append(key)
+            train_keys, train_labels, val_keys, val_labels, class_names = self._split_images(files_by_class)
+            self.logger.info("Znaleziono %d zdjęć treningowych i %d walidacyjnych w %d klasach (z archiwum).", len(train_keys), len(val_keys), len(class_names))
+            train_dataset = self._make_shard_dataset(shard_cache, shard_cache.slots_for_keys(train_keys), train_labels, len(class_names), training=True)
+            val_dataset = None
+            if val_keys:
+                val_dataset = self._make_shard_dataset(shard_cache, shard_cache.slots_for_keys(val_keys), val_labels, len(class_names), training=False)
+            return train_dataset, val_dataset, class_names
+
+        train_paths, train_labels, val_paths, val_labels, class_names = self._list_images(data_dir)
+        self.logger.info("Znaleziono %d zdjęć treningowych i %d walidacyjnych w %d klasach.", len(train_paths), len(val_paths), len(class_names))
+
+        if self.use_shard_cache:
+            shard_cache = self.update_shard_cache(data_dir)
+
+            def cached(paths, labels):
+                # Pomijane są zdjęcia, których nie udało się zdekodować
+                kept = [(path, label) for path, label in zip(paths, labels) if shard_cache.contains(path, data_dir)]
+                return shard_cache.slots_for([path for path, _ in kept], data_dir), [label for _, label in kept]
+
+            train_slots, train_labels = cached(train_paths, train_labels)
+            val_slots, val_labels = cached(val_paths, val_labels)
+            train_dataset = self._make_shard_dataset(shard_cache, train_slots, train_labels, len(class_names), training=True)
+            val_dataset = None
+            if len(val_slots):
+                val_dataset = self._make_shard_dataset(shard_cache, val_slots, val_labels, len(class_names), training=False)
+            return train_dataset, val_dataset, class_names
+
+        def decoded(paths, labels):
+            # Jawny typ string - pusta lista ścieżek byłaby inaczej tensorem float32
+            dataset = tf.data.Dataset.from_tensor_slices((tf.constant(paths, dtype=tf.string), np.asarray(labels, dtype=np.int32)))
+            return dataset.map(self._decode_image, num_parallel_calls=tf.data.AUTOTUNE)
+
+        # Nazwa pamięci podręcznej zależy od listy plików i ich dat modyfikacji, więc zmiana zdjęć ją unieważnia
+        digest = hashlib.sha256(f"model_input={MODEL_INPUT_VERSION}\n".encode("utf-8"))
+        for image_path in train_paths + val_paths:
+            digest.update(f"{image_path}|{os.path.getmtime(image_path)}\n".encode("utf-8"))
+        cache_key = digest.hexdigest()[:16]
+
+        train_dataset = self._make_dataset(decoded(train_paths, train_labels), len(class_names), training=True, cache_name=f"train_{cache_key}")
+        val_dataset = None
+        if val_paths:
+            val_dataset = self._make_dataset(decoded(val_paths, val_labels), len(class_names), training=False, cache_name=f"validation_{cache_key}")
+        return train_dataset, val_dataset, class_names
+
+    def _load_image_array(self, image_path: str) -> np.ndarray:
+        """
+        Wczytuje zdjęcie i przygotowuje je do predykcji.
+        args:
+            image_path: str - Ścieżka do zdjęcia
+        return:
+            np.ndarray - Znormalizowany obraz o wymiarach (224, 224, 3) typu float32
+        """
+        return decode_model_input(image_path, self.image_size).astype(np.float32) / 255.0  # Normalizacja
+
+    def _top_k(self, predictions: np.ndarray, k: int) -> list:
+        sorted_indices = np.argsort(predictions)[::-1]  # Sortowanie malejące
+        return [(self.classes[i], predictions[i]) for i in sorted_indices[:k]]
+
+    def predict_top_10(self, image_path: str = None, image_array: np.ndarray = None) -> list:
         """
         Przewiduje 10 najbardziej prawdopodobnych zwierząt na podstawie zdjęcia.
         args:
             image_path: str - Ścieżka do zdjęcia.
+            image_array: np.ndarray - Zdjęcie już zdekodowane (np. przez ImagePipeline); wtedy plik nie jest wczytywany ponownie
         return:
             list - Lista 10 zwierząt z prawdopodobieństwami ([(nazwa_zwierzęcia, prawdopodobieństwo)])
         """
-        if not self.model or not self.classes:
+        if not self.is_ready():
             self.logger.critical("Model nie został wczytany ani wytrenowany.")
             raise RuntimeError("Model musi zostać wczytany lub wytrenowany przed użyciem.")
 
         try:
-            image = Image.open(image_path).resize((224, 224))
-            image_array = np.array(image) / 255.0  # Normalizacja
+            if image_array is None:
+                image_array = self._load_image_array(image_path)
             image_array = np.expand_dims(image_array, axis=0)  # Dodanie wymiaru batch
 
             # Przewidywanie
-            predictions = self.model.predict(image_array)[0]
-            sorted_indices = np.argsort(predictions)[::-1]  # Sortowanie malejące
-            top_10 = [(self.classes[i], predictions[i]) for i in sorted_indices[:10]]
+            with get_metrics().span("predict", classifier="image", engine=self.engine):
+                predictions = self.predict_arrays(image_array)[0]
+                top_10 = self._top_k(predictions, 10)
 
-            self.logger.info(f"Top 10 przewidywań: {top_10}")
+            self.logger.info("Top 10 przewidywań: %s", top_10)
             return top_10
         except Exception as e:
             self.logger.critical("Błąd podczas predykcji: %s", str(e))
-            raise RuntimeError("Nie udało się przewidzieć klasy obrazu.")
\ No newline at end of file
+            raise RuntimeError("Nie udało się przewidzieć klasy obrazu.")
+
+    def iter_predict_batch(self, image_paths: list, batch_size: int = 32, top_k: int = 10, num_workers: int = None):
+        """
+        Przewiduje zwierzęta dla wielu zdjęć, zwracając wyniki paczka po paczce.
+        Zdjęcia są dekodowane równolegle, a każda paczka trafia do modelu w jednym wywołaniu.
+        args:
+            image_paths: list - Lista ścieżek do zdjęć
+            batch_size: int - Liczba zdjęć przetwarzanych w jednym przebiegu modelu
+            top_k: int - Liczba zwracanych zwierząt dla każdego zdjęcia
+            num_workers: int - Liczba wątków dekodujących zdjęcia (domyślnie wg ThreadPoolExecutor)
+        return:
+            generator - Krotki (ścieżka, lista [(nazwa_zwierzęcia, prawdopodobieństwo)]);
+                        dla zdjęć, których nie udało się wczytać, lista jest pusta
+        """
+        if not self.is_ready():
+            self.logger.critical("Model nie został wczytany ani wytrenowany.")
+            raise RuntimeError("Model musi zostać wczytany lub wytrenowany przed użyciem.")
+
+        if batch_size < 1:
+            raise ValueError("Rozmiar paczki musi być dodatni.")
+
+        def load(image_path):
+            try:
+                return self._load_image_array(image_path)
+            except Exception as e:
+                self.logger.error("Nie udało się wczytać zdjęcia %s: %s", image_path, str(e))
+                return None
+
+        image_paths = list(image_paths)
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            for start in range(0, len(image_paths), batch_size):
+                batch_paths = image_paths[start:start + batch_size]
+                arrays = list(executor.map(load, batch_paths))
+
+                valid = [i for i, array in enumerate(arrays) if array is not None]
+                results = [[] for _ in batch_paths]
+                if valid:
+                    batch = np.stack([arrays[i] for i in valid]).astype(np.float32, copy=False)
+                    predictions = self.predict_arrays(batch)
+                    for row, i in enumerate(valid):
+                        results[i] = self._top_k(predictions[row], top_k)
+
+                self.logger.info("Przetworzono paczkę %d zdjęć (%d/%d).", len(batch_paths), start + len(batch_paths), len(image_paths))
+                yield from zip(batch_paths, results)
+
+    def predict_batch(self, image_paths: list, batch_size: int = 32, top_k: int = 10, num_workers: int = None) -> list:
+        """
+        Przewiduje zwierzęta dla wielu zdjęć naraz.
+        args:
+            image_paths: list - Lista ścieżek do zdjęć
+            batch_size: int - Liczba zdjęć przetwarzanych w jednym przebiegu modelu
+            top_k: int - Liczba zwracanych zwierząt dla każdego zdjęcia
+            num_workers: int - Liczba wątków dekodujących zdjęcia
+        return:
+            list - Lista list [(nazwa_zwierzęcia, prawdopodobieństwo)] w kolejności ścieżek
+        """
+        return [result for _, result in self.iter_predict_batch(image_paths, batch_size=batch_size, top_k=top_k, num_workers=num_workers)]
@@ -1,20 +1,36 @@
+import hashlib
+import json
 import logging
+import os
 import numpy as np
-from AnimalFeaturesClassifier import AnimalFeaturesClassifier
-from AnimalImageClassifier import AnimalImageClassifier
+from typing import TYPE_CHECKING
+from ImageShardCache import file_sha256
+from ResultCache import ResultCache
+from Metrics import get_metrics
+
+if TYPE_CHECKING:  # Klasyfikatory (TensorFlow, scikit-learn) importuje ModelRegistry dopiero przy wczytywaniu modeli
+    from AnimalFeaturesClassifier import AnimalFeaturesClassifier
+    from AnimalImageClassifier import AnimalImageClassifier
 
 class AnimalPredictor:
-    def __init__(self, features_classifier: AnimalFeaturesClassifier, image_classifier: AnimalImageClassifier, logger: logging.Logger):
+    def __init__(self, features_classifier: "AnimalFeaturesClassifier", image_classifier: "AnimalImageClassifier", logger: logging.Logger,
+                 weight_image: float = 0.7, weight_features: float = 0.3, result_cache: ResultCache = None):
         """
         Inicjalizacja połączonego klasyfikatora zwierząt.
         args:
             features_classifier: AnimalFeaturesClassifier - Klasyfikator oparty na cechach
-            image_classifier: AnimalImageClassifier - Klasyfikator oparty na obrazach
+            image_classifier: AnimalImageClassifier - Klasyfikator oparty na obrazach (None - tylko predykcje z cech)
             logger: logging.Logger - Logger do logowania informacji
+            weight_image: float - Waga predykcji obrazów przy łączeniu wyników
+            weight_features: float - Waga predykcji cech przy łączeniu wyników
+            result_cache: ResultCache - Pamięć podręczna wyników predict_top_5 (None - bez pamięci)
         """
         self.features_classifier = features_classifier
         self.image_classifier = image_classifier
         self.logger = logger
+        self.weight_image = weight_image
+        self.weight_features = weight_features
+        self.result_cache = result_cache
         self.logger.info("Inicjalizacja połączonego klasyfikatora zwierząt.")
 
     def combine_predictions(self, features_predictions, image_predictions, weight_image=0.7, weight_features=0.3):
@@ -40,20 +56,35 @@ class AnimalPredictor:
         # Sortowanie według złączonych wyników i pobranie top 5
         top_5_combined = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)[:5]
 
-        self.logger.info(f"Top 5 połączonych przewidywań: {top_5_combined}")
+        self.logger.info("Top 5 połączonych przewidywań: %s", top_5_combined)
         return top_5_combined
 
-    def predict_top_5(self, image_path: str = None, input_features: dict = None) -> list:
+    def predict_top_5(self, image_path: str = None, input_features: dict = None, image_array: np.ndarray = None) -> list:
         """
         Przewiduje 5 najbardziej prawdopodobnych zwierząt, łącząc klasyfikację obrazową i cechową.
         args:
             image_path: str - Ścieżka do zdjęcia (opcjonalnie)
             input_features: dict - Słownik cech zwierzęcia (opcjonalnie)
+            image_array: np.ndarray - Zdjęcie już zdekodowane przez ImagePipeline (opcjonalnie, zamiast ponownego wczytania pliku)
         return:
             list - Lista 5 najbardziej prawdopodobnych zwierząt
         """
-        if image_path:
-            image_predictions = self.image_classifier.predict_top_10(image_path)
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self.cache_key(image_path, input_features, image_array)
+        if cache_key is not None:
+            cached = self.result_cache.get(cache_key)
+            stats = self.result_cache.stats()
+            get_metrics().increment("result_cache_lookups", result="hit" if cached is not None else "miss")
+            if cached is not None:
+                self.logger.info("Wynik z pamięci podręcznej (trafienia: %d, chybienia: %d).", stats["hits"], stats["misses"])
+                return cached
+            self.logger.info("Brak wyniku w pamięci podręcznej (trafienia: %d, chybienia: %d).", stats["hits"], stats["misses"])
+
+        if image_path or image_array is not None:
+            if self.image_classifier is None:
+                raise RuntimeError("Klasyfikator obrazów nie został jeszcze wczytany.")
+            image_predictions = self.image_classifier.predict_top_10(image_path, image_array=image_array)
         else:
             image_predictions = []
 
@@ -62,6 +93,64 @@ class AnimalPredictor:
         else:
             features_predictions = []
 
+        top_5 = self.combine_top_5(features_predictions, image_predictions)
+        if cache_key is not None:
+            self.result_cache.put(cache_key, top_5)
+        return top_5
+
+    def model_version(self) -> str:
+        """
+        Wyznacza wersję modeli na podstawie daty modyfikacji i rozmiaru ich plików oraz silnika predykcji obrazów.
+        """
+        model_files = self.features_classifier.model_files()
+        digest = hashlib.sha256()
+        if self.image_classifier is not None:
+            digest.update(self.image_classifier.engine.encode("utf-8"))
+            model_files += self.image_classifier.model_files()
+        for model_path in model_files:
+            if os.path.exists(model_path):
+                stat = os.stat(model_path)
+                digest.update(f"{model_path}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def cache_key(self, image_path: str = None, input_features: dict = None, image_array: np.ndarray = None) -> str:
+        """
+        Buduje klucz pamięci podręcznej z zawartości zdjęcia, znormalizowanych cech, wag i wersji modeli.
+        Dla niepoprawnych danych (brak pliku, cechy nie będące liczbami) zwraca None - pamięć jest wtedy
+        pomijana, a błąd zgłaszają klasyfikatory, tak jak bez pamięci podręcznej.
+        """
+        if input_features and (not isinstance(input_features, dict)
+                               or any(not isinstance(value, (int, float)) for value in input_features.values())):
+            return None
+        if image_path and not os.path.isfile(image_path):
+            return None
+
+        if image_path:
+            image_hash = file_sha256(image_path)
+        elif image_array is not None:
+            image_hash = hashlib.sha256(np.ascontiguousarray(image_array, dtype=np.float32).tobytes()).hexdigest()
+        else:
+            image_hash = None
+
+        # Cechy o tej samej wartości liczbowej dają ten sam klucz niezależnie od kolejności i typu (int/float)
+        features = sorted((name, round(float(value), 6)) for name, value in (input_features or {}).items())
+        key = {
+            "image": image_hash,
+            "features": features,
+            "weights": [self.weight_image, self.weight_features],
+            "model": self.model_version(),
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def combine_top_5(self, features_predictions: list, image_predictions: list) -> list:
+        """
+        Wybiera 5 najlepszych zwierząt z gotowych predykcji obu klasyfikatorów.
+        args:
+            features_predictions: list - Lista [(zwierzę, prawdopodobieństwo)] z klasyfikatora cech (może być pusta)
+            image_predictions: list - Lista [(zwierzę, prawdopodobieństwo)] z klasyfikatora obrazów (może być pusta)
+        return:
+            list - Lista 5 najbardziej prawdopodobnych zwierząt
+        """
         # Jeśli brakuje danych do jednej z klasyfikacji, użyj tylko dostępnych predykcji
         if not image_predictions:
             return features_predictions[:5]
@@ -69,4 +158,5 @@ class AnimalPredictor:
             return image_predictions[:5]
 
         # Łącz predykcje, dając większą wagę klasyfikatorowi obrazów
-        return self.combine_predictions(features_predictions, image_predictions)
+        with get_metrics().span("fusion"):
+            return self.combine_predictions(features_predictions, image_predictions, weight_image=self.weight_image, weight_features=self.weight_features)
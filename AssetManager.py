@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+
+class Asset:
+    def __init__(self, name: str, fetch, present=None):
+        """
+        Zasób aplikacji pobierany lub przygotowywany w tle.
+        args:
+            name: str - Nazwa zasobu
+            fetch: callable() - Funkcja pobierająca lub wczytująca zasób
+            present: callable() -> bool - Sprawdza, czy zasób jest już dostępny (wtedy fetch nie jest wywoływane)
+        """
+        self.name = name
+        self.fetch = fetch
+        self.present = present
+        self.state = "pending"  # pending, loading, ready, failed
+        self.error = None
+        self.duration = None
+        self.event = threading.Event()
+
+class AssetManager:
+    def __init__(self, logger: logging.Logger, max_workers: int = 4):
+        """
+        Równoległe pobieranie zasobów aplikacji w tle, ze stanem gotowości każdego zasobu.
+        Interfejs nie czeka na pobieranie - czeka tylko akcja, która potrzebuje brakującego zasobu.
+        args:
+            logger: logging.Logger - Wspólny logger
+            max_workers: int - Największa liczba zasobów pobieranych jednocześnie
+        """
+        self.logger = logger
+        self._assets = {}
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max_workers)
+        self._closed = False
+
+    def register(self, name: str, fetch, present=None):
+        """
+        Rejestruje zasób. Pobieranie rozpoczyna dopiero request.
+        """
+        with self._lock:
+            self._assets[name] = Asset(name, fetch, present)
+
+    def request(self, *names):
+        """
+        Rozpoczyna w tle pobieranie podanych zasobów (domyślnie wszystkich), które nie są gotowe ani w trakcie pobierania.
+        Zasoby, których pobranie się nie powiodło, są pobierane ponownie.
+        """
+        with self._lock:
+            for name in names or list(self._assets):
+                asset = self._assets[name]
+                if asset.state in ("pending", "failed"):
+                    asset.state = "loading"
+                    asset.error = None
+                    asset.event.clear()
+                    # Wątki w tle (daemon) nie blokują zamknięcia aplikacji w trakcie pobierania
+                    threading.Thread(target=self._fetch, args=(asset,), name=f"asset-{name}", daemon=True).start()
+
+    def _fetch(self, asset: Asset):
+        with self._slots:
+            if self._closed:
+                return
+            self._fetch_now(asset)
+
+    def _fetch_now(self, asset: Asset):
+        start = time.perf_counter()
+        try:
+            if asset.present is None or not asset.present():
+                self.logger.info("Pobieranie zasobu w tle: %s", asset.name)
+                asset.fetch()
+            asset.duration = time.perf_counter() - start
+            asset.state = "ready"
+            self.logger.info("Zasób %s gotowy po %.2f s.", asset.name, asset.duration)
+        except Exception as e:
+            asset.error = e
+            asset.state = "failed"
+            self.logger.error("Nie udało się przygotować zasobu %s: %s", asset.name, str(e))
+        finally:
+            asset.event.set()
+
+    def state(self, name: str) -> str:
+        return self._assets[name].state
+
+    def is_ready(self, name: str) -> bool:
+        return self._assets[name].state == "ready"
+
+    def status(self) -> dict:
+        """
+        Zwraca stan wszystkich zasobów ({nazwa: stan}).
+        """
+        return {name: asset.state for name, asset in self._assets.items()}
+
+    def wait(self, name: str, timeout: float = None) -> bool:
+        """
+        Czeka na zasób, rozpoczynając jego pobieranie, jeśli jeszcze nie trwa.
+        args:
+            name: str - Nazwa zasobu
+            timeout: float - Najdłuższy czas oczekiwania w sekundach (None - bez limitu)
+        return:
+            bool - True, jeśli zasób jest gotowy, False po upływie czasu oczekiwania
+        """
+        asset = self._assets[name]
+        if asset.state != "ready":
+            self.request(name)
+        if not asset.event.wait(timeout):
+            return False
+        if asset.state == "failed":
+            raise RuntimeError(f"Zasób {name} jest niedostępny: {asset.error}")
+        return True
+
+    def shutdown(self):
+        """
+        Zatrzymuje pobieranie zasobów, które jeszcze się nie rozpoczęło.
+        """
+        self._closed = True
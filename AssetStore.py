@@ -0,0 +1,534 @@
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import requests
+from ImageShardCache import file_sha256
+from Metrics import get_metrics
+
+# Pliki aplikacji na Google Drive (nazwa pliku w magazynie -> id pliku)
+DRIVE_FILE_IDS = {
+    "animal_db.sqlite": "179GmVjydVw8D9RqUB1hQ2FPq6JRYURv3",
+    "drive_images.zip": "15SPPgjtECp5FWawf2z_lWKhvlpy6EnMU",
+    "drive_best_images.zip": "19Png8-wztFJNBv9AOEKfu_MrAc4PVWAK",
+    "logo.png": "1-hoa5_PiXkpNEBVcFSxP2d3A_uSNh5Ai",
+    "wstep_rodo.txt": "1xRdUwaccOD0nfoZ4LY9C7u3UPst2y2Pr",
+    "opisy.txt": "1iX8wOVqkG9INQHYEsPLT43JfbUlMREPK",
+}
+
+MIRROR_MANIFEST = "manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+class NotModified(Exception):
+    """
+    Zasób w źródle nie zmienił się od ostatniego pobrania.
+    """
+
+class HttpBackend:
+    def __init__(self, base_url: str, timeout: float = 60):
+        """
+        Źródło plików pod zwykłym adresem HTTP (lustro): plik "nazwa" jest pod adresem base_url/nazwa.
+        Opcjonalny plik manifest.json ({nazwa: sha256}) pozwala pominąć pobieranie niezmienionych plików.
+        args:
+            base_url: str - Adres katalogu lustra
+            timeout: float - Limit czasu połączenia w sekundach
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def describe(self) -> str:
+        return self.base_url
+
+    def url(self, name: str, source_id: str = None) -> str:
+        return f"{self.base_url}/{name}"
+
+    def manifest(self) -> dict:
+        """
+        Zwraca manifest lustra lub None, jeśli lustro go nie udostępnia. Błędy połączenia są przekazywane dalej,
+        żeby chwilowa awaria nie była traktowana jak brak manifestu.
+        """
+        response = requests.get(self.url(MIRROR_MANIFEST), timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def download(self, name: str, destination, offset: int = 0, validators: dict = None, source_id: str = None, on_start=None) -> dict:
+        """
+        Pobiera plik strumieniowo, dopisując do destination od bajtu offset, jeśli serwer obsługuje wznawianie.
+        args:
+            destination: plik binarny - Plik docelowy ustawiony na pozycji offset
+            offset: int - Liczba bajtów pobranych wcześniej
+            validators: dict - "etag" i "last_modified" poprzedniej wersji (żądanie warunkowe)
+            on_start: callable(dict) - Wywoływane z walidatorami pobieranej wersji przed zapisem danych
+        return:
+            dict - {"etag", "last_modified", "resumed"}
+        """
+        headers = {}
+        validators = validators or {}
+        if offset and validators.get("etag"):
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validators["etag"]
+        elif offset:
+            headers["Range"] = f"bytes={offset}-"
+        elif validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        elif validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        with requests.get(self.url(name, source_id), headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304:
+                raise NotModified(name)
+            response.raise_for_status()
+            if "text/html" in response.headers.get("Content-Type", "") and not name.endswith((".html", ".htm")):
+                raise ConnectionError(f"Zamiast pliku {name} serwer zwrócił stronę HTML.")
+
+            resumed = response.status_code == 206
+            info = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"), "resumed": resumed}
+            if not resumed:
+                destination.seek(0)
+                destination.truncate()
+            if on_start:
+                on_start(info)
+            for chunk in response.iter_content(CHUNK_SIZE):
+                destination.write(chunk)
+            return info
+
+class DriveBackend(HttpBackend):
+    def __init__(self, file_ids: dict = None, timeout: float = 60):
+        """
+        Źródło plików na Google Drive (pliki udostępnione publicznie, wg id).
+        args:
+            file_ids: dict - Nazwy plików i ich id na Google Drive (domyślnie DRIVE_FILE_IDS)
+            timeout: float - Limit czasu połączenia w sekundach
+        """
+        super().__init__("https://drive.usercontent.google.com/download", timeout=timeout)
+        self.file_ids = dict(file_ids or DRIVE_FILE_IDS)
+
+    def describe(self) -> str:
+        return "Google Drive"
+
+    def url(self, name: str, source_id: str = None) -> str:
+        file_id = source_id or self.file_ids.get(name)
+        if file_id is None:
+            raise ValueError(f"Nieznany plik na Google Drive: {name}")
+        # confirm=t pomija stronę z ostrzeżeniem o braku skanowania dużych plików
+        return f"{self.base_url}?id={file_id}&export=download&confirm=t"
+
+    def manifest(self) -> dict:
+        return None
+
+class LocalBackend:
+    def __init__(self, directory: str):
+        """
+        Źródło plików w lokalnym folderze (np. lustro dla kiosków bez internetu i środowisk testowych).
+        args:
+            directory: str - Folder z plikami i opcjonalnym manifest.json
+        """
+        self.directory = directory
+
+    def describe(self) -> str:
+        return self.directory
+
+    def manifest(self) -> dict:
+        manifest_path = os.path.join(self.directory, MIRROR_MANIFEST)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            return json.load(manifest_file)
+
+    def download(self, name: str, destination, offset: int = 0, validators: dict = None, source_id: str = None, on_start=None) -> dict:
+        source_path = os.path.join(self.directory, name)
+        stat = os.stat(source_path)
+        etag = f"{stat.st_mtime_ns}-{stat.st_size}"
+        if validators and validators.get("etag") == etag and not offset:
+            raise NotModified(name)
+
+        resumed = bool(offset) and validators is not None and validators.get("etag") == etag
+        info = {"etag": etag, "last_modified": email.utils.formatdate(stat.st_mtime, usegmt=True), "resumed": resumed}
+        with open(source_path, "rb") as source:
+            if resumed:
+                source.seek(offset)
+            else:
+                destination.seek(0)
+                destination.truncate()
+            if on_start:
+                on_start(info)
+            shutil.copyfileobj(source, destination, CHUNK_SIZE)
+        return info
+
+class StreamInterrupted(Exception):
+    """
+    Pobieranie przesyłane strumieniowo nie zostało dokończone (lub plik nie był pobierany).
+    """
+
+class _BytePipe:
+    def __init__(self, max_chunks: int = 64):
+        """
+        Ograniczony bufor między wątkiem pobierającym (write) a wątkiem czytającym (read).
+        """
+        self._chunks = queue.Queue(maxsize=max_chunks)
+        self._pending = b""
+        self._error = None
+        self._finished = False
+        self._reader_closed = False
+        self.fed = False
+        self.completed = False
+
+    def write(self, data: bytes):
+        if data and not self._reader_closed:
+            self.fed = True
+            self._chunks.put(bytes(data))
+
+    def close(self, error: Exception = None):
+        self._chunks.put(error or StopIteration())
+
+    def close_reader(self):
+        self._reader_closed = True
+        # Zwolnienie miejsca, jeśli wątek pobierający czeka na zapis
+        try:
+            while True:
+                self._chunks.get_nowait()
+        except queue.Empty:
+            pass
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._finished and (size < 0 or len(self._pending) < size):
+            item = self._chunks.get()
+            if isinstance(item, StopIteration):
+                self._finished = True
+            elif isinstance(item, BaseException):
+                self._finished = True
+                self._error = item
+            else:
+                self._pending += item
+        if self._error is not None and not self._pending:
+            raise self._error
+        if size < 0:
+            size = len(self._pending)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+class _TeeFile:
+    def __init__(self, destination, sink):
+        self.destination = destination
+        self.sink = sink
+
+    def write(self, data: bytes):
+        self.destination.write(data)
+        self.sink.write(data)
+
+    def seek(self, *args):
+        return self.destination.seek(*args)
+
+    def truncate(self, *args):
+        return self.destination.truncate(*args)
+
+def create_backend(source: str):
+    """
+    Tworzy źródło plików na podstawie opisu: "drive", adres http(s):// lub ścieżka do folderu.
+    """
+    if source in (None, "", "drive"):
+        return DriveBackend()
+    if source.startswith(("http://", "https://")):
+        return HttpBackend(source)
+    if os.path.isdir(source):
+        return LocalBackend(source)
+    raise ValueError(f"Nieznane źródło plików: {source}")
+
+class AssetStore:
+    def __init__(self, cache_dir: str, logger: logging.Logger, backend=None, refresh_interval: float = None):
+        """
+        Lokalna pamięć plików pobieranych ze źródła (Google Drive, lustro HTTP lub folder).
+        Pliki są przechowywane wg skrótu SHA-256 zawartości (objects/ab/abcd...), a manifest wiąże nazwę
+        pliku ze skrótem i walidatorami HTTP, więc niezmienione pliki nigdy nie są pobierane ponownie.
+        args:
+            cache_dir: str - Folder pamięci plików
+            logger: logging.Logger - Wspólny logger
+            backend: HttpBackend | DriveBackend | LocalBackend - Źródło plików (domyślnie Google Drive)
+            refresh_interval: float - Co ile sekund sprawdzać, czy plik w źródle się zmienił (None - tylko na żądanie)
+        """
+        self.cache_dir = cache_dir
+        self.logger = logger
+        self.backend = backend or DriveBackend()
+        self.refresh_interval = refresh_interval
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self._lock = threading.Lock()
+        self._name_locks = {}
+        self._remote_manifest = None
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> dict:
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as manifest_file:
+                    return json.load(manifest_file)
+            except (OSError, ValueError) as e:
+                self.logger.warning("Nie udało się wczytać manifestu pobranych plików: %s", str(e))
+        return {}
+
+    def _save_manifest(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=1)
+        os.replace(temp_path, self.manifest_path)
+
+    def _name_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            return self._name_locks.setdefault(name, threading.Lock())
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "objects", digest[:2], digest)
+
+    def _partial_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, "partial", hashlib.sha256(name.encode("utf-8")).hexdigest()[:16] + ".part")
+
+    def _expected_sha256(self, name: str, reload: bool = False) -> str:
+        """
+        Zwraca skrót pliku z manifestu źródła (None, jeśli nieznany). Manifest jest wczytywany ponownie przy
+        odświeżaniu (reload); nieudane wczytanie nie jest zapamiętywane, więc kolejne wywołanie spróbuje znowu.
+        """
+        if self._remote_manifest is None or reload:
+            try:
+                self._remote_manifest = self.backend.manifest() or {}
+            except Exception as e:
+                self.logger.warning("Nie udało się wczytać manifestu źródła %s: %s", self.backend.describe(), str(e))
+                self._remote_manifest = None
+                return None
+        return self._remote_manifest.get(name)
+
+    def cached_path(self, name: str) -> str:
+        """
+        Zwraca ścieżkę pliku w pamięci lub None, jeśli plik nie był pobrany.
+        """
+        entry = self.manifest.get(name)
+        if entry is None:
+            return None
+        object_path = self.object_path(entry["sha256"])
+        if not os.path.exists(object_path) or os.path.getsize(object_path) != entry["size"]:
+            return None
+        return object_path
+
+    def get(self, name: str, refresh: bool = False, source_id: str = None, sink=None) -> str:
+        """
+        Zwraca ścieżkę lokalnej, zweryfikowanej kopii pliku, pobierając go tylko wtedy, gdy jest to potrzebne.
+        Jeśli źródło jest niedostępne, a plik był już pobrany, używana jest kopia lokalna.
+        args:
+            name: str - Nazwa pliku (np. "animal_db.sqlite")
+            refresh: bool - Czy sprawdzić w źródle, czy plik się zmienił
+            source_id: str - Id pliku w źródle, jeśli inne niż domyślne (np. id na Google Drive)
+            sink: obiekt z metodą write - Otrzymuje kopię pobieranych bajtów (używane przez stream_to)
+        return:
+            str - Ścieżka do pliku w pamięci (tylko do odczytu)
+        """
+        with self._name_lock(name):
+            cached = self.cached_path(name)
+            entry = self.manifest.get(name)
+            if cached and not refresh:
+                stale = self.refresh_interval is not None and time.time() - entry.get("checked", 0) > self.refresh_interval
+                if not stale:
+                    get_metrics().increment("asset_requests", result="cached")
+                    return cached
+
+            # Przy odświeżaniu (refresh lub upływ refresh_interval) manifest źródła jest czytany na nowo
+            expected = self._expected_sha256(name, reload=cached is not None)
+            if expected and os.path.exists(self.object_path(expected)):
+                # Zawartość o tym skrócie jest już w pamięci (np. ten sam plik pod inną nazwą)
+                self._record(name, expected, os.path.getsize(self.object_path(expected)), entry or {})
+                if entry and entry["sha256"] != expected:
+                    self._remove_object_if_unused(entry["sha256"])
+                return self.object_path(expected)
+
+            try:
+                with get_metrics().span("asset_download", asset=name):
+                    path = self._download(name, cached and entry, expected, source_id, sink)
+                get_metrics().increment("asset_requests", result="downloaded")
+                return path
+            except NotModified:
+                get_metrics().increment("asset_requests", result="not_modified")
+                self.logger.info("Plik %s nie zmienił się w źródle.", name)
+                self._record(name, entry["sha256"], entry["size"], entry)
+                return cached
+            except Exception as e:
+                if cached:
+                    get_metrics().increment("asset_requests", result="offline_copy")
+                    self.logger.warning("Nie udało się sprawdzić pliku %s w źródle (%s) - używana jest kopia lokalna.", name, str(e))
+                    return cached
+                raise
+
+    def _record(self, name: str, digest: str, size: int, validators: dict):
+        with self._lock:
+            self.manifest[name] = {
+                "sha256": digest,
+                "size": size,
+                "etag": validators.get("etag"),
+                "last_modified": validators.get("last_modified"),
+                "checked": time.time(),
+            }
+            self._save_manifest()
+
+    def _download(self, name: str, previous: dict, expected: str, source_id: str, sink=None) -> str:
+        partial_path = self._partial_path(name)
+        partial_state_path = partial_path + ".json"
+        os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+
+        # Wznawiane jest tylko przerwane pobieranie wersji o znanym ETag (serwer sprawdza go w If-Range)
+        validators = previous or {}
+        offset = 0
+        if os.path.exists(partial_path) and os.path.exists(partial_state_path):
+            with open(partial_state_path, "r", encoding="utf-8") as state_file:
+                partial_validators = json.load(state_file)
+            if partial_validators.get("etag"):
+                validators = partial_validators
+                offset = os.path.getsize(partial_path)
+
+        def save_partial_state(info):
+            with open(partial_state_path, "w", encoding="utf-8") as state_file:
+                json.dump({"etag": info.get("etag"), "last_modified": info.get("last_modified")}, state_file)
+            if sink is not None and info.get("resumed"):
+                # Czytający strumień dostaje najpierw część pobraną wcześniej
+                with open(partial_path, "rb") as downloaded:
+                    remaining = offset
+                    while remaining:
+                        chunk = downloaded.read(min(remaining, CHUNK_SIZE))
+                        sink.write(chunk)
+                        remaining -= len(chunk)
+
+        self.logger.info("Pobieranie %s z %s%s...", name, self.backend.describe(), f" (wznowienie od {offset} B)" if offset else "")
+        start = time.perf_counter()
+        with open(partial_path, "ab+") as destination:
+            destination.seek(offset)
+            target = _TeeFile(destination, sink) if sink is not None else destination
+            info = self.backend.download(name, target, offset=offset, validators=validators, source_id=source_id, on_start=save_partial_state)
+
+        digest = file_sha256(partial_path)
+        size = os.path.getsize(partial_path)
+        os.remove(partial_state_path)
+        if expected and digest != expected:
+            os.remove(partial_path)
+            raise ValueError(f"Suma kontrolna pliku {name} nie zgadza się z manifestem źródła.")
+
+        object_path = self.object_path(digest)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        if os.path.exists(object_path):
+            os.remove(partial_path)
+        else:
+            os.replace(partial_path, object_path)
+
+        self._record(name, digest, size, info)
+        get_metrics().increment("asset_download_bytes", size - offset if info.get("resumed") else size, asset=name)
+        if sink is not None:
+            sink.completed = True
+        self.logger.info("Pobrano %s (%.1f MB, sha256 %s) w %.1f s.", name, size / 1e6, digest[:12], time.perf_counter() - start)
+        if previous and previous["sha256"] != digest:
+            self._remove_object_if_unused(previous["sha256"])
+        return object_path
+
+    def _remove_object_if_unused(self, digest: str):
+        with self._lock:
+            if any(entry["sha256"] == digest for entry in self.manifest.values()):
+                return
+            object_path = self.object_path(digest)
+            if os.path.exists(object_path):
+                os.remove(object_path)
+
+    def stream_to(self, name: str, consumer, refresh: bool = False, source_id: str = None):
+        """
+        Przekazuje zawartość pliku do consumer w trakcie pobierania (w osobnym wątku), bez czekania na koniec pobierania.
+        Jeśli plik nie jest pobierany (jest w pamięci) albo pobieranie się nie powiedzie, consumer czyta kopię lokalną.
+        args:
+            name: str - Nazwa pliku
+            consumer: callable(plik binarny) - Funkcja czytająca strumień metodą read(n)
+            refresh: bool - Czy sprawdzić w źródle, czy plik się zmienił
+            source_id: str - Id pliku w źródle, jeśli inne niż domyślne
+        return:
+            Wynik consumer
+        """
+        pipe = _BytePipe()
+        result = {}
+
+        def consume():
+            try:
+                result["value"] = consumer(pipe)
+            except BaseException as e:
+                result["error"] = e
+            finally:
+                pipe.close_reader()
+
+        thread = threading.Thread(target=consume, name=f"stream-{name}", daemon=True)
+        thread.start()
+        try:
+            path = self.get(name, refresh=refresh, source_id=source_id, sink=pipe)
+        except BaseException as e:
+            pipe.close(e)
+            thread.join()
+            raise
+        pipe.close(None if pipe.completed else StreamInterrupted(name))
+        thread.join()
+
+        if pipe.completed:
+            if "error" in result:
+                raise result["error"]
+            return result["value"]
+
+        if pipe.fed:
+            self.logger.warning("Pobieranie %s nie zostało dokończone - używana jest kopia lokalna.", name)
+        with open(path, "rb") as local_file:
+            return consumer(local_file)
+
+    def copy_to(self, name: str, destination: str, refresh: bool = False, source_id: str = None) -> str:
+        """
+        Kopiuje plik z pamięci pod wskazaną ścieżkę (np. logo.png w folderze aplikacji), jeśli kopia się różni.
+        return:
+            str - Ścieżka docelowa
+        """
+        object_path = self.get(name, refresh=refresh, source_id=source_id)
+        entry = self.manifest[name]
+        if not (os.path.exists(destination) and os.path.getsize(destination) == entry["size"] and file_sha256(destination) == entry["sha256"]):
+            temp_path = destination + ".tmp"
+            shutil.copyfile(object_path, temp_path)
+            os.replace(temp_path, destination)
+        return destination
+
+    def export_mirror(self, directory: str, names: list = None):
+        """
+        Zapisuje pobrane pliki z manifestem SHA-256 jako lustro do użycia przez LocalBackend lub HttpBackend.
+        args:
+            directory: str - Folder lustra
+            names: list - Nazwy plików (domyślnie wszystkie pobrane)
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest = {}
+        for name in names or list(self.manifest):
+            shutil.copyfile(self.get(name), os.path.join(directory, name))
+            manifest[name] = self.manifest[name]["sha256"]
+        with open(os.path.join(directory, MIRROR_MANIFEST), "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, indent=1)
+        self.logger.info("Zapisano lustro %d plików w %s.", len(manifest), directory)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_asset_store(local_path: str, logger: logging.Logger, source: str = None, **options) -> AssetStore:
+    """
+    Zwraca pamięć plików wspólną dla całego procesu.
+    args:
+        local_path: str - Lokalna ścieżka do zapisu danych (pamięć jest w local_path/cache/assets)
+        logger: logging.Logger - Wspólny logger
+        source: str - Źródło plików: "drive" (domyślnie), adres lustra HTTP lub folder; używane przy pierwszym wywołaniu
+        options: dict - Dodatkowe parametry AssetStore
+    return:
+        AssetStore - Wspólna pamięć plików
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AssetStore(os.path.join(local_path, "cache", "assets"), logger, backend=create_backend(source), **options)
+        return _store
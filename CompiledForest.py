@@ -0,0 +1,178 @@
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+
+# Od scikit-learn 1.4 tree_.value zawiera już udziały klas, a predict_proba drzewa ich nie normalizuje
+_NORMALIZE_TREE_VALUES = tuple(int(part) for part in sklearn.__version__.split(".")[:2]) < (1, 4)
+
+class CompiledForest:
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, classes: np.ndarray, max_depth: int, n_features: int,
+                 children: np.ndarray = None, is_leaf: np.ndarray = None):
+        """
+        Las losowy zapisany jako ciągłe tablice NumPy wszystkich węzłów wszystkich drzew.
+        Dzieci liści wskazują na sam liść, więc po max_depth krokach każda ścieżka kończy się w liściu.
+        args:
+            feature: np.ndarray - Indeks cechy porównywanej w węźle
+            threshold: np.ndarray - Próg podziału w węźle
+            left: np.ndarray - Indeks lewego dziecka (globalny dla całego lasu)
+            right: np.ndarray - Indeks prawego dziecka (globalny dla całego lasu)
+            value: np.ndarray - Rozkład prawdopodobieństwa klas w węźle (n_nodes, n_classes)
+            roots: np.ndarray - Indeksy korzeni kolejnych drzew
+            classes: np.ndarray - Nazwy klas w kolejności kolumn value
+            max_depth: int - Największa głębokość drzewa w lesie
+            n_features: int - Liczba cech wejściowych
+            children: np.ndarray - Gotowa tablica dzieci obu stron (np. z pakietu modelu; domyślnie wyliczana)
+            is_leaf: np.ndarray - Gotowa maska liści (np. z pakietu modelu; domyślnie wyliczana)
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+        # Dzieci obu stron w jednej tablicy: children[2 * węzeł + (idź_w_prawo)]
+        self._children = children if children is not None else np.stack([left, right], axis=1).ravel()
+        self._is_leaf = is_leaf if is_leaf is not None else left == np.arange(len(left))
+
+    @classmethod
+    def from_sklearn(cls, forest: RandomForestClassifier) -> "CompiledForest":
+        """
+        Kompiluje wytrenowany RandomForestClassifier do płaskich tablic.
+        args:
+            forest: RandomForestClassifier - Wytrenowany las losowy
+        return:
+            CompiledForest - Skompilowany las
+        """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            # Normalizacja tak jak w DecisionTreeClassifier.predict_proba danej wersji scikit-learn
+            value = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+            if _NORMALIZE_TREE_VALUES:
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            values.append(value)
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(forest.classes_),
+            max_depth=max_depth,
+            n_features=forest.n_features_in_,
+        )
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Przewiduje prawdopodobieństwa klas dla wielu wierszy, przechodząc wszystkie drzewa jednocześnie.
+        Przy dużych paczkach (setki wierszy) implementacja sklearn w Cythonie jest szybsza.
+        args:
+            X: np.ndarray - Macierz cech (n_samples, n_features)
+        return:
+            np.ndarray - Prawdopodobieństwa (n_samples, n_classes)
+        """
+        # Drzewa sklearn porównują cechy rzutowane na float32
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        n_trees = len(self.roots)
+        flat_X = X.ravel()
+
+        # Ścieżki wszystkich par (wiersz, drzewo); w każdym kroku przetwarzane są tylko te, które nie doszły do liścia
+        nodes = np.tile(self.roots, n_samples)
+        row_offsets = np.repeat(np.arange(n_samples) * n_features, n_trees)
+        active = np.arange(nodes.size)
+        for _ in range(self.max_depth):
+            current = nodes[active]
+            internal = ~self._is_leaf[current]
+            active = active[internal]
+            current = current[internal]
+            if active.size == 0:
+                break
+            go_right = ~(flat_X[row_offsets[active] + self.feature[current]] <= self.threshold[current])
+            nodes[active] = self._children[2 * current + go_right]
+        nodes = nodes.reshape(n_samples, n_trees)
+
+        # Sumowanie drzewo po drzewie, w tej samej kolejności co w sklearn
+        proba = np.zeros((n_samples, self.value.shape[1]), dtype=np.float64)
+        for tree in range(n_trees):
+            proba += self.value[nodes[:, tree]]
+        proba /= n_trees
+        return proba
+
+    def predict_proba_row(self, x: np.ndarray) -> np.ndarray:
+        """
+        Przewiduje prawdopodobieństwa klas dla jednego wiersza.
+        args:
+            x: np.ndarray - Wektor cech (n_features,)
+        return:
+            np.ndarray - Prawdopodobieństwa (n_classes,)
+        """
+        x = np.asarray(x, dtype=np.float32)
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            go_right = ~(x[self.feature[nodes]] <= self.threshold[nodes])
+            nodes = self._children[2 * nodes + go_right]
+
+        proba = np.zeros(self.value.shape[1], dtype=np.float64)
+        for leaf in self.value[nodes]:
+            proba += leaf
+        proba /= len(self.roots)
+        return proba
+
+    def verify(self, forest: RandomForestClassifier, X: np.ndarray) -> float:
+        """
+        Porównuje prawdopodobieństwa skompilowanego lasu z predict_proba sklearn.
+        args:
+            forest: RandomForestClassifier - Las, z którego skompilowano tablice
+            X: np.ndarray - Dane kontrolne
+        return:
+            float - Największa bezwzględna różnica (0.0 oznacza pełną zgodność)
+        """
+        expected = forest.predict_proba(X)
+        batch_difference = np.abs(self.predict_proba(X) - expected).max()
+        row_difference = max(np.abs(self.predict_proba_row(row) - expected[i]).max() for i, row in enumerate(X[:32]))
+        return float(max(batch_difference, row_difference))
+
+    def to_arrays(self) -> dict:
+        """
+        Zwraca tablice lasu do zapisania w pakiecie modelu (bez nazw klas, które są w manifeście).
+        """
+        return {
+            "feature": self.feature, "threshold": self.threshold, "left": self.left, "right": self.right,
+            "value": self.value, "roots": self.roots, "children": self._children, "is_leaf": self._is_leaf,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, classes: np.ndarray, max_depth: int, n_features: int) -> "CompiledForest":
+        """
+        Tworzy las z tablic zwróconych przez to_arrays (np. mapowanych w pamięci z pakietu modelu).
+        """
+        return cls(
+            feature=arrays["feature"], threshold=arrays["threshold"], left=arrays["left"], right=arrays["right"],
+            value=arrays["value"], roots=arrays["roots"], classes=classes, max_depth=max_depth, n_features=n_features,
+            children=arrays["children"], is_leaf=arrays["is_leaf"],
+        )
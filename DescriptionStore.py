@@ -0,0 +1,69 @@
+import logging
+import os
+import threading
+import unicodedata
+
+def normalize_name(name: str) -> str:
+    """
+    Normalizuje nazwę zwierzęcia: małe litery, bez polskich znaków i zbędnych spacji ("Jeleń" -> "jelen").
+    """
+    name = " ".join(name.lower().split()).replace("ł", "l")
+    return "".join(char for char in unicodedata.normalize("NFKD", name) if not unicodedata.combining(char))
+
+class DescriptionStore:
+    def __init__(self, logger: logging.Logger, aliases: dict = None):
+        """
+        Pliki tekstowe aplikacji (opisy zwierząt, wstęp i RODO) wczytywane raz i odświeżane tylko po zmianie
+        daty modyfikacji lub rozmiaru pliku.
+        args:
+            logger: logging.Logger - Wspólny logger
+            aliases: dict - Dodatkowe nazwy zwierząt ({nazwa w modelu: nazwa wyświetlana}), np. animal_labels
+        """
+        self.logger = logger
+        self.aliases = aliases or {}
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _load(self, txt_path: str) -> dict:
+        stat = os.stat(txt_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._files.get(txt_path)
+            if cached and cached["signature"] == signature:
+                return cached
+
+            with open(txt_path, "r", encoding="utf-8") as file:
+                lines = [line.strip() for line in file if line.strip()]
+            cached = {"signature": signature, "lines": lines, "descriptions": None}
+            self._files[txt_path] = cached
+            self.logger.info("Wczytano plik %s (%d niepustych linii).", txt_path, len(lines))
+            return cached
+
+    def lines(self, txt_path: str) -> list:
+        """
+        Zwraca niepuste linie pliku (bez białych znaków na końcach).
+        """
+        return self._load(txt_path)["lines"]
+
+    def descriptions(self, txt_path: str) -> dict:
+        """
+        Zwraca opisy z pliku w formacie "nazwa, opis, nazwa, opis..." jako słownik {znormalizowana nazwa: opis}.
+        Opis jest dostępny również pod nazwą z aliases (np. "zolw" i "Żółw").
+        """
+        cached = self._load(txt_path)
+        with self._lock:
+            if cached["descriptions"] is None:
+                lines = cached["lines"]
+                descriptions = {normalize_name(lines[i]): lines[i + 1] for i in range(0, len(lines) - 1, 2)}
+                for name, display_name in self.aliases.items():
+                    for source, target in ((display_name, name), (name, display_name)):
+                        if normalize_name(source) in descriptions:
+                            descriptions.setdefault(normalize_name(target), descriptions[normalize_name(source)])
+                cached["descriptions"] = descriptions
+            return cached["descriptions"]
+
+    def get(self, txt_path: str, animal_name: str) -> str:
+        """
+        Zwraca opis zwierzęcia lub None, jeśli go nie ma.
+        """
+        return self.descriptions(txt_path).get(normalize_name(animal_name))
@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import numpy as np
+from ImageShardCache import file_sha256
+
+class EmbeddingStore:
+    def __init__(self, store_dir: str, logger: logging.Logger):
+        """
+        Trwały magazyn wektorów cech (embeddingów) zdjęć, kluczowany skrótem SHA-256 zawartości pliku.
+        Nowe embeddingi są dopisywane jako kolejne pliki .npy, które są odczytywane przez mapowanie w pamięci.
+        args:
+            store_dir: str - Folder magazynu (osobny dla każdego modelu bazowego)
+            logger: logging.Logger - Wspólny logger
+        """
+        self.store_dir = store_dir
+        self.logger = logger
+        self.index_path = os.path.join(store_dir, "index.json")
+        self.index = self._load_index()
+        self._chunks = {}
+
+    def _load_index(self) -> dict:
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as index_file:
+                    return json.load(index_file)
+            except (OSError, ValueError) as e:
+                self.logger.warning("Nie udało się wczytać indeksu embeddingów: %s", str(e))
+        return {"chunks": 0, "embeddings": {}, "files": {}}
+
+    def _save_index(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            json.dump(self.index, index_file)
+        os.replace(temp_path, self.index_path)
+
+    def _chunk_path(self, chunk: int) -> str:
+        return os.path.join(self.store_dir, f"embeddings_{chunk:04d}.npy")
+
+    def file_hash(self, image_path: str) -> str:
+        """
+        Zwraca skrót SHA-256 pliku; skrót jest liczony ponownie tylko po zmianie daty modyfikacji lub rozmiaru.
+        """
+        stat = os.stat(image_path)
+        known = self.index["files"].get(image_path)
+        if known and known["mtime"] == stat.st_mtime and known["size"] == stat.st_size:
+            return known["sha256"]
+        digest = file_sha256(image_path)
+        self.index["files"][image_path] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": digest}
+        return digest
+
+    def missing(self, hashes: list) -> list:
+        return [digest for digest in dict.fromkeys(hashes) if digest not in self.index["embeddings"]]
+
+    def add(self, hashes: list, embeddings: np.ndarray):
+        """
+        Dopisuje embeddingi nowych zdjęć jako kolejny plik magazynu.
+        args:
+            hashes: list - Skróty plików
+            embeddings: np.ndarray - Embeddingi (n, wymiar) w tej samej kolejności
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        chunk = self.index["chunks"]
+        np.save(self._chunk_path(chunk), np.ascontiguousarray(embeddings, dtype=np.float32))
+        for row, digest in enumerate(hashes):
+            self.index["embeddings"][digest] = [chunk, row]
+        self.index["chunks"] += 1
+        self._save_index()
+
+    def save(self):
+        self._save_index()
+
+    def _chunk(self, chunk: int) -> np.ndarray:
+        if chunk not in self._chunks:
+            self._chunks[chunk] = np.load(self._chunk_path(chunk), mmap_mode="r")
+        return self._chunks[chunk]
+
+    def get(self, hashes: list) -> np.ndarray:
+        """
+        Zwraca embeddingi zdjęć o podanych skrótach.
+        args:
+            hashes: list - Skróty plików
+        return:
+            np.ndarray - Embeddingi (n, wymiar)
+        """
+        locations = [self.index["embeddings"][digest] for digest in hashes]
+        return np.stack([self._chunk(chunk)[row] for chunk, row in locations]).astype(np.float32)
@@ -0,0 +1,240 @@
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import cross_val_score
+
+# Definicja siatki parametrów
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],       # liczba drzew
+    'max_depth': [10, 20, 30],            # maksymalna głębokość drzewa
+    'min_samples_split': [2, 5, 10],      # minimalna liczba próbek do podziału w węźle
+    'min_samples_leaf': [1, 2, 4],        # minimalna liczba próbek w liściu
+    'max_features': ['sqrt', 'log2'],     # liczba cech do rozważenia przy każdym podziale
+}
+
+def _cv_score(params: dict, X, y, cv: int, random_state: int) -> float:
+    model = RandomForestClassifier(random_state=random_state, **params)
+    return float(cross_val_score(model, X, y, cv=cv, scoring='accuracy').mean())
+
+class ForestSearch:
+    def __init__(self, cache_path: str, logger: logging.Logger, param_grid: dict = None, cv: int = 5,
+                 random_state: int = 42, n_jobs: int = -1, warm_start_candidates: int = 6, search_budget: int = None):
+        """
+        Wyszukiwanie parametrów Random Forest z trwałą pamięcią podręczną wyników walidacji krzyżowej.
+        Wyniki są zapisywane dla skrótu (SHA-256) danych treningowych, więc ponowny trening
+        na tych samych danych nie wymaga trenowania żadnego lasu w ramach wyszukiwania.
+        args:
+            cache_path: str - Ścieżka do pliku JSON z wynikami walidacji krzyżowej
+            logger: logging.Logger - Wspólny logger
+            param_grid: dict - Siatka parametrów (domyślnie PARAM_GRID)
+            cv: int - Liczba podzbiorów walidacji krzyżowej
+            random_state: int - Ziarno losowości lasu
+            n_jobs: int - Liczba procesów oceniających konfiguracje
+            warm_start_candidates: int - Liczba najlepszych konfiguracji z poprzednich treningów, które po zmianie
+                                         danych zawsze przechodzą przez pierwszą (najtańszą) rundę successive halving
+            search_budget: int - Największa liczba konfiguracji w pierwszej rundzie po zmianie danych: poprzednie najlepsze
+                                 i losowa próbka reszty siatki (None - cała siatka)
+        """
+        self.cache_path = cache_path
+        self.logger = logger
+        self.param_grid = param_grid or PARAM_GRID
+        self.cv = cv
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.warm_start_candidates = warm_start_candidates
+        self.search_budget = search_budget
+        self._cache = self._load_cache()
+
+    def _load_cache(self) -> dict:
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, "r", encoding="utf-8") as cache_file:
+                    return json.load(cache_file)
+            except (OSError, ValueError) as e:
+                self.logger.warning("Nie udało się wczytać pamięci wyników walidacji: %s", str(e))
+        return {"latest": None, "runs": {}}
+
+    def _save_cache(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as cache_file:
+            json.dump(self._cache, cache_file)
+        os.replace(temp_path, self.cache_path)
+
+    def data_hash(self, X, y) -> str:
+        """
+        Liczy skrót danych treningowych i ustawień walidacji, który jest kluczem pamięci podręcznej.
+        """
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+        digest.update("\x1f".join(map(str, y)).encode("utf-8"))
+        digest.update(f"cv={self.cv};random_state={self.random_state}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _candidates(self, exclude: str = None) -> list:
+        names = [name for name in self.param_grid if name != exclude]
+        return [dict(zip(names, values)) for values in itertools.product(*(self.param_grid[name] for name in names))]
+
+    def _evaluate(self, data_hash: str, configs: list, X, y, resource_key: str, extra_params: dict = None) -> list:
+        """
+        Zwraca wyniki walidacji krzyżowej konfiguracji, licząc tylko te, których nie ma w pamięci podręcznej.
+        args:
+            configs: list - Konfiguracje (klucze pamięci podręcznej)
+            resource_key: str - Opis zasobu, np. "n_estimators=22" lub "full"
+            extra_params: dict - Parametry dodawane do każdej konfiguracji przy trenowaniu (np. n_estimators)
+        """
+        run = self._cache["runs"].setdefault(data_hash, {"created": time.time(), "scores": {}})
+        keys = [json.dumps(params, sort_keys=True) for params in configs]
+        missing = [(key, params) for key, params in zip(keys, configs) if resource_key not in run["scores"].get(key, {})]
+
+        if missing:
+            scores = Parallel(n_jobs=self.n_jobs)(
+                delayed(_cv_score)(dict(params, **(extra_params or {})), X, y, self.cv, self.random_state) for _, params in missing
+            )
+            for (key, _), score in zip(missing, scores):
+                run["scores"].setdefault(key, {})[resource_key] = score
+            self._save_cache()
+
+        self.logger.info("Ocena %d konfiguracji (%s): %d z pamięci podręcznej, %d obliczonych.", len(configs), resource_key, len(configs) - len(missing), len(missing))
+        return [run["scores"][key][resource_key] for key in keys]
+
+    def _warm_start(self, data_hash: str, configs: list, resource: str) -> tuple:
+        """
+        Po zmianie danych wybiera najlepsze konfiguracje ze wszystkich zapisanych treningów. Konfiguracje są
+        porządkowane według największego zasobu, na jakim je oceniono, a potem według średniego wyniku.
+        Przeszukiwana jest nadal cała siatka (lub jej losowa próbka o rozmiarze search_budget) - poprzednie
+        najlepsze konfiguracje tylko nie odpadają w pierwszej rundzie, w której wyniki są najmniej dokładne.
+        return:
+            tuple - (konfiguracje do oceny, klucze konfiguracji przechodzących przez pierwszą rundę)
+        """
+        runs = {key: run for key, run in self._cache["runs"].items() if key != data_hash}
+        if not runs:
+            return configs, set()
+
+        def furthest_round(scores):
+            rounds = [(int(key.partition("=")[2]), score) for key, score in scores.items() if key.partition("=")[0] == resource]
+            return max(rounds) if rounds else None
+
+        results = {}
+        for run in runs.values():
+            for key, scores in run["scores"].items():
+                if furthest_round(scores):
+                    results.setdefault(key, []).append(furthest_round(scores))
+        ranked = sorted(((max(amount for amount, _ in rounds), float(np.mean([score for _, score in rounds]))), key)
+                        for key, rounds in results.items())[::-1]
+        keys = [json.dumps(params, sort_keys=True) for params in configs]
+        seeds = [key for _, key in ranked if key in keys][:self.warm_start_candidates]
+
+        if self.search_budget is not None and self.search_budget < len(configs):
+            others = [i for i, key in enumerate(keys) if key not in seeds]
+            sample_size = max(0, self.search_budget - len(seeds))
+            chosen = set(np.random.RandomState(self.random_state).choice(others, size=min(sample_size, len(others)), replace=False).tolist())
+            configs = [params for i, (params, key) in enumerate(zip(configs, keys)) if key in seeds or i in chosen]
+        if seeds:
+            self.logger.info("Dane zmieniły się od ostatniego treningu - %d najlepszych poprzednich konfiguracji przechodzi przez pierwszą rundę (ocenianych: %d).",
+                             len(seeds), len(configs))
+        return configs, set(seeds)
+
+    def grid(self, X, y) -> tuple:
+        """
+        Wyczerpujące przeszukanie siatki parametrów (jak GridSearchCV), z pamięcią podręczną wyników.
+        return:
+            tuple - (najlepsze parametry, najlepsza dokładność walidacji krzyżowej)
+        """
+        data_hash = self.data_hash(X, y)
+        configs = self._candidates()
+        scores = self._evaluate(data_hash, configs, X, y, "full")
+        self._cache["latest"] = data_hash
+        self._save_cache()
+
+        best = int(np.argmax(scores))
+        return configs[best], scores[best]
+
+    def halving(self, X, y, resource: str = "n_estimators", factor: int = 3) -> tuple:
+        """
+        Successive halving: wszystkie konfiguracje są oceniane tanio, a do kolejnej rundy przechodzi
+        najlepsza 1/factor z nich, z factor razy większym zasobem.
+        args:
+            resource: str - "n_estimators" (liczba drzew) lub "samples" (część danych treningowych)
+            factor: int - Współczynnik redukcji kandydatów i wzrostu zasobu
+        return:
+            tuple - (najlepsze parametry, najlepsza dokładność walidacji krzyżowej)
+        """
+        data_hash = self.data_hash(X, y)
+        X = np.asarray(X)
+        y = np.asarray(y)
+
+        if resource == "n_estimators":
+            configs = self._candidates(exclude="n_estimators")
+            max_resource = max(self.param_grid["n_estimators"])
+        elif resource == "samples":
+            configs = self._candidates()
+            max_resource = len(y)
+        else:
+            raise ValueError(f"Nieznany zasób: {resource}")
+
+        configs, seeds = self._warm_start(data_hash, configs, resource)
+
+        n_rounds = 1
+        remaining = len(configs)
+        while remaining > factor:
+            remaining //= factor
+            n_rounds += 1
+        order = np.random.RandomState(self.random_state).permutation(len(y))
+
+        for round_index in range(n_rounds):
+            scale = factor ** (n_rounds - 1 - round_index)
+            if resource == "n_estimators":
+                amount = max(10, max_resource // scale)
+                extra_params = {"n_estimators": amount}
+                round_X, round_y = X, y
+            else:
+                amount = max(self.cv * 10, len(y) // scale)
+                extra_params = {}
+                subset = np.sort(order[:amount])
+                round_X, round_y = X[subset], y[subset]
+            scores = self._evaluate(data_hash, configs, round_X, round_y, f"{resource}={amount}", extra_params)
+
+            if round_index == n_rounds - 1:
+                break
+            keep = max(1, len(configs) // factor)
+            ranking = list(np.argsort(scores, kind="stable")[::-1][:keep])
+            if round_index == 0:
+                ranking += [i for i, params in enumerate(configs) if json.dumps(params, sort_keys=True) in seeds and i not in ranking]
+            configs = [configs[i] for i in ranking]
+
+        self._cache["latest"] = data_hash
+        self._save_cache()
+
+        best = int(np.argmax(scores))
+        return dict(configs[best], **extra_params), scores[best]
+
+    def fit_best(self, X, y, mode: str = "halving", **halving_options) -> RandomForestClassifier:
+        """
+        Wyszukuje najlepsze parametry i trenuje na nich las na całym zbiorze treningowym.
+        args:
+            mode: str - "grid" (pełna siatka) lub "halving" (successive halving)
+        return:
+            RandomForestClassifier - Najlepszy model
+        """
+        start = time.perf_counter()
+        if mode == "grid":
+            best_params, best_score = self.grid(X, y)
+        elif mode == "halving":
+            best_params, best_score = self.halving(X, y, **halving_options)
+        else:
+            raise ValueError(f"Nieznany tryb wyszukiwania: {mode}")
+
+        self.logger.info("Najlepsze parametry: %s", best_params)
+        self.logger.info("Najlepsza dokladnosc walidacji krzyzowej: %s", best_score)
+        self.logger.info("Wyszukiwanie parametrów (%s) zajęło %.1f s.", mode, time.perf_counter() - start)
+
+        model = RandomForestClassifier(random_state=self.random_state, **best_params)
+        model.fit(X, y)
+        return model
@@ -1,32 +1,18 @@
-from AnimalFeaturesClassifier import AnimalFeaturesClassifier
-from AnimalImageClassifier import AnimalImageClassifier
-from AnimalPredictor import AnimalPredictor
+from ModelRegistry import get_model_registry
+from AnalysisWorker import AnalysisWorker, AnalysisAborted
+from ImagePipeline import ImagePipeline
+from AssetManager import AssetManager
+from AssetStore import get_asset_store
+from StreamingZipExtractor import StreamingZipExtractor
+from DescriptionStore import DescriptionStore
+from ReportEngine import ReportEngine
 
-import gdown
-import zipfile
 
 from PIL import Image, ImageTk
-import cv2
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 import os
 
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from reportlab.platypus import Paragraph, Frame
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.enums import TA_CENTER
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-
-from datetime import datetime
-NOW = datetime.now()
-FORMATTED_DATE = NOW.strftime("%Y-%m-%d %H:%M")
-FORMATTED_FILENAME_DATE = NOW.strftime("%Y-%m-%d_%H%M")
-
-import base64
-
 class AnimalClassifierApp:
     def __init__(self, root, logger, path):
 
@@ -64,61 +50,96 @@ class AnimalClassifierApp:
             "zyrafa": "Żyrafa"
             }
 
+        self.asset_store = get_asset_store(self.path, self.logger)
+        self.model_registry = get_model_registry(self.path, self.logger)
+        self.image_pipeline = ImagePipeline(self.logger)
+        self.description_store = DescriptionStore(self.logger, aliases=self.animal_labels)
+        self.report_engine = ReportEngine(self.path, self.logger, self.animal_labels, self.get_animal_description)
         self.feature_classifier = None
         self.image_classifier = None
         self.combined_classifier = None
+        self.analysis_worker = None
         self.selected_image_path = None
         self.feature_sliders = {}
         self.input_features = {}
+
+        # Wszystkie zasoby są pobierane równolegle w tle; strona startowa nie czeka na pobieranie.
+        # Pliki strony startowej są pobierane od razu, a modele (TensorFlow, scikit-learn) dopiero po jej wyświetleniu.
+        self.assets = AssetManager(self.logger)
+        self.register_assets()
+
         self.create_start_page()
+        self.root.after_idle(self.assets.request)
+
+    def register_assets(self):
+        """
+        Rejestruje zasoby aplikacji: pliki strony startowej, modele i zdjęcia zwierząt.
+        """
+        best_images_path = os.path.join(self.path, "najlepsze_zdjecia")
+        self.assets.register("logo", self.download_logo, present=lambda: os.path.exists(self.logo_path))
+        self.assets.register("wstep_rodo", lambda: self.download_file("wstep_rodo.txt", self.wstep_rodo_path),
+                             present=lambda: os.path.exists(self.wstep_rodo_path))
+        self.assets.register("opisy", lambda: self.download_file("opisy.txt", self.opisy_path),
+                             present=lambda: os.path.exists(self.opisy_path))
+        self.assets.register("features_model", lambda: self.model_registry.get_features_classifier(warmup=True, refresh_data=True))
+        self.assets.register("image_model", lambda: self.model_registry.get_image_classifier(warmup=True))
+        self.assets.register("najlepsze_zdjecia", self.download_best_images_from_drive, present=lambda: os.path.exists(best_images_path))
+
+    def wait_for_assets(self, check_cancelled, *names):
+        """
+        Czeka w wątku analizy na podane zasoby, sprawdzając przy tym, czy analiza nie została anulowana.
+        args:
+            check_cancelled: callable - Funkcja check_cancelled analizy, która czeka (z jej kontekstu)
+            names: str - Nazwy zasobów
+        """
+        for name in names:
+            while not self.assets.wait(name, timeout=0.1):
+                check_cancelled()
+
+    def when_assets_ready(self, widget, names, on_ready, on_failed):
+        """
+        Wywołuje on_ready (lub on_failed) w wątku Tk, gdy zasoby zostaną pobrane, o ile widżet nadal istnieje.
+        """
+        if not widget.winfo_exists():
+            return
+        states = [self.assets.state(name) for name in names]
+        if all(state == "ready" for state in states):
+            on_ready()
+        elif "failed" in states:
+            on_failed()
+        else:
+            self.root.after(100, lambda: self.when_assets_ready(widget, names, on_ready, on_failed))
 
     def download_logo(self):
         """
         Pobieranie logo aplikacji.
         """
-        logo_url = "https://drive.google.com/uc?id=1-hoa5_PiXkpNEBVcFSxP2d3A_uSNh5Ai"
-        gdown.download(logo_url, self.logo_path, quiet=False)
+        self.download_file("logo.png", self.logo_path)
 
-    def download_file(self, url, output):
+    def download_file(self, name, output):
         """
-        Pobieranie pliku z podanego URL-a.
+        Pobieranie pliku o podanej nazwie ze źródła plików (przez lokalną pamięć pobranych plików).
         """
-        gdown.download(url, output, quiet=False)
+        self.asset_store.copy_to(name, output)
 
     def get_app_description(self, txt_path):
         """
         Odczytanie wstępu (pierwszego akapitu) z pliku tekstowego.
         """
-        lines = []
-        with open(txt_path, "r", encoding="utf-8") as file:
-            for line in file:
-                if line.strip():
-                    lines.append(line.strip())
-                if len(lines) == 2:
-                    break
-        return "\n".join(lines)
+        return "\n".join(self.description_store.lines(txt_path)[:2])
 
     def get_rodo_info(self, txt_path):
         """
         Odczytanie trzeciej i czwartej niepustej linii z pliku tekstowego.
         """
-        lines = []
-        with open(txt_path, "r", encoding="utf-8") as file:
-            line_count = 0
-            for line in file:
-                if line.strip():
-                    line_count += 1
-                    if line_count == 3 or line_count == 4:
-                        lines.append(line.strip())
-                if len(lines) == 2:
-                    break
-        return " ".join(lines)
+        return " ".join(self.description_store.lines(txt_path)[2:4])
 
     def create_start_page(self):
         """
         Strona startowa z przyciskami do wyboru trybu analizy.
         """
         self.clear_window()
+        self.assets.request("logo", "wstep_rodo", "opisy")  # Ponowna próba, jeśli wcześniejsze pobieranie się nie powiodło
         
         # Dodanie obszaru Canvas
         canvas = tk.Canvas(self.root, bg="#FFFDEC", width=600, height=760, highlightthickness=0)
@@ -126,51 +147,33 @@ class AnimalClassifierApp:
         canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
         canvas.place(relx=0.5, rely=0.5, anchor="center")
 
-        # Sprawdzenie, czy logo już istnieje
-        if not os.path.exists(self.logo_path):
-            try:
-                self.download_logo()
-            except Exception as e:
-                error_label = tk.Label(scrollable_frame, text="Wystąpił błąd podczas pobierania logo.", font=("Century Schoolbook", 14), fg="red", bg="#FFFDEC")
-                error_label.pack(pady=10)
-                return
-
-        # Sprawdzenie, czy plik wstępu i rodo już istnieje
-        if not os.path.exists(self.wstep_rodo_path):
-            try:
-                txt_url = "https://drive.google.com/uc?id=1xRdUwaccOD0nfoZ4LY9C7u3UPst2y2Pr"
-                self.download_file(txt_url, self.wstep_rodo_path)
-            except Exception as e:
-                error_label = tk.Label(scrollable_frame, text="Wystąpił błąd podczas pobierania plików.", font=("Century Schoolbook", 14), fg="red", bg="#FFFDEC")
-                error_label.pack(pady=10)
-                return
-
-        # Sprawdzenie, czy plik z opisami zwierząt już istnieje
-        if not os.path.exists(self.opisy_path):
-            try:
-                txt_url = "https://drive.google.com/uc?id=1iX8wOVqkG9INQHYEsPLT43JfbUlMREPK"
-                self.download_file(txt_url, self.opisy_path)
-            except Exception as e:
-                error_label = tk.Label(scrollable_frame, text="Wystąpił błąd podczas pobierania plików.", font=("Century Schoolbook", 14), fg="red", bg="#FFFDEC")
-                error_label.pack(pady=10)
-                return
-
-        # Dodawanie logo na górze strony głównej
-        img = Image.open(self.logo_path)
-        img_tk = ImageTk.PhotoImage(img)
-
-        img_label = tk.Label(scrollable_frame, image=img_tk, bg="#FFFDEC")
-        img_label.image = img_tk
+        # Logo i opis są uzupełniane, gdy tylko zostaną pobrane w tle
+        img_label = tk.Label(scrollable_frame, bg="#FFFDEC")
         img_label.pack(pady=(5,0))
+        description_label = tk.Label(scrollable_frame, text="Wczytywanie...", font=("Century Schoolbook", 12), bg="#FFFDEC", fg="#B34C6D", wraplength=600, justify="center")
+        description_label.pack(pady=(0, 10))
+
+        def show_logo():
+            # Dodawanie logo na górze strony głównej
+            img = Image.open(self.logo_path)
+            img_tk = ImageTk.PhotoImage(img)
+            img_label.config(image=img_tk)
+            img_label.image = img_tk
+
+        def show_description():
+            # Dodawanie opisu aplikacji
+            app_description = self.get_app_description(self.wstep_rodo_path)
+            if app_description:
+                description_label.config(text=app_description)
+            else:
+                description_label.config(text="Wystąpił błąd podczas ładowania opisu aplikacji.", font=("Century Schoolbook", 14), fg="red")
 
-        # Dodawanie opisu aplikacji
-        app_description = self.get_app_description(self.wstep_rodo_path)
-        if app_description:
-            text_label = tk.Label(scrollable_frame, text=app_description, font=("Century Schoolbook", 12), bg="#FFFDEC", fg="#B34C6D", wraplength=600, justify="center")
-            text_label.pack(pady=(0, 10))
-        else:
-            error_label = tk.Label(scrollable_frame, text="Wystąpił błąd podczas ładowania opisu aplikacji.", font=("Century Schoolbook", 14), fg="red", bg="#FFFDEC")
-            error_label.pack(pady=10)
+        def show_download_error(widget, message):
+            widget.config(text=message, font=("Century Schoolbook", 14), fg="red", image="")
+
+        self.when_assets_ready(img_label, ["logo"], show_logo, lambda: show_download_error(img_label, "Wystąpił błąd podczas pobierania logo."))
+        self.when_assets_ready(description_label, ["wstep_rodo", "opisy"], show_description,
+                               lambda: show_download_error(description_label, "Wystąpił błąd podczas pobierania plików."))
 
         label = tk.Label(scrollable_frame, text="Wybierz opcję:", font=("Century Schoolbook", 14), bg="#FFFDEC")
         label.pack(pady=(5, 5))
@@ -195,13 +198,17 @@ class AnimalClassifierApp:
         button_features_and_image.pack(pady=5)
 
         # Dodawanie informacji o rodo
-        rodo_info = self.get_rodo_info(self.wstep_rodo_path)
-        if rodo_info:
-            text_label = tk.Label(scrollable_frame, text=rodo_info, font=("Century Schoolbook", 7), bg="#FFFDEC", wraplength=600, justify="center")
-            text_label.pack(pady=(20,5))  
-        else:
-            error_label = tk.Label(scrollable_frame, text="Wystąpił błąd podczas ładowania informacji o RODO.", font=("Century Schoolbook", 14), fg="red", bg="#FFFDEC")
-            error_label.pack(pady=10)
+        rodo_label = tk.Label(scrollable_frame, text="", font=("Century Schoolbook", 7), bg="#FFFDEC", wraplength=600, justify="center")
+        rodo_label.pack(pady=(20,5))
+
+        def show_rodo_info():
+            rodo_info = self.get_rodo_info(self.wstep_rodo_path)
+            if rodo_info:
+                rodo_label.config(text=rodo_info)
+            else:
+                rodo_label.config(text="Wystąpił błąd podczas ładowania informacji o RODO.", font=("Century Schoolbook", 14), fg="red")
+
+        self.when_assets_ready(rodo_label, ["wstep_rodo"], show_rodo_info, lambda: None)
 
         button_quit = tk.Button(scrollable_frame, text="Wyjście", font=button_font, width=button_width, height=button_height, bg=button_bg, 
                                 activebackground=button_active_bg, command=self.quit_app)
@@ -211,6 +218,8 @@ class AnimalClassifierApp:
         """
         Zamknięcie aplikacji.
         """
+        self.assets.shutdown()
+        self.report_engine.shutdown()
         self.root.destroy()
 
     def create_feature_input_page(self, next_page=None):
@@ -321,8 +330,9 @@ class AnimalClassifierApp:
         """
         Strona do wczytywania zdjęcia po wprowadzeniu cech.
         """
-        # Zapisanie danych z suwaków przed usunięciem widżetów
-        self.input_features = {feature: slider.get() for feature, slider in self.feature_sliders.items()}
+        # Zapisanie danych z suwaków przed usunięciem widżetów (przy powrocie z analizy suwaki już nie istnieją)
+        if self.feature_sliders and all(slider.winfo_exists() for slider in self.feature_sliders.values()):
+            self.input_features = {feature: slider.get() for feature, slider in self.feature_sliders.items()}
         
         self.clear_window()
 
@@ -357,28 +367,27 @@ class AnimalClassifierApp:
 
     def detect_face(self, image_path):
         """
-        Sprawdza, czy na zdjęciu znajduje się twarz.
-        Jeśli nie, wyświetla komunikat w messagebox.
+        Sprawdza, czy na zdjęciu znajduje się dokładnie jedna twarz.
+        Jeśli nie, przerywa analizę komunikatem wyświetlanym w messagebox.
+        Nie korzysta z widżetów Tk, więc może działać w wątku w tle.
+        return:
+            DecodedImage - Zdekodowane zdjęcie, przekazywane dalej do klasyfikatora obrazów
         """
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-
-        image = cv2.imread(image_path)
-        if image is None:
-            messagebox.showerror("Błąd", "Nie można otworzyć obrazu.")
-            return False
+        try:
+            decoded = self.image_pipeline.load(image_path)
+        except Exception as e:
+            self.logger.error("Nie można otworzyć obrazu %s: %s", image_path, str(e))
+            raise AnalysisAborted("Błąd", "Nie można otworzyć obrazu.", level="error")
 
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=10, minSize=(100, 100))
+        faces = self.image_pipeline.count_faces(decoded)
 
-        if len(faces) == 0:
-            messagebox.showwarning("Brak wykrytej twarzy", "Na zdjęciu nie wykryto twarzy.")
-            return False
+        if faces == 0:
+            raise AnalysisAborted("Brak wykrytej twarzy", "Na zdjęciu nie wykryto twarzy.")
 
-        if len(faces) > 1:
-            messagebox.showwarning("Więcej twarzy", "Na zdjęciu wykryto więcej twarzy.")
-            return False
+        if faces > 1:
+            raise AnalysisAborted("Więcej twarzy", "Na zdjęciu wykryto więcej twarzy.")
         
-        return True
+        return decoded
 
     def analyze_animal_from_features(self):
         self._analyze("features")
@@ -390,65 +399,142 @@ class AnimalClassifierApp:
         self._analyze("combined")
 
     def _analyze(self, mode):
-        try:
-            if mode in ["image", "combined"] and not self.selected_image_path:
-                messagebox.showerror("Błąd", "Nie wybrano żadnego zdjęcia.")
+        if self.analysis_worker and self.analysis_worker.is_running() and not self.analysis_worker.cancelled:
+            return  # Analiza już trwa
+
+        if mode in ["image", "combined"] and not self.selected_image_path:
+            messagebox.showerror("Błąd", "Nie wybrano żadnego zdjęcia.")
+            return
+
+        # Pobranie danych z suwaków, jeśli potrzebne
+        if mode in ["features", "combined"] and not self.input_features:
+            # Ustawienie input_features na podstawie suwaków (jeśli nie zostały zapisane wcześniej)
+            self.input_features = {feature: slider.get() for feature, slider in self.feature_sliders.items() if slider.get() != 0}
+            if not self.input_features:
+                messagebox.showerror("Błąd", "Wprowadź przynajmniej jedną cechę.")
                 return
-            
-            if mode in ["image", "combined"] and not self.detect_face(self.selected_image_path):
-                return  # Przerwij analizę, jeśli brak twarzy
-
-            # Pobranie danych z suwaków, jeśli potrzebne
-            if mode in ["features", "combined"] and not self.input_features:
-                # Ustawienie input_features na podstawie suwaków (jeśli nie zostały zapisane wcześniej)
-                while not self.input_features:
-                    self.input_features = {feature: slider.get() for feature, slider in self.feature_sliders.items() if slider.get() != 0}
-                    if not self.input_features:
-                        messagebox.showerror("Błąd", "Wprowadź przynajmniej jedną cechę.")
-                        return
 
-            # Inicjalizacja klasyfikatorów
-            file_id = '179GmVjydVw8D9RqUB1hQ2FPq6JRYURv3'
-            self.feature_classifier = AnimalFeaturesClassifier(drive_file_id=file_id, local_path=self.path, logger=self.logger)
+        image_path = self.selected_image_path
+        input_features = dict(self.input_features)
 
-            folder_id = '15SPPgjtECp5FWawf2z_lWKhvlpy6EnMU'
-            self.image_classifier = AnimalImageClassifier(drive_folder_id=folder_id, local_path=self.path, logger=self.logger)
+        def detect_face_stage(context):
+            context["image"] = self.detect_face(image_path)
 
-            self.combined_classifier = AnimalPredictor(features_classifier=self.feature_classifier, image_classifier=self.image_classifier, logger=self.logger)
+        def load_models_stage(context):
+            # Modele są wczytywane w tle od uruchomienia aplikacji; analiza cech nie czeka na model obrazów
+            if mode == "features":
+                self.wait_for_assets(context["check_cancelled"], "features_model")
+            else:
+                self.wait_for_assets(context["check_cancelled"], "features_model", "image_model")
+            context["predictor"] = self.model_registry.get_predictor(warmup=True, include_image=mode != "features")
 
-            # Analiza na podstawie wybranego trybu
+        def predict_stage(context):
+            predictor = context["predictor"]
             if mode == "features":
-                top_animals = self.combined_classifier.predict_top_5(input_features=self.input_features)
+                context["top_animals"] = predictor.predict_top_5(input_features=input_features)
             elif mode == "image":
-                top_animals = self.combined_classifier.predict_top_5(image_path=self.selected_image_path)
+                context["top_animals"] = predictor.predict_top_5(image_path=image_path, image_array=context["image"].array)
             else:
-                top_animals = self.combined_classifier.predict_top_5(input_features=self.input_features, image_path=self.selected_image_path)
+                context["top_animals"] = predictor.predict_top_5(input_features=input_features, image_path=image_path, image_array=context["image"].array)
+
+        def best_images_stage(context):
+            self.wait_for_assets(context["check_cancelled"], "najlepsze_zdjecia")
+
+        stages = []
+        if mode in ["image", "combined"]:
+            stages.append(("Wykrywanie twarzy", detect_face_stage))
+        stages.append(("Wczytywanie modeli", load_models_stage))
+        stages.append(("Analiza", predict_stage))
+        stages.append(("Pobieranie zdjęć zwierząt", best_images_stage))
+
+        previous_page = {
+            "features": self.create_feature_input_page,
+            "image": self.create_image_input_page,
+            "combined": self.create_image_page_after_features,
+        }[mode]
+
+        def on_done(context):
+            self.combined_classifier = context["predictor"]
+            self.feature_classifier = self.combined_classifier.features_classifier
+            self.image_classifier = self.combined_classifier.image_classifier
+            self.show_results(context["top_animals"])
 
-            self.show_results(top_animals)
-            
             # Resetowanie ścieżki zdjęcia po zakończeniu analizy
             if mode == "image":
                 self.selected_image_path = None
 
-        except Exception as e:
-            messagebox.showerror("Błąd", f"Wystąpił problem podczas analizy: {e}")
-            self.logger.error(f"Wystąpił problem podczas analizy: {e}")
+        def on_error(error):
+            self._restore_page(previous_page)
+            if isinstance(error, AnalysisAborted):
+                if error.level == "error":
+                    messagebox.showerror(error.title, error.message)
+                else:
+                    messagebox.showwarning(error.title, error.message)
+                return
+            messagebox.showerror("Błąd", f"Wystąpił problem podczas analizy: {error}")
+            self.logger.error("Wystąpił problem podczas analizy: %s", error)
+
+        self.analysis_worker = AnalysisWorker(self.root, stages, self.logger, on_progress=self.update_progress_page, on_done=on_done, on_error=on_error)
+        self.create_progress_page(len(stages), lambda: self.cancel_analysis(previous_page))
+        self.analysis_worker.start()
+
+    def _restore_page(self, page):
+        """
+        Przywraca stronę, z której uruchomiono analizę, wraz z wybranym zdjęciem i wartościami cech.
+        """
+        image_path = self.selected_image_path
+        input_features = dict(self.input_features)
+        page()
+        if image_path and hasattr(self, "image_label") and self.image_label.winfo_exists():
+            self.image_label.config(text=f"Wybrano: {os.path.basename(image_path)}")
+        for feature, value in input_features.items():
+            slider = self.feature_sliders.get(feature)
+            if slider is not None and slider.winfo_exists():
+                slider.set(value)
+
+    def cancel_analysis(self, previous_page):
+        """
+        Anuluje trwającą analizę i wraca do poprzedniej strony.
+        """
+        if self.analysis_worker:
+            self.analysis_worker.cancel()
+        self._restore_page(previous_page)
+
+    def create_progress_page(self, total_stages, cancel_command):
+        """
+        Strona z postępem analizy i przyciskiem anulowania.
+        """
+        self.clear_window()
+
+        canvas = tk.Canvas(self.root, bg="#FFFDEC", width=600, height=760, highlightthickness=0)
+        canvas.pack(fill="both", expand=True)
+
+        label = tk.Label(canvas, text="Trwa analiza...", font=("Century Schoolbook", 16), bg="#FFFDEC")
+        label.pack(pady=(200, 10))
+
+        self.progress_label = tk.Label(canvas, text="", font=("Century Schoolbook", 12), bg="#FFFDEC")
+        self.progress_label.pack(pady=10)
+
+        self.progress_bar = ttk.Progressbar(canvas, orient=tk.HORIZONTAL, length=400, mode="determinate", maximum=total_stages)
+        self.progress_bar.pack(pady=10)
+
+        button_cancel = tk.Button(
+            canvas, text="Anuluj", font=("Century Schoolbook", 14), width=30, height=1,
+            bg="#FFE2E2", activebackground="#FFCFCF", command=cancel_command)
+        button_cancel.pack(pady=30)
+
+    def update_progress_page(self, index, total, name):
+        """
+        Aktualizuje pasek postępu po rozpoczęciu kolejnego etapu analizy.
+        """
+        self.progress_label.config(text=f"{name} ({index + 1}/{total})")
+        self.progress_bar["value"] = index
 
     def show_results(self, top_animals):
         """
         Wyświetla wyniki analizy.
         """
-        images_folder_path = os.path.join(self.path, "najlepsze_zdjecia")
-
-        # Sprawdzenie, czy folder zdjęć już istnieje
-        if not os.path.exists(images_folder_path):
-            try:
-                self.download_best_images_from_drive()
-            except Exception as e:
-                error_label = tk.Label(self.root, text="Nie udało się pobrać zdjęć.", font=("Century Schoolbook", 14), fg="red", bg="#FFFDEC")
-                error_label.pack(pady=10)
-                return
-        
+        # Zdjęcia zwierząt pobiera etap analizy (zasób "najlepsze_zdjecia")
         self.clear_window()
 
         canvas = tk.Canvas(self.root, bg="#FFFDEC", width=600, height=760, highlightthickness=0)
@@ -493,7 +579,7 @@ class AnimalClassifierApp:
         button_back.pack(pady=(20, 5))
 
         button_generate = tk.Button(canvas, text="Generuj raport", font=("Century Schoolbook", 14), width=30, height=1, bg="#FFE2E2", 
-        activebackground="#FFCFCF", command=lambda: self.generate_raport(top_animals))
+        activebackground="#FFCFCF", command=lambda: self.generate_raport(top_animals, button_generate))
         button_generate.pack(pady=5)
 
         button_quit = tk.Button(canvas, text="Wyjście", font=("Century Schoolbook", 14), width=30, height=1, bg="#FFE2E2", 
@@ -503,211 +589,67 @@ class AnimalClassifierApp:
 
     def download_best_images_from_drive(self):
         """
-        Pobiera najlepsze zdjęcia zwierząt z Google Drive do lokalnego folderu.
+        Pobiera najlepsze zdjęcia zwierząt ze źródła plików (domyślnie Google Drive) i rozpakowuje je w trakcie pobierania.
         """
         try:
-            self.logger.info("Pobieranie zdjęć z Google Drive za pomocą gdown...")
-            output_zip_path = os.path.join(self.path, "drive_best_images.zip")
-            file_url = "https://drive.google.com/uc?id=19Png8-wztFJNBv9AOEKfu_MrAc4PVWAK"
-            gdown.download(file_url, output_zip_path, quiet=False)
-            self.logger.info(f"Rozpakowywanie zdjęć z: {output_zip_path}...")
-            with zipfile.ZipFile(output_zip_path, 'r') as zip_ref:
-                zip_ref.extractall(self.path)
-            os.remove(output_zip_path)
-
-            self.logger.info(f"Zdjęcia pobrano i rozpakowano do: {self.path}\\naj_zdjecia")
+            self.logger.info("Pobieranie i rozpakowywanie najlepszych zdjęć zwierząt...")
+            extractor = StreamingZipExtractor(self.path, self.logger, state_name=".drive_best_images.json")
+            self.asset_store.stream_to("drive_best_images.zip", extractor.extract)
+            self.logger.info("Zdjęcia pobrano i rozpakowano do: %s", os.path.join(self.path, "najlepsze_zdjecia"))
         except Exception as e:
             self.logger.critical("Błąd podczas pobierania lub rozpakowywania zdjęć: %s", str(e))
             raise RuntimeError("Nie udało się pobrać zdjęć z Google Drive.")
 
     def get_animal_description(self, animal_name):
         """
-        Odczytanie opisu zwierzęcia na podstawie podanej nazwy zwierzęcia z pliku tekstowego.
+        Odczytanie opisu zwierzęcia na podstawie podanej nazwy zwierzęcia (w modelu lub wyświetlanej) z pliku tekstowego.
         """
         try:
-            with open(self.opisy_path, "r", encoding="utf-8") as file:
-                lines = file.readlines()
+            description = self.description_store.get(self.opisy_path, animal_name)
+            if description:
+                return description
 
-            lines = [line.strip() for line in lines if line.strip()]
-        
-            # Iteracja po liniach pliku w celu znalezienia nazwy zwierzęcia
-            for i in range(0, len(lines), 2):
-                name = lines[i]
-                if name.lower() == animal_name.lower():
-                    description = lines[i + 1]
-                    return description
-                
-            self.logger.warning(f"Opis dla zwierzęcia '{animal_name}' nie został znaleziony.")
+            self.logger.warning("Opis dla zwierzęcia '%s' nie został znaleziony.", animal_name)
             return f"Opis dla zwierzęcia '{animal_name}' nie został znaleziony."
-    
+
         except FileNotFoundError:
-            self.logger.critical(f"Plik z opisami nie został znaleziony: {self.opisy_path}")
+            self.logger.critical("Plik z opisami nie został znaleziony: %s", self.opisy_path)
         except Exception as e:
-            self.logger.critical(f"Wystąpił błąd: {str(e)}")
-        
-    def generate_raport(self, top_animals):
+            self.logger.critical("Wystąpił błąd: %s", str(e))
+
+    def generate_raport(self, top_animals, button=None):
         """
-        Generuje raport z analizy.
+        Generuje w tle raport z analizy (PDF i HTML) i pokazuje komunikat po jego zapisaniu.
         """
+        # Pobierz ścieżkę do folderu "Dokumenty" użytkownika
+        documents_path = os.path.join(os.path.expanduser("~"), "Documents", "blizniaki")
         try:
-            # Pobierz ścieżkę do folderu "Dokumenty" użytkownika
-            documents_path = os.path.join(os.path.expanduser("~"), "Documents", "blizniaki")
-            if not os.path.exists(documents_path):
-                os.makedirs(documents_path)
-            
-            # Ścieżka do zapisu pliku PDF
-            pdf_path = os.path.join(documents_path, f"raport_{FORMATTED_FILENAME_DATE}.pdf")
-
-            # Ścieżka do zapisu pliku HTML
-            html_path = os.path.join(documents_path, f"raport_{FORMATTED_FILENAME_DATE}.html")
-
-            self.generate_raport_pdf(top_animals, pdf_path)
-            self.generate_raport_html(top_animals, html_path)
-            self.logger.info(f"Raporty zostały zapisane w: {documents_path}")
-            messagebox.showinfo("Sukces", f"Raporty zostały zapisane w: {documents_path}")
-
+            report = self.report_engine.generate(top_animals, documents_path)
         except Exception as e:
-            self.logger.error(f"Wystąpił błąd podczas generowania raportu: {str(e)}")
-            messagebox.showerror("Błąd", f"Wystąpił błąd podczas generowania raportu: {str(e)}")
-
-    def generate_raport_pdf(self, top_animals, pdf_path):
-        """
-        Generuje raport z analizy do pliku pdf.
-        """
-        # Ścieżka do czcionki
-        pdfmetrics.registerFont(TTFont("CenturySchoolbook", os.path.join(self.path, "fonts", "CENSCBK.ttf")))
-        pdfmetrics.registerFont(TTFont("CenturySchoolbook-Bold", os.path.join(self.path, "fonts", "SCHLBKB.TTF")))
-
-        # Tworzenie nowego pliku PDF            
-        c = canvas.Canvas(pdf_path, pagesize=letter)
-        width, height = letter
-
-        # Dodanie logo
-        logo_image = ImageReader(self.logo_path)
-        c.drawImage(logo_image, (width - 150) /2, height - 100, width=150, height=100, preserveAspectRatio=True)        
+            self.show_raport_error(e)
+            return
 
-        # Tytuł raportu
-        c.setFont("CenturySchoolbook-Bold", 24)
-        c.drawCentredString(width / 2, height - 130, "Ranking Twoich zwierzęcych bliźniaków")
+        if button is not None:
+            button.config(state=tk.DISABLED, text="Generowanie raportu...")
 
-        # Dodanie dnia i godziny generowania raportu
-        c.setFont("CenturySchoolbook", 15)
-        c.drawCentredString(width / 2, height - 150, f"Data: {FORMATTED_DATE}")
-        
-        # Zdjęcie top 1 zwierzęcia
-        top_animal_name = top_animals[0][0]
-        top_animal_display_name = self.animal_labels.get(top_animal_name, top_animal_name.capitalize())
-        c.setFont("CenturySchoolbook-Bold", 16)
-        c.drawCentredString(width / 2, height - 190, f"1. {top_animal_display_name}")
+        def check_report():
+            if not report.done():
+                self.root.after(100, check_report)
+                return
+            if button is not None and button.winfo_exists():
+                button.config(state=tk.NORMAL, text="Generuj raport")
+            error = report.exception()
+            if error is not None:
+                self.show_raport_error(error)
+            else:
+                self.logger.info("Raporty zostały zapisane w: %s", documents_path)
+                messagebox.showinfo("Sukces", f"Raporty zostały zapisane w: {documents_path}")
 
-        animal_image_path = os.path.join(self.path, "najlepsze_zdjecia", f"naj_{top_animal_name}.jpg")
-        if os.path.exists(animal_image_path):
-            animal_image = ImageReader(animal_image_path)
-            c.drawImage(animal_image, (width - 220) / 2, height - 420, width=220, height=220, preserveAspectRatio=True, anchor='nw')
+        self.root.after(100, check_report)
 
-        # Dodanie opisu top 1 zwierzęcia
-        animal_description = self.get_animal_description(top_animal_display_name)
-        styles = getSampleStyleSheet()
-        style = styles["BodyText"]
-        style.fontName = "CenturySchoolbook"
-        style.fontSize = 14
-        style.leading = 14
-        style.alignment = TA_CENTER 
-        frame = Frame(50, height - 520, width - 100, 100, showBoundary=0)
-        paragraph = Paragraph(animal_description, style)
-        frame.addFromList([paragraph], c)
-
-        # Dodanie pozostałych zwierząt
-        c.setFont("CenturySchoolbook", 14)
-        y_offset = 480
-        for idx, animal in enumerate(top_animals[1:], start=2):
-            animal_display_name = self.animal_labels.get(animal[0], animal[0].capitalize())
-            c.drawCentredString(width / 2, height - y_offset - (idx * 20), f"{idx}. {animal_display_name}")
-
-        # Zakończenie tworzenia PDF
-        c.save()
-
-    def generate_raport_html(self, top_animals, html_path):
-        """
-        Generuje raport z analizy do pliku html.
-        """
-        # Nazwa top 1 zwierzęcia
-        top_animal_name = top_animals[0][0]
-        top_animal_display_name = self.animal_labels.get(top_animal_name, top_animal_name.capitalize())
-        animal_image_path = os.path.join(self.path, "najlepsze_zdjecia", f"naj_{top_animal_name}.jpg")
-
-        # Konwertuj obraz do Base64
-        with open(self.logo_path, "rb") as img_file:
-            base64_string_logo = base64.b64encode(img_file.read()).decode("utf-8")
-
-        with open(animal_image_path, "rb") as img_file:
-            base64_string_animal = base64.b64encode(img_file.read()).decode("utf-8")
-
-        # Tworzenie struktury HTML
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="pl">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Raport Blizniaka</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    margin: 20px;
-                    padding: 0;
-                    line-height: 1.6;
-                }}
-                h1 {{
-                    text-align: center;
-                    color: #333;
-                }}
-                h2 {{
-                    margin-top: 40px;
-                    color: #444;
-                }}
-                .animal {{
-                    margin: 20px 0;
-                }}
-                img {{
-                    display: block;
-                    margin: 0 auto;
-                    max-width: 300px;
-                    height: auto;
-                }}
-                .description {{
-                    text-align: center;
-                    margin: 10px 0;
-                }}
-            </style>
-        </head>
-        <body>
-            <img src="data:image/jpeg;base64,{base64_string_logo}" alt="Logo aplikacji" style="display: block; margin: 0 auto; max-width: 150px; height: auto;">
-            <h1>Ranking Twoich zwierzęcych bliźniaków</h1>
-            <p style="text-align: center;">Data generowania raportu: {FORMATTED_DATE}</p>
-            
-            <div class="animal">
-                <h2 style="text-align: center;">1. {self.animal_labels.get(top_animal_name, top_animal_name.capitalize())}</h2>
-                <img src="data:image/jpeg;base64,{base64_string_animal}" alt="Zdjęcie zwierzęcia">
-                <p class="description">{self.get_animal_description(top_animal_display_name)}</p>
-            </div>
-                        <ul>
-        """
-        # Dodanie listy pozostałych zwierząt
-        for idx, animal in enumerate(top_animals[1:], start=2):
-            animal_name = self.animal_labels.get(animal[0], animal[0].capitalize())
-            html_content += f"<p style='text-align: center'>{idx}. {animal_name}</p>"
-
-        # Zamknięcie znaczników HTML
-        html_content += """
-            </ul>
-        </body>
-        </html>
-        """
-
-        # Zapis pliku HTML
-        with open(html_path, "w", encoding="utf-8") as html_file:
-            html_file.write(html_content)
+    def show_raport_error(self, error):
+        self.logger.error("Wystąpił błąd podczas generowania raportu: %s", str(error))
+        messagebox.showerror("Błąd", f"Wystąpił błąd podczas generowania raportu: {str(error)}")
 
     def clear_window(self):
         """
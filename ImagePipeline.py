@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+import numpy as np
+from PIL import Image, ImageOps
+from Metrics import get_metrics
+
+FACE_CASCADE_FILE = 'haarcascade_frontalface_default.xml'
+MODEL_INPUT_VERSION = 2  # Zmieniana razem z to_model_input - unieważnia zapisane zdjęcia i embeddingi
+
+def to_model_input(image: Image.Image, image_size: tuple) -> np.ndarray:
+    """
+    Skaluje zdjęcie do wejścia klasyfikatora obrazów. Jedyne przygotowanie zdjęć używane przy treningu
+    (tf.data, pamięć podręczna zdjęć, embeddingi) i przy predykcji, więc model widzi te same piksele.
+    return:
+        np.ndarray - Obraz (wysokość, szerokość, 3) typu uint8
+    """
+    return np.asarray(image.convert("RGB").resize(tuple(image_size)), dtype=np.uint8)
+
+def decode_model_input(source, image_size: tuple) -> np.ndarray:
+    """
+    Dekoduje zdjęcie (ścieżka lub plik binarny) w pełnej rozdzielczości i przygotowuje je przez to_model_input.
+    """
+    with Image.open(source) as image:
+        return to_model_input(image, image_size)
+
+_face_cascade = None
+_face_cascade_lock = threading.Lock()
+
+def get_face_cascade() -> "cv2.CascadeClassifier":
+    """
+    Zwraca klasyfikator twarzy wczytywany z pliku XML tylko raz na cały czas działania procesu.
+    """
+    global _face_cascade
+    import cv2  # OpenCV wczytywane dopiero przy pierwszym wykrywaniu twarzy (szybsze uruchamianie aplikacji)
+    with _face_cascade_lock:
+        if _face_cascade is None:
+            _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + FACE_CASCADE_FILE)
+            if _face_cascade.empty():
+                _face_cascade = None
+                raise RuntimeError("Nie udało się wczytać klasyfikatora twarzy.")
+        return _face_cascade
+
+class DecodedImage:
+    def __init__(self, image_path: str, original_size: tuple, gray: np.ndarray, detection_scale: float, array: np.ndarray):
+        """
+        Zdjęcie zdekodowane raz, w postaci potrzebnej do wykrywania twarzy i do klasyfikatora obrazów.
+        args:
+            image_path: str - Ścieżka do zdjęcia
+            original_size: tuple - Rozmiar oryginalnego zdjęcia (szerokość, wysokość)
+            gray: np.ndarray - Zmniejszona kopia w skali szarości do wykrywania twarzy
+            detection_scale: float - Stosunek rozmiaru kopii w skali szarości do oryginału
+            array: np.ndarray - Znormalizowany obraz (wysokość, szerokość, 3) typu float32 dla klasyfikatora
+        """
+        self.image_path = image_path
+        self.original_size = original_size
+        self.gray = gray
+        self.detection_scale = detection_scale
+        self.array = array
+        self.timings = {}
+
+class ImagePipeline:
+    def __init__(self, logger: logging.Logger, image_size: tuple = (224, 224), detection_max_side: int = 640):
+        """
+        Wspólne przetwarzanie zdjęcia dla wykrywania twarzy i klasyfikatora obrazów.
+        Plik jest dekodowany raz w pełnej rozdzielczości, klasyfikator dostaje obraz przygotowany tak samo
+        jak przy treningu, a twarze są wykrywane na zmniejszonej kopii w skali szarości.
+        args:
+            logger: logging.Logger - Wspólny logger
+            image_size: tuple - Rozmiar obrazu wejściowego klasyfikatora
+            detection_max_side: int - Najdłuższy bok kopii używanej do wykrywania twarzy
+        """
+        self.logger = logger
+        self.image_size = tuple(image_size)
+        self.detection_max_side = detection_max_side
+
+    def load(self, image_path: str) -> DecodedImage:
+        """
+        Dekoduje zdjęcie i przygotowuje kopię do wykrywania twarzy oraz obraz dla klasyfikatora.
+        args:
+            image_path: str - Ścieżka do zdjęcia
+        return:
+            DecodedImage - Zdekodowane zdjęcie
+        """
+        start = time.perf_counter()
+        # Bez dekodowania JPEG w zmniejszonej rozdzielczości (draft) - trening korzysta z pełnej rozdzielczości
+        with Image.open(image_path) as image:
+            original_size = image.size
+            rgb = image.convert("RGB")
+        decoded_at = time.perf_counter()
+
+        array = to_model_input(rgb, self.image_size).astype(np.float32) / 255.0
+
+        # cv2.imread uwzględnia orientację z EXIF, więc kopia do wykrywania twarzy również
+        gray_image = ImageOps.exif_transpose(rgb).convert("L")
+        gray_image.thumbnail((self.detection_max_side, self.detection_max_side))
+        detection_scale = max(gray_image.size) / max(original_size)  # Obrót nie zmienia najdłuższego boku
+        decoded = DecodedImage(image_path, original_size, np.asarray(gray_image), detection_scale, array)
+        decoded.timings["decode"] = decoded_at - start
+        decoded.timings["preprocess"] = time.perf_counter() - decoded_at
+        get_metrics().observe("image_decode_seconds", decoded.timings["decode"])
+        get_metrics().observe("image_preprocess_seconds", decoded.timings["preprocess"])
+        return decoded
+
+    def count_faces(self, decoded: DecodedImage, min_face_size: int = 100) -> int:
+        """
+        Liczy twarze na zmniejszonej kopii zdjęcia.
+        args:
+            decoded: DecodedImage - Zdjęcie zwrócone przez load
+            min_face_size: int - Najmniejszy rozmiar twarzy w pikselach oryginalnego zdjęcia
+        return:
+            int - Liczba wykrytych twarzy
+        """
+        start = time.perf_counter()
+        min_size = max(24, round(min_face_size * decoded.detection_scale))  # 24 px to rozmiar okna klasyfikatora
+        faces = get_face_cascade().detectMultiScale(decoded.gray, scaleFactor=1.1, minNeighbors=10, minSize=(min_size, min_size))
+        decoded.timings["detect"] = time.perf_counter() - start
+        get_metrics().observe("face_detection_seconds", decoded.timings["detect"])
+        self.logger.info(
+            "Przetwarzanie zdjęcia: dekodowanie %.1f ms, przygotowanie %.1f ms, wykrywanie twarzy %.1f ms.",
+            decoded.timings["decode"] * 1000, decoded.timings["preprocess"] * 1000, decoded.timings["detect"] * 1000
+        )
+        return len(faces)
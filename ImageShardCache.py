@@ -0,0 +1,253 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from ImagePipeline import MODEL_INPUT_VERSION, decode_model_input
+
+MANIFEST_VERSION = 1
+
+def file_sha256(path: str) -> str:
+    """
+    Liczy skrót SHA-256 zawartości pliku.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ImageShardCache:
+    def __init__(self, cache_dir: str, logger: logging.Logger, image_size: tuple = (224, 224), shard_size: int = 512):
+        """
+        Pamięć podręczna przeskalowanych zdjęć (uint8) zapisanych w plikach .npy mapowanych w pamięci.
+        Manifest przechowuje dla każdego zdjęcia ścieżkę źródłową, datę modyfikacji, rozmiar, skrót
+        SHA-256 i miejsce (slot) w plikach fragmentów, więc aktualizacja dekoduje tylko zmienione zdjęcia.
+        args:
+            cache_dir: str - Folder pamięci podręcznej
+            logger: logging.Logger - Wspólny logger
+            image_size: tuple - Rozmiar zapisywanych zdjęć
+            shard_size: int - Liczba zdjęć w jednym pliku fragmentu
+        """
+        self.cache_dir = cache_dir
+        self.logger = logger
+        self.image_size = tuple(image_size)
+        self.shard_size = shard_size
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self._readers = {}
+        self._readers_lock = threading.Lock()
+        self.manifest = self._load_manifest()
+
+    def _empty_manifest(self) -> dict:
+        return {"version": MANIFEST_VERSION, "model_input": MODEL_INPUT_VERSION, "image_size": list(self.image_size), "shard_size": self.shard_size, "next_slot": 0, "entries": {}}
+
+    def _load_manifest(self) -> dict:
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as manifest_file:
+                    manifest = json.load(manifest_file)
+                if (manifest.get("version") == MANIFEST_VERSION and manifest.get("model_input") == MODEL_INPUT_VERSION and tuple(manifest.get("image_size", ())) == self.image_size
+                        and manifest.get("shard_size") == self.shard_size):
+                    return manifest
+                self.logger.info("Zmienił się format pamięci podręcznej zdjęć - zostanie zbudowana od nowa.")
+            except (OSError, ValueError) as e:
+                self.logger.warning("Nie udało się wczytać manifestu pamięci podręcznej zdjęć: %s", str(e))
+
+        if os.path.exists(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
+        return self._empty_manifest()
+
+    def _save_manifest(self):
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(self.manifest, manifest_file)
+        os.replace(temp_path, self.manifest_path)
+
+    def _shard_path(self, shard: int) -> str:
+        return os.path.join(self.cache_dir, f"shard_{shard:04d}.npy")
+
+    def _open_shard_for_writing(self, shard: int) -> np.memmap:
+        shard_path = self._shard_path(shard)
+        if os.path.exists(shard_path):
+            return np.load(shard_path, mmap_mode="r+")
+        return np.lib.format.open_memmap(shard_path, mode="w+", dtype=np.uint8, shape=(self.shard_size, *self.image_size, 3))
+
+    def decode(self, source) -> np.ndarray:
+        """
+        Wczytuje zdjęcie (ścieżka lub plik binarny) i skaluje je tak samo jak podczas predykcji.
+        """
+        return decode_model_input(source, self.image_size)
+
+    @staticmethod
+    def relative_path(image_path: str, root_dir: str) -> str:
+        return os.path.relpath(image_path, root_dir).replace(os.sep, "/")
+
+    def update(self, image_paths: list, root_dir: str, num_workers: int = None) -> dict:
+        """
+        Synchronizuje pamięć podręczną z podanymi zdjęciami: dekoduje nowe i zmienione, usuwa nieistniejące.
+        args:
+            image_paths: list - Ścieżki do zdjęć
+            root_dir: str - Folder, względem którego zapisywane są ścieżki w manifeście
+            num_workers: int - Liczba wątków dekodujących
+        return:
+            dict - Liczba zdjęć dodanych, zaktualizowanych, usuniętych i niezmienionych
+        """
+        def items():
+            for image_path in image_paths:
+                stat = os.stat(image_path)
+                yield self.relative_path(image_path, root_dir), (stat.st_mtime, stat.st_size), lambda path=image_path: file_sha256(path), image_path
+
+        return self._sync(items(), num_workers)
+
+    def update_from_archive(self, entries, num_workers: int = None) -> dict:
+        """
+        Synchronizuje pamięć podręczną ze zdjęciami czytanymi prosto z archiwum, bez zapisywania ich na dysku.
+        args:
+            entries: iterable - Krotki (ścieżka względna, bajty zdjęcia), np. z rozpakowywanego strumieniowo archiwum ZIP
+            num_workers: int - Liczba wątków dekodujących
+        return:
+            dict - Liczba zdjęć dodanych, zaktualizowanych, usuniętych i niezmienionych
+        """
+        def items():
+            for relative, data in entries:
+                yield relative, None, lambda data=data: hashlib.sha256(data).hexdigest(), io.BytesIO(data)
+
+        return self._sync(items(), num_workers)
+
+    def _sync(self, items, num_workers: int = None, decode_batch: int = 64) -> dict:
+        """
+        Wspólna część update i update_from_archive. Zdjęcia są przetwarzane na bieżąco, paczkami po decode_batch.
+        args:
+            items: iterable - Krotki (ścieżka względna, (data modyfikacji, rozmiar) lub None, funkcja licząca skrót, źródło dla decode)
+        """
+        entries = self.manifest["entries"]
+        seen = set()
+        unchanged = 0
+        added = 0
+        written = 0
+        changed_manifest = False
+
+        # Wolne sloty (np. po zdjęciach usuniętych przy poprzedniej aktualizacji) są wykorzystywane ponownie
+        used = {entry["slot"] for entry in entries.values()}
+        free_slots = sorted(set(range(self.manifest["next_slot"])) - used)[::-1]
+        shards = {}
+
+        def write(pending, executor):
+            nonlocal added, written
+            images = executor.map(lambda item: self._safe_decode(item[3]), pending)
+            for (relative, fingerprint, digest, source, slot), image in zip(pending, images):
+                if image is None:
+                    entries.pop(relative, None)
+                    continue
+                if slot is None:
+                    added += 1
+                    if free_slots:
+                        slot = free_slots.pop()
+                    else:
+                        slot = self.manifest["next_slot"]
+                        self.manifest["next_slot"] += 1
+
+                shard, index = divmod(slot, self.shard_size)
+                if shard not in shards:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    shards[shard] = self._open_shard_for_writing(shard)
+                shards[shard][index] = image
+                mtime, size = fingerprint if fingerprint else (None, None)
+                entries[relative] = {"mtime": mtime, "size": size, "sha256": digest, "slot": slot}
+                written += 1
+
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            pending = []
+            for relative, fingerprint, compute_digest, source in items:
+                seen.add(relative)
+                entry = entries.get(relative)
+                if entry and fingerprint and entry["mtime"] == fingerprint[0] and entry["size"] == fingerprint[1]:
+                    unchanged += 1
+                    continue
+
+                digest = compute_digest()
+                if entry and entry["sha256"] == digest:
+                    if fingerprint:
+                        entry["mtime"], entry["size"] = fingerprint
+                        changed_manifest = True
+                    unchanged += 1
+                    continue
+                pending.append((relative, fingerprint, digest, source, entry["slot"] if entry else None))
+                if len(pending) >= decode_batch:
+                    write(pending, executor)
+                    pending = []
+            if pending:
+                write(pending, executor)
+
+        for shard in shards.values():
+            shard.flush()
+        if shards:
+            with self._readers_lock:
+                self._readers.clear()
+
+        removed = [relative for relative in entries if relative not in seen]
+        for relative in removed:
+            del entries[relative]
+
+        if written or removed or changed_manifest:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._save_manifest()
+
+        stats = {"added": added, "updated": written - added, "removed": len(removed), "unchanged": unchanged}
+        self.logger.info("Pamięć podręczna zdjęć: %s", stats)
+        return stats
+
+    def _safe_decode(self, source):
+        try:
+            return self.decode(source)
+        except Exception as e:
+            self.logger.error("Nie udało się wczytać zdjęcia %s: %s", getattr(source, "name", source), str(e))
+            return None
+
+    def slots_for(self, image_paths: list, root_dir: str) -> np.ndarray:
+        """
+        Zwraca numery slotów zdjęć w pamięci podręcznej (po wywołaniu update).
+        """
+        return self.slots_for_keys([self.relative_path(image_path, root_dir) for image_path in image_paths])
+
+    def slots_for_keys(self, relative_paths: list) -> np.ndarray:
+        """
+        Zwraca numery slotów zdjęć o podanych ścieżkach względnych (kluczach manifestu).
+        """
+        entries = self.manifest["entries"]
+        return np.array([entries[relative]["slot"] for relative in relative_paths], dtype=np.int64)
+
+    def keys(self) -> list:
+        """
+        Zwraca ścieżki względne wszystkich zdjęć w pamięci podręcznej.
+        """
+        return list(self.manifest["entries"])
+
+    def contains(self, image_path: str, root_dir: str) -> bool:
+        return self.relative_path(image_path, root_dir) in self.manifest["entries"]
+
+    def _reader(self, shard: int) -> np.ndarray:
+        with self._readers_lock:
+            if shard not in self._readers:
+                self._readers[shard] = np.load(self._shard_path(shard), mmap_mode="r")
+            return self._readers[shard]
+
+    def read_batch(self, slots: np.ndarray) -> np.ndarray:
+        """
+        Odczytuje zdjęcia o podanych slotach bezpośrednio z plików mapowanych w pamięci.
+        args:
+            slots: np.ndarray - Numery slotów
+        return:
+            np.ndarray - Zdjęcia (n, wysokość, szerokość, 3) typu uint8
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        images = np.empty((len(slots), *self.image_size, 3), dtype=np.uint8)
+        shards, indices = np.divmod(slots, self.shard_size)
+        for shard in np.unique(shards):
+            mask = shards == shard
+            images[mask] = self._reader(int(shard))[indices[mask]]
+        return images
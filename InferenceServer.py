@@ -0,0 +1,314 @@
+import argparse
+import asyncio
+import base64
+import io
+import json
+import logging
+import sys
+import time
+from collections import deque
+from AnimalPredictor import AnimalPredictor
+from Metrics import get_metrics
+from LoggingConfig import configure_logging
+
+HTTP_STATUSES = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class LatencyStats:
+    def __init__(self, max_samples: int = 1000):
+        """
+        Przechowuje ostatnie czasy odpowiedzi i liczy ich percentyle.
+        args:
+            max_samples: int - Liczba przechowywanych ostatnich pomiarów
+        """
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": self.count}
+
+        def percentile(p):
+            return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))] * 1000
+
+        return {"count": self.count, "p50_ms": percentile(50), "p90_ms": percentile(90), "p99_ms": percentile(99), "max_ms": samples[-1] * 1000}
+
+class InferenceServer:
+    def __init__(self, predictor: AnimalPredictor, logger: logging.Logger, host: str = "127.0.0.1", port: int = 8765,
+                 max_batch_size: int = 16, max_wait_ms: float = 10.0, max_body_bytes: int = 20 * 1024 * 1024):
+        """
+        Lokalny serwer HTTP (asyncio) udostępniający predykcje AnimalPredictor.
+        Współbieżne zapytania o zdjęcia są łączone w mikro-paczki przetwarzane jednym przebiegiem modelu.
+        args:
+            predictor: AnimalPredictor - Połączony klasyfikator z wczytanymi modelami
+            logger: logging.Logger - Wspólny logger
+            host: str - Adres nasłuchiwania
+            port: int - Port nasłuchiwania
+            max_batch_size: int - Maksymalna liczba zdjęć w jednej paczce
+            max_wait_ms: float - Maksymalny czas oczekiwania na skompletowanie paczki
+            max_body_bytes: int - Maksymalny rozmiar treści zapytania
+        """
+        self.predictor = predictor
+        self.logger = logger
+        self.host = host
+        self.port = port
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_body_bytes = max_body_bytes
+
+        self.routes = {
+            "/predict/image": self._handle_image,
+            "/predict/features": self._handle_features,
+            "/predict": self._handle_combined,
+        }
+        self.latency = {path: LatencyStats() for path in self.routes}
+        self.batch_sizes = deque(maxlen=1000)
+
+        self._queue = None
+        self._batcher = None
+        self._server = None
+
+    async def start(self):
+        """
+        Uruchamia serwer i zadanie składające mikro-paczki.
+        """
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info("Serwer predykcji nasłuchuje na http://%s:%d", self.host, self.port)
+
+    async def stop(self):
+        """
+        Zatrzymuje serwer i zadanie składające mikro-paczki.
+        """
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+        self.logger.info("Serwer predykcji zatrzymany.")
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    def metrics(self) -> dict:
+        """
+        Zwraca bieżące statystyki serwera: długość kolejki, percentyle opóźnień i rozmiary paczek
+        oraz metryki etapów przetwarzania (jeśli są włączone).
+        """
+        batch_sizes = list(self.batch_sizes)
+        pipeline_metrics = get_metrics().snapshot() if get_metrics().enabled else None
+        return {
+            "pipeline": pipeline_metrics,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "latency": {path: stats.snapshot() for path, stats in self.latency.items()},
+            "batches": {
+                "count": len(batch_sizes),
+                "mean_size": sum(batch_sizes) / len(batch_sizes) if batch_sizes else 0,
+                "max_size": max(batch_sizes) if batch_sizes else 0,
+            },
+        }
+
+    async def predict_image(self, image_source) -> list:
+        """
+        Dodaje zdjęcie do kolejki mikro-paczek i czeka na wynik.
+        args:
+            image_source: str | io.BytesIO - Ścieżka do zdjęcia lub jego zawartość
+        return:
+            list - Lista 10 zwierząt z prawdopodobieństwami
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_source, future))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            sources = [source for source, _ in batch]
+            self.batch_sizes.append(len(batch))
+            try:
+                with get_metrics().span("predict_batch", classifier="image"):
+                    results = await loop.run_in_executor(
+                        None, lambda: self.predictor.image_classifier.predict_batch(sources, batch_size=len(sources))
+                    )
+                get_metrics().increment("predicted_images", len(sources))
+            except Exception as e:
+                self.logger.error("Błąd podczas predykcji paczki zdjęć: %s", str(e))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if result:
+                    future.set_result(result)
+                else:
+                    future.set_exception(ValueError("Nie udało się wczytać zdjęcia."))
+
+    def _image_source(self, payload: dict):
+        if "image_base64" in payload:
+            return io.BytesIO(base64.b64decode(payload["image_base64"]))
+        if "image_path" in payload:
+            return payload["image_path"]
+        return None
+
+    async def _predict_features(self, input_features: dict) -> list:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.predictor.features_classifier.predict_top_10, input_features)
+
+    async def _handle_image(self, payload: dict) -> dict:
+        image_source = self._image_source(payload)
+        if image_source is None:
+            raise ValueError("Brak pola 'image_path' lub 'image_base64'.")
+        return {"predictions": await self.predict_image(image_source)}
+
+    async def _handle_features(self, payload: dict) -> dict:
+        return {"predictions": await self._predict_features(payload.get("features"))}
+
+    async def _handle_combined(self, payload: dict) -> dict:
+        image_source = self._image_source(payload)
+        input_features = payload.get("features")
+
+        async def no_predictions():
+            return []
+
+        image_predictions, features_predictions = await asyncio.gather(
+            self.predict_image(image_source) if image_source is not None else no_predictions(),
+            self._predict_features(input_features) if input_features else no_predictions(),
+        )
+
+        return {"predictions": self.predictor.combine_top_5(features_predictions, image_predictions)}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            content_length = int(headers.get("content-length", 0))
+            if content_length > self.max_body_bytes:
+                await self._respond(writer, 413, {"error": "Zbyt duże zapytanie."})
+                return
+            body = await reader.readexactly(content_length) if content_length else b""
+
+            status, response = await self._dispatch(method, path, body)
+            await self._respond(writer, status, response)
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            await self._respond(writer, 400, {"error": str(e)})
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes):
+        if path == "/metrics" or path == "/health":
+            if method != "GET":
+                return 405, {"error": "Dozwolona metoda: GET."}
+            return 200, self.metrics() if path == "/metrics" else {"status": "ok"}
+
+        handler = self.routes.get(path)
+        if handler is None:
+            return 404, {"error": f"Nieznana ścieżka: {path}"}
+        if method != "POST":
+            return 405, {"error": "Dozwolona metoda: POST."}
+
+        start = time.perf_counter()
+        try:
+            payload = json.loads(body or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("Treść zapytania musi być obiektem JSON.")
+            response = await handler(payload)
+            status = 200
+        except (ValueError, TypeError) as e:
+            status, response = 400, {"error": str(e)}
+        except Exception as e:
+            self.logger.error("Błąd podczas obsługi zapytania %s: %s", path, str(e))
+            status, response = 500, {"error": str(e)}
+        self.latency[path].add(time.perf_counter() - start)
+        get_metrics().increment("http_requests", path=path, status=status)
+        return status, response
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, response: dict):
+        body = json.dumps(response, ensure_ascii=False, default=_to_json).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {HTTP_STATUSES.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+def _to_json(value):
+    # Wyniki modeli zawierają typy NumPy (np. np.float32, np.str_)
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Nie można zserializować obiektu typu {type(value)}")
+
+def main(argv=None):
+    from AssetStore import get_asset_store
+    from ModelRegistry import get_model_registry
+
+    parser = argparse.ArgumentParser(description="Lokalny serwer HTTP z predykcjami zwierzęcych bliźniaków.")
+    parser.add_argument("--path", required=True, help="Lokalna ścieżka do danych i modeli")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch-size", type=int, default=16, help="Maksymalna liczba zdjęć w mikro-paczce")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="Maksymalny czas kompletowania mikro-paczki")
+    parser.add_argument("--storage", default="drive", help="Źródło danych: drive, adres lustra HTTP lub folder z lustrem")
+    parser.add_argument("--image-training-mode", default="full", choices=["full", "head"],
+                        help="Trening modelu obrazów, gdy nie ma zapisanego modelu: full - cała sieć, head - głowica na zamrożonym MobileNetV2")
+    parser.add_argument("--metrics-file", help="Plik z metrykami etapów (.prom - Prometheus, .json - JSON) zapisywany co --metrics-interval s")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, help="Co ile sekund zapisywać plik z metrykami")
+    parser.add_argument("--log-file", help="Plik logu z rotacją (oprócz standardowego wyjścia błędów)")
+    args = parser.parse_args(argv)
+
+    configure_logging(args.log_file, stream=sys.stderr)
+    logger = logging.getLogger("AnimalClassifierLog")
+    get_asset_store(args.path, logger, source=args.storage)
+    # Metryki serwera są zawsze dostępne pod /metrics; plik jest zapisywany tylko z --metrics-file
+    get_metrics().enable(logger, export_path=args.metrics_file, export_interval=args.metrics_interval)
+
+    predictor = get_model_registry(args.path, logger, image_training_mode=args.image_training_mode).get_predictor(warmup=True)
+    server = InferenceServer(predictor, logger, host=args.host, port=args.port, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
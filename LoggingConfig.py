@@ -0,0 +1,53 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+def configure_logging(log_file: str = None, level: int = logging.INFO, max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3,
+                      stream=None) -> logging.handlers.QueueListener:
+    """
+    Konfiguruje logowanie przez kolejkę: wątki aplikacji tylko wkładają rekordy do kolejki, a zapis do pliku
+    (z rotacją) i na konsolę wykonuje osobny wątek QueueListener. QueueHandler składa komunikat w wątku,
+    który go zalogował, więc późniejsze zmiany argumentów (np. list) nie wpływają na treść logu.
+    args:
+        log_file: str - Plik logu (None - bez pliku)
+        level: int - Poziom logowania
+        max_bytes: int - Rozmiar pliku logu, po którym jest on rotowany
+        backup_count: int - Liczba zachowywanych starszych plików logu
+        stream: plik tekstowy - Dodatkowe wyjście logu (np. sys.stderr)
+    return:
+        logging.handlers.QueueListener - Uruchomiony wątek zapisujący (zatrzymywany przez stop_logging lub przy wyjściu)
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="UTF-8")
+        handlers.append(file_handler)
+    if stream is not None:
+        handlers.append(logging.StreamHandler(stream))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener.start()
+    atexit.register(stop_logging, listener)
+    return listener
+
+def stop_logging(listener: logging.handlers.QueueListener):
+    """
+    Zapisuje pozostałe w kolejce rekordy i zatrzymuje wątek zapisujący.
+    """
+    if getattr(listener, "_thread", None) is not None:  # Wątek mógł już zostać zatrzymany
+        listener.stop()
@@ -0,0 +1,213 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+METRIC_PREFIX = "blizniaki_"
+# Progi histogramów czasu w sekundach (od predykcji po pobieranie archiwów i trening)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+class _NullSpan:
+    """
+    Pomiar, który nic nie robi - używany, gdy metryki są wyłączone.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics, name: str, labels: dict):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(f"{self.name}_seconds", time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            self.metrics.increment(f"{self.name}_errors", **self.labels)
+        return False
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(label_key: tuple, extra: tuple = ()) -> str:
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+class Metrics:
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        """
+        Lekkie metryki działania aplikacji: pomiary czasu (span), liczniki i histogramy, eksportowane
+        do pliku w formacie tekstowym Prometheus lub JSON. Domyślnie wyłączone - wtedy każdy pomiar
+        sprowadza się do sprawdzenia jednej flagi.
+        args:
+            buckets: tuple - Progi histogramów
+        """
+        self.enabled = False
+        self.buckets = tuple(buckets)
+        self.logger = None
+        self.export_path = None
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._exporter = None
+        self._stop_exporter = threading.Event()
+
+    def enable(self, logger: logging.Logger = None, export_path: str = None, export_interval: float = 15.0):
+        """
+        Włącza zbieranie metryk i opcjonalnie ich okresowy zapis do pliku.
+        args:
+            logger: logging.Logger - Wspólny logger
+            export_path: str - Plik z metrykami (.json - JSON, w przeciwnym razie format tekstowy Prometheus)
+            export_interval: float - Co ile sekund zapisywać plik
+        """
+        self.logger = logger
+        self.export_path = export_path
+        self.enabled = True
+        if export_path and self._exporter is None:
+            self._stop_exporter.clear()
+            self._exporter = threading.Thread(target=self._export_loop, args=(export_interval,), name="metrics-exporter", daemon=True)
+            self._exporter.start()
+        if logger:
+            logger.info("Metryki włączone%s.", f" (zapis do {export_path} co {export_interval:g} s)" if export_path else "")
+
+    def disable(self):
+        """
+        Wyłącza zbieranie metryk i zapisuje je ostatni raz do pliku.
+        """
+        self.enabled = False
+        if self._exporter is not None:
+            self._stop_exporter.set()
+            self._exporter.join()
+            self._exporter = None
+
+    def span(self, name: str, **labels):
+        """
+        Mierzy czas bloku with i zapisuje go w histogramie <name>_seconds; wyjątki zlicza w <name>_errors.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """
+        Zwiększa licznik <name>_total.
+        """
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Dodaje pomiar do histogramu.
+        """
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)  # Pierwszy próg >= value (ostatni kubełek to +Inf)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Zwraca bieżące wartości metryk jako słownik (format JSON).
+        """
+        with self._lock:
+            counters = {name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                        for name, series in self._counters.items()}
+            histograms = {}
+            for name, series in self._histograms.items():
+                histograms[name] = []
+                for key, histogram in series.items():
+                    cumulative, total = {}, 0
+                    for bound, count in zip(self.buckets + ("+Inf",), histogram["buckets"]):
+                        total += count
+                        cumulative[str(bound)] = total
+                    histograms[name].append({"labels": dict(key), "count": histogram["count"], "sum": histogram["sum"], "buckets": cumulative})
+        return {"timestamp": time.time(), "counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """
+        Zwraca metryki w formacie tekstowym Prometheus (np. dla textfile collector node_exportera).
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in sorted(snapshot["counters"].items()):
+            metric = f"{METRIC_PREFIX}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for entry in series:
+                lines.append(f"{metric}{_format_labels(_label_key(entry['labels']))} {entry['value']:g}")
+        for name, series in sorted(snapshot["histograms"].items()):
+            metric = f"{METRIC_PREFIX}{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for entry in series:
+                key = _label_key(entry["labels"])
+                for bound, count in entry["buckets"].items():
+                    lines.append(f"{metric}_bucket{_format_labels(key, (('le', bound),))} {count}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {entry['sum']:.6f}")
+                lines.append(f"{metric}_count{_format_labels(key)} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str = None):
+        """
+        Zapisuje metryki do pliku (atomowo, więc czytający nigdy nie widzi niepełnego pliku).
+        args:
+            path: str - Plik docelowy (domyślnie export_path z enable)
+        """
+        path = path or self.export_path
+        content = json.dumps(self.snapshot(), ensure_ascii=False) if path.endswith(".json") else self.to_prometheus()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write(content)
+        os.replace(temp_path, path)
+
+    def _export_loop(self, interval: float):
+        while True:
+            stopped = self._stop_exporter.wait(interval)
+            try:
+                self.export()
+            except OSError as e:
+                if self.logger:
+                    self.logger.warning("Nie udało się zapisać metryk: %s", str(e))
+            if stopped:
+                return
+
+_metrics = Metrics()
+
+def get_metrics() -> Metrics:
+    """
+    Zwraca metryki wspólne dla całego procesu (domyślnie wyłączone, włączane przez Metrics.enable).
+    """
+    return _metrics
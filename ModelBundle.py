@@ -0,0 +1,221 @@
+import json
+import os
+import shutil
+from datetime import datetime
+import numpy as np
+
+SCHEMA_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+KEEP_VERSIONS = 2  # Bieżąca i poprzednia wersja - proces, który wczytał poprzednią, nadal ma swoje pliki
+
+def bundle_exists(bundle_dir: str) -> bool:
+    return os.path.exists(os.path.join(bundle_dir, MANIFEST_NAME))
+
+def library_mismatches(saved: dict, current: dict) -> list:
+    """
+    Porównuje wersje bibliotek (major.minor) zapisane w pakiecie z bieżącymi.
+    return:
+        list - Opisy różnic, np. ["scikit-learn 1.4 != 1.5"]
+    """
+    def minor(version: str) -> str:
+        return ".".join(str(version).split(".")[:2])
+
+    return [f"{name} {minor(saved[name])} != {minor(version)}" for name, version in current.items()
+            if name in saved and minor(saved[name]) != minor(version)]
+
+class ModelBundle:
+    def __init__(self, bundle_dir: str, manifest: dict, mmap_mode: str = "r"):
+        """
+        Wersjonowany pakiet modelu: jeden manifest (wersja schematu, klasy, cechy, skrót danych treningowych,
+        metryki) i nieskompresowane tablice .npy wczytywane przez mapowanie w pamięci, więc kilka procesów
+        korzysta z tych samych stron pliku. Każdy zapis tworzy nowy podfolder wersji, a manifest jest
+        podmieniany atomowo. Poprzednia wersja zostaje na dysku, więc model wczytany wcześniej (np. w innym
+        procesie) nadal działa na swoich plikach, także tych otwieranych dopiero przy pierwszym użyciu.
+        args:
+            bundle_dir: str - Folder pakietu
+            manifest: dict - Wczytany manifest
+            mmap_mode: str - Tryb mapowania tablic w pamięci (None - wczytanie do RAM)
+        """
+        self.bundle_dir = bundle_dir
+        self.manifest = manifest
+        self.mmap_mode = mmap_mode
+        self._arrays = {}
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    @property
+    def classes(self) -> list:
+        return self.manifest["classes"]
+
+    @property
+    def features(self) -> list:
+        return self.manifest["features"]
+
+    @classmethod
+    def load(cls, bundle_dir: str, kind: str, mmap_mode: str = "r") -> "ModelBundle":
+        """
+        Wczytuje manifest pakietu i sprawdza, czy pakiet jest zgodny z bieżącą wersją aplikacji.
+        args:
+            bundle_dir: str - Folder pakietu
+            kind: str - Oczekiwany rodzaj modelu (np. "animal_features")
+            mmap_mode: str - Tryb mapowania tablic w pamięci
+        return:
+            ModelBundle - Pakiet (tablice są otwierane przy pierwszym użyciu)
+        """
+        manifest_path = os.path.join(bundle_dir, MANIFEST_NAME)
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+
+        if manifest.get("schema_version") != SCHEMA_VERSION:
+            raise ValueError(f"Niezgodna wersja pakietu modelu {bundle_dir}: {manifest.get('schema_version')} (obsługiwana: {SCHEMA_VERSION}).")
+        if manifest.get("kind") != kind:
+            raise ValueError(f"Pakiet {bundle_dir} zawiera model {manifest.get('kind')}, a oczekiwano {kind}.")
+        for name, entry in {**manifest["arrays"], **manifest["files"]}.items():
+            if not os.path.exists(os.path.join(bundle_dir, entry["file"])):
+                raise ValueError(f"Brak pliku {entry['file']} ({name}) w pakiecie {bundle_dir}.")
+        return cls(bundle_dir, manifest, mmap_mode=mmap_mode)
+
+    @classmethod
+    def write(cls, bundle_dir: str, kind: str, classes: list, features: list = None, data_sha256: str = None, metrics: dict = None,
+              arrays: dict = None, files: dict = None, libraries: dict = None, extra: dict = None) -> "ModelBundle":
+        """
+        Zapisuje nową wersję pakietu i atomowo podmienia manifest. Wersje starsze niż poprzednia są usuwane.
+        args:
+            bundle_dir: str - Folder pakietu
+            kind: str - Rodzaj modelu
+            classes: list - Nazwy klas w kolejności wyjść modelu
+            features: list - Nazwy cech wejściowych w kolejności kolumn modelu
+            data_sha256: str - Skrót SHA-256 danych treningowych
+            metrics: dict - Metryki modelu na zbiorze testowym
+            arrays: dict - Tablice NumPy ({nazwa: tablica}), zapisywane bez kompresji jako .npy
+            files: dict - Pozostałe pliki ({nazwa pliku: funkcja(ścieżka) zapisująca plik})
+            libraries: dict - Wersje bibliotek użytych do treningu ({nazwa: wersja})
+            extra: dict - Dodatkowe parametry modelu
+        return:
+            ModelBundle - Zapisany pakiet
+        """
+        version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        version_dir = os.path.join(bundle_dir, version)
+        os.makedirs(version_dir)
+
+        manifest = {
+            "schema_version": SCHEMA_VERSION,
+            "kind": kind,
+            "version": version,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "classes": [str(name) for name in classes],
+            "features": [str(name) for name in features] if features is not None else None,
+            "data_sha256": data_sha256,
+            "metrics": metrics or {},
+            "libraries": {"numpy": np.__version__, **(libraries or {})},
+            "extra": extra or {},
+            "arrays": {},
+            "files": {},
+        }
+        for name, array in (arrays or {}).items():
+            array = np.ascontiguousarray(array)
+            if array.dtype.hasobject:
+                raise ValueError(f"Tablica {name} ma typ object i nie może być mapowana w pamięci.")
+            file_name = f"{version}/{name}.npy"
+            np.save(os.path.join(bundle_dir, file_name), array, allow_pickle=False)
+            manifest["arrays"][name] = {"file": file_name, "dtype": array.dtype.str, "shape": list(array.shape)}
+        for name, writer in (files or {}).items():
+            file_name = f"{version}/{name}"
+            writer(os.path.join(bundle_dir, file_name))
+            manifest["files"][name] = {"file": file_name}
+
+        bundle = cls(bundle_dir, manifest)
+        bundle._save_manifest()
+        bundle.remove_old_versions()
+        return bundle
+
+    def _save_manifest(self):
+        manifest_path = os.path.join(self.bundle_dir, MANIFEST_NAME)
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(self.manifest, manifest_file, ensure_ascii=False, indent=2)
+        os.replace(temp_path, manifest_path)
+
+    def remove_old_versions(self, keep: int = KEEP_VERSIONS):
+        """
+        Usuwa podfoldery wersji starszych niż keep najnowszych (pliki wciąż mapowane w pamięci, np. w Windows,
+        zostają do następnego zapisu).
+        """
+        # Nazwy wersji to znaczniki czasu, więc kolejność alfabetyczna jest chronologiczna
+        versions = sorted(name for name in os.listdir(self.bundle_dir) if os.path.isdir(os.path.join(self.bundle_dir, name)))
+        for name in versions[:-keep]:
+            if name != self.version:
+                shutil.rmtree(os.path.join(self.bundle_dir, name), ignore_errors=True)
+
+    def has_array(self, name: str) -> bool:
+        return name in self.manifest["arrays"]
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        Zwraca tablicę z pakietu (mapowaną w pamięci) po sprawdzeniu typu i wymiarów z manifestem.
+        """
+        if name not in self._arrays:
+            entry = self.manifest["arrays"][name]
+            array = np.load(os.path.join(self.bundle_dir, entry["file"]), mmap_mode=self.mmap_mode, allow_pickle=False)
+            if array.dtype.str != entry["dtype"] or list(array.shape) != entry["shape"]:
+                raise ValueError(f"Tablica {name} w pakiecie {self.bundle_dir} nie zgadza się z manifestem "
+                                 f"({array.dtype.str} {list(array.shape)} zamiast {entry['dtype']} {entry['shape']}).")
+            self._arrays[name] = array
+        return self._arrays[name]
+
+    def arrays(self, prefix: str = "") -> dict:
+        """
+        Zwraca wszystkie tablice, których nazwy zaczynają się od prefix ({nazwa bez prefiksu: tablica}).
+        """
+        return {name[len(prefix):]: self.array(name) for name in self.manifest["arrays"] if name.startswith(prefix)}
+
+    def has_file(self, name: str) -> bool:
+        return name in self.manifest["files"]
+
+    def file_path(self, name: str) -> str:
+        if name not in self.manifest["files"]:
+            raise FileNotFoundError(f"Brak pliku {name} w pakiecie {self.bundle_dir}.")
+        return os.path.join(self.bundle_dir, self.manifest["files"][name]["file"])
+
+    def add_file(self, name: str, writer) -> str:
+        """
+        Dopisuje plik do bieżącej wersji pakietu (np. wyeksportowany model TFLite) i zapisuje manifest.
+        args:
+            name: str - Nazwa pliku w pakiecie
+            writer: callable(ścieżka) - Funkcja zapisująca plik
+        return:
+            str - Ścieżka do zapisanego pliku
+        """
+        with open(os.path.join(self.bundle_dir, MANIFEST_NAME), "r", encoding="utf-8") as manifest_file:
+            current_version = json.load(manifest_file).get("version")
+        if current_version != self.version:
+            raise ValueError(f"Pakiet {self.bundle_dir} zapisano w międzyczasie w nowszej wersji ({current_version}) - wczytaj go ponownie.")
+
+        file_name = f"{self.version}/{name}"
+        file_path = os.path.join(self.bundle_dir, file_name)
+        temp_path = file_path + ".tmp"
+        writer(temp_path)
+        os.replace(temp_path, file_path)
+        self.manifest["files"][name] = {"file": file_name}
+        self._save_manifest()
+        return file_path
+
+    def check(self, features: list = None, classes: list = None, data_sha256: str = None):
+        """
+        Sprawdza, czy pakiet pasuje do oczekiwanych cech, klas lub danych treningowych.
+        Rzuca ValueError z opisem różnic zamiast pozwalać na ciche pomieszanie kolumn lub klas.
+        """
+        problems = []
+        if features is not None and list(map(str, features)) != self.features:
+            missing = sorted(set(map(str, features)) - set(self.features or []))
+            unknown = sorted(set(self.features or []) - set(map(str, features)))
+            problems.append(f"cechy (brakujące: {missing}, nieznane: {unknown})" if missing or unknown else "kolejność cech")
+        if classes is not None and list(map(str, classes)) != self.classes:
+            problems.append(f"klasy ({len(self.classes)} w pakiecie, oczekiwano {len(classes)})" if len(classes) != len(self.classes)
+                            else "nazwy lub kolejność klas")
+        if data_sha256 is not None and self.manifest.get("data_sha256") not in (None, data_sha256):
+            problems.append("skrót danych treningowych")
+        if problems:
+            raise ValueError(f"Pakiet modelu {self.bundle_dir} jest niezgodny: {'; '.join(problems)}.")
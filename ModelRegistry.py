@@ -0,0 +1,192 @@
+import logging
+import os
+import threading
+import time
+import numpy as np
+from typing import TYPE_CHECKING
+from AnimalPredictor import AnimalPredictor
+from ResultCache import ResultCache
+from Metrics import get_metrics
+
+if TYPE_CHECKING:
+    from AnimalFeaturesClassifier import AnimalFeaturesClassifier
+    from AnimalImageClassifier import AnimalImageClassifier
+
+FEATURES_DRIVE_FILE_ID = '179GmVjydVw8D9RqUB1hQ2FPq6JRYURv3'
+IMAGES_DRIVE_FOLDER_ID = '15SPPgjtECp5FWawf2z_lWKhvlpy6EnMU'
+
+class ModelRegistry:
+    def __init__(self, local_path: str, logger: logging.Logger,
+                 features_file_id: str = FEATURES_DRIVE_FILE_ID, images_folder_id: str = IMAGES_DRIVE_FOLDER_ID,
+                 image_engine: str = "keras", image_quantization: str = "float16", image_training_mode: str = "full",
+                 result_cache_size: int = 256, result_cache_ttl: float = 24 * 3600):
+        """
+        Rejestr modeli współdzielony w obrębie procesu. Każdy model jest wczytywany tylko raz.
+        args:
+            local_path: str - Lokalna ścieżka do zapisu danych
+            logger: logging.Logger - Wspólny logger
+            features_file_id: str - Id pliku z bazą cech na Google Drive
+            images_folder_id: str - Id archiwum ze zdjęciami na Google Drive
+            image_engine: str - Silnik predykcji klasyfikatora obrazów ("keras" lub "tflite")
+            image_quantization: str - Rodzaj kwantyzacji modelu TFLite
+            image_training_mode: str - Tryb treningu modelu obrazów, gdy nie ma zapisanego modelu ("full" lub "head")
+            result_cache_size: int - Liczba wyników predykcji w pamięci podręcznej (0 - bez pamięci)
+            result_cache_ttl: float - Czas ważności wyniku w pamięci podręcznej w sekundach
+        """
+        self.path = local_path
+        self.logger = logger
+        self.features_file_id = features_file_id
+        self.images_folder_id = images_folder_id
+        self.image_engine = image_engine
+        self.image_quantization = image_quantization
+        self.image_training_mode = image_training_mode
+        self.result_cache_size = result_cache_size
+        self.result_cache_ttl = result_cache_ttl
+
+        self._features_classifier = None
+        self._image_classifier = None
+        self._predictor = None
+        # Osobne blokady pozwalają wczytywać oba modele jednocześnie w różnych wątkach
+        self._lock = threading.RLock()
+        self._features_lock = threading.Lock()
+        self._image_lock = threading.Lock()
+
+    def get_features_classifier(self, warmup: bool = False, refresh_data: bool = False) -> "AnimalFeaturesClassifier":
+        """
+        Zwraca wczytany klasyfikator cech (wczytuje go przy pierwszym wywołaniu).
+        args:
+            warmup: bool - Czy wykonać próbną predykcję po wczytaniu
+            refresh_data: bool - Czy po wczytaniu zapisanego modelu sprawdzić w źródle, czy baza cech się zmieniła
+        return:
+            AnimalFeaturesClassifier - Współdzielona instancja klasyfikatora
+        """
+        with self._features_lock:
+            if self._features_classifier is None:
+                start = time.perf_counter()
+                # Import przy pierwszym wczytaniu modelu - pandas i scikit-learn nie spowalniają uruchamiania aplikacji
+                from AnimalFeaturesClassifier import AnimalFeaturesClassifier
+                with get_metrics().span("model_load", model="features"):
+                    self._features_classifier = AnimalFeaturesClassifier(drive_file_id=self.features_file_id, local_path=self.path, logger=self.logger)
+                self.logger.info("Klasyfikator cech wczytano w %.3f s.", time.perf_counter() - start)
+                # Model wytrenowany przed chwilą (conn ustawione) korzysta już z aktualnej bazy
+                if refresh_data and self._features_classifier.conn is None:
+                    self._refresh_features_data(self._features_classifier)
+                if warmup:
+                    self._warmup_features(self._features_classifier)
+            return self._features_classifier
+
+    def get_image_classifier(self, warmup: bool = False) -> "AnimalImageClassifier":
+        """
+        Zwraca wczytany klasyfikator obrazów (wczytuje go przy pierwszym wywołaniu).
+        args:
+            warmup: bool - Czy wykonać próbną predykcję po wczytaniu
+        return:
+            AnimalImageClassifier - Współdzielona instancja klasyfikatora
+        """
+        with self._image_lock:
+            if self._image_classifier is None:
+                start = time.perf_counter()
+                # Import przy pierwszym wczytaniu modelu - TensorFlow nie spowalnia uruchamiania aplikacji
+                from AnimalImageClassifier import AnimalImageClassifier
+                with get_metrics().span("model_load", model="image"):
+                    self._image_classifier = AnimalImageClassifier(drive_folder_id=self.images_folder_id, local_path=self.path, logger=self.logger,
+                                                                   engine=self.image_engine, quantization=self.image_quantization,
+                                                                   training_mode=self.image_training_mode)
+                self.logger.info("Klasyfikator obrazów wczytano w %.3f s.", time.perf_counter() - start)
+                if warmup:
+                    self._warmup_image(self._image_classifier)
+            return self._image_classifier
+
+    def get_predictor(self, warmup: bool = False, include_image: bool = True) -> AnimalPredictor:
+        """
+        Zwraca połączony klasyfikator korzystający ze współdzielonych modeli.
+        args:
+            warmup: bool - Czy wykonać próbne predykcje po wczytaniu modeli
+            include_image: bool - Czy klasyfikator obrazów jest potrzebny; bez niego predyktor
+                                  obsługuje tylko cechy, a klasyfikator obrazów jest dołączany później
+        return:
+            AnimalPredictor - Współdzielona instancja połączonego klasyfikatora
+        """
+        with self._lock:
+            if self._predictor is None:
+                result_cache = None
+                if self.result_cache_size > 0:
+                    result_cache = ResultCache(self.logger, max_entries=self.result_cache_size, ttl_seconds=self.result_cache_ttl,
+                                               persist_path=os.path.join(self.path, 'cache', 'predictions.json'))
+                self._predictor = AnimalPredictor(
+                    features_classifier=self.get_features_classifier(warmup=warmup),
+                    image_classifier=self.get_image_classifier(warmup=warmup) if include_image else None,
+                    logger=self.logger,
+                    result_cache=result_cache
+                )
+            elif include_image and self._predictor.image_classifier is None:
+                self._predictor.image_classifier = self.get_image_classifier(warmup=warmup)
+            return self._predictor
+
+    def warmup(self):
+        """
+        Wczytuje oba modele i wykonuje na nich próbne predykcje.
+        """
+        self.get_predictor(warmup=True)
+
+    def reload(self, warmup: bool = False, refresh_data: bool = True) -> AnimalPredictor:
+        """
+        Wymusza ponowne wczytanie obu modeli z dysku.
+        args:
+            warmup: bool - Czy wykonać próbne predykcje po wczytaniu
+            refresh_data: bool - Czy najpierw sprawdzić w źródle bazę cech i wytrenować model ponownie, jeśli się zmieniła
+        return:
+            AnimalPredictor - Nowa instancja połączonego klasyfikatora
+        """
+        with self._lock, self._features_lock, self._image_lock:
+            if refresh_data and self._features_classifier is not None:
+                self._refresh_features_data(self._features_classifier)
+            self.logger.info("Wymuszono ponowne wczytanie modeli.")
+            self._features_classifier = None
+            self._image_classifier = None
+            self._predictor = None
+        return self.get_predictor(warmup=warmup)
+
+    def _refresh_features_data(self, classifier: "AnimalFeaturesClassifier") -> bool:
+        """
+        Sprawdza w źródle (ETag i skrót pliku), czy baza cech się zmieniła, i trenuje model ponownie tylko wtedy,
+        gdy się zmieniła. Przy braku połączenia lub nieudanym treningu zostaje dotychczasowy model.
+        """
+        try:
+            return classifier.update_if_data_changed()
+        except Exception as e:
+            self.logger.warning("Nie udało się odświeżyć modelu cech: %s", str(e))
+            return False
+
+    def _warmup_features(self, classifier: "AnimalFeaturesClassifier"):
+        start = time.perf_counter()
+        with get_metrics().span("model_warmup", model="features"):
+            classifier.predict_top_10({feature: 50 for feature in classifier.features})
+        self.logger.info("Rozgrzewka klasyfikatora cech zajęła %.3f s.", time.perf_counter() - start)
+
+    def _warmup_image(self, classifier: "AnimalImageClassifier"):
+        start = time.perf_counter()
+        dummy = np.zeros((1, *classifier.image_size, 3), dtype=np.float32)
+        with get_metrics().span("model_warmup", model="image"):
+            classifier.predict_arrays(dummy)
+        self.logger.info("Rozgrzewka klasyfikatora obrazów zajęła %.3f s.", time.perf_counter() - start)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry(local_path: str, logger: logging.Logger, **options) -> ModelRegistry:
+    """
+    Zwraca rejestr modeli wspólny dla całego procesu.
+    args:
+        local_path: str - Lokalna ścieżka do zapisu danych
+        logger: logging.Logger - Wspólny logger
+        options: dict - Dodatkowe parametry ModelRegistry, użyte przy pierwszym utworzeniu rejestru
+    return:
+        ModelRegistry - Wspólny rejestr modeli
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(local_path=local_path, logger=logger, **options)
+        return _registry
@@ -0,0 +1,276 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from string import Template
+import base64
+import io
+import logging
+import os
+import threading
+import time
+from Metrics import get_metrics
+
+# Szablon raportu HTML - przetwarzany raz przy imporcie modułu
+HTML_TEMPLATE = Template("""
+        <!DOCTYPE html>
+        <html lang="pl">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>Raport Blizniaka</title>
+            <style>
+                body {
+                    font-family: Arial, sans-serif;
+                    margin: 20px;
+                    padding: 0;
+                    line-height: 1.6;
+                }
+                h1 {
+                    text-align: center;
+                    color: #333;
+                }
+                h2 {
+                    margin-top: 40px;
+                    color: #444;
+                }
+                .animal {
+                    margin: 20px 0;
+                }
+                img {
+                    display: block;
+                    margin: 0 auto;
+                    max-width: 300px;
+                    height: auto;
+                }
+                .description {
+                    text-align: center;
+                    margin: 10px 0;
+                }
+            </style>
+        </head>
+        <body>
+            <img src="data:image/jpeg;base64,$logo" alt="Logo aplikacji" style="display: block; margin: 0 auto; max-width: 150px; height: auto;">
+            <h1>Ranking Twoich zwierzęcych bliźniaków</h1>
+            <p style="text-align: center;">Data generowania raportu: $date</p>
+
+            <div class="animal">
+                <h2 style="text-align: center;">1. $top_animal</h2>
+                <img src="data:image/jpeg;base64,$animal_image" alt="Zdjęcie zwierzęcia">
+                <p class="description">$description</p>
+            </div>
+                        <ul>
+        $other_animals
+            </ul>
+        </body>
+        </html>
+        """)
+
+_fonts_lock = threading.Lock()
+_fonts_registered = False
+
+def register_fonts(fonts_dir: str):
+    """
+    Rejestruje czcionki raportu PDF (tylko raz w procesie).
+    """
+    global _fonts_registered
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    with _fonts_lock:
+        if not _fonts_registered:
+            pdfmetrics.registerFont(TTFont("CenturySchoolbook", os.path.join(fonts_dir, "CENSCBK.ttf")))
+            pdfmetrics.registerFont(TTFont("CenturySchoolbook-Bold", os.path.join(fonts_dir, "SCHLBKB.TTF")))
+            _fonts_registered = True
+
+class ReportEngine:
+    def __init__(self, path: str, logger: logging.Logger, animal_labels: dict, describe, max_workers: int = 2):
+        """
+        Generowanie raportów PDF i HTML w tle. Czcionki są rejestrowane raz, a zakodowane obrazy
+        (logo, zdjęcia zwierząt) są przechowywane w pamięci do czasu zmiany pliku.
+        args:
+            path: str - Folder z danymi aplikacji (logo, czcionki, najlepsze zdjęcia)
+            logger: logging.Logger - Wspólny logger
+            animal_labels: dict - Nazwy wyświetlane zwierząt ({nazwa w modelu: nazwa wyświetlana})
+            describe: callable(nazwa) -> str - Zwraca opis zwierzęcia
+            max_workers: int - Liczba wątków generujących raporty
+        """
+        self.path = path
+        self.logger = logger
+        self.animal_labels = animal_labels
+        self.describe = describe
+        self.logo_path = os.path.join(path, "logo.png")
+        self._images = {}
+        self._images_lock = threading.Lock()
+        self._paragraph_style = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+
+    def _image_bytes(self, image_path: str) -> dict:
+        """
+        Zwraca zawartość obrazu i jej zapis Base64 (z pamięci, jeśli plik się nie zmienił).
+        """
+        stat = os.stat(image_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._images_lock:
+            cached = self._images.get(image_path)
+            if cached and cached["signature"] == signature:
+                return cached
+
+        with open(image_path, "rb") as img_file:
+            data = img_file.read()
+        cached = {"signature": signature, "data": data, "base64": base64.b64encode(data).decode("utf-8")}
+        with self._images_lock:
+            self._images[image_path] = cached
+        return cached
+
+    def _animal_image_path(self, animal_name: str) -> str:
+        return os.path.join(self.path, "najlepsze_zdjecia", f"naj_{animal_name}.jpg")
+
+    def _display_name(self, animal_name: str) -> str:
+        return self.animal_labels.get(animal_name, animal_name.capitalize())
+
+    def _description_style(self):
+        if self._paragraph_style is None:
+            from reportlab.lib.styles import getSampleStyleSheet
+            from reportlab.lib.enums import TA_CENTER
+            style = getSampleStyleSheet()["BodyText"]
+            style.fontName = "CenturySchoolbook"
+            style.fontSize = 14
+            style.leading = 14
+            style.alignment = TA_CENTER
+            self._paragraph_style = style
+        return self._paragraph_style
+
+    def generate(self, top_animals: list, output_dir: str) -> Future:
+        """
+        Rozpoczyna w tle równoległe generowanie raportu PDF i HTML.
+        args:
+            top_animals: list - Ranking zwierząt [(nazwa, wynik)]
+            output_dir: str - Folder docelowy raportów
+        return:
+            Future - Wynik: słownik ścieżek {"pdf": ..., "html": ...} lub wyjątek z generowania
+        """
+        start = time.perf_counter()
+        os.makedirs(output_dir, exist_ok=True)
+        now = datetime.now()
+        report = {
+            "date": now.strftime("%Y-%m-%d %H:%M"),
+            "top_animals": top_animals,
+            "description": self.describe(top_animals[0][0]),
+        }
+        file_stem = os.path.join(output_dir, f"raport_{now.strftime('%Y-%m-%d_%H%M')}")
+        paths = {"pdf": file_stem + ".pdf", "html": file_stem + ".html"}
+
+        renders = [
+            self._executor.submit(self._timed, "PDF", self.render_pdf, report, paths["pdf"]),
+            self._executor.submit(self._timed, "HTML", self.render_html, report, paths["html"]),
+        ]
+        result = Future()
+        remaining = [len(renders)]
+        remaining_lock = threading.Lock()
+
+        def on_render_done(_):
+            with remaining_lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            errors = [render.exception() for render in renders if render.exception() is not None]
+            get_metrics().increment("reports", result="error" if errors else "ok")
+            if errors:
+                result.set_exception(errors[0])
+            else:
+                get_metrics().observe("report_generation_seconds", time.perf_counter() - start)
+                self.logger.info("Raport wygenerowano w %.2f s.", time.perf_counter() - start)
+                result.set_result(paths)
+
+        for render in renders:
+            render.add_done_callback(on_render_done)
+        return result
+
+    def _timed(self, kind: str, render, report: dict, output_path: str):
+        start = time.perf_counter()
+        with get_metrics().span("report_render", format=kind.lower()):
+            render(report, output_path)
+        self.logger.info("Raport %s zapisano w %s (%.2f s).", kind, output_path, time.perf_counter() - start)
+
+    def render_pdf(self, report: dict, pdf_path: str):
+        """
+        Generuje raport z analizy do pliku pdf.
+        """
+        # reportlab jest importowany dopiero przy pierwszym raporcie PDF (szybsze uruchamianie aplikacji)
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.utils import ImageReader
+        from reportlab.platypus import Paragraph, Frame
+
+        register_fonts(os.path.join(self.path, "fonts"))
+        top_animals = report["top_animals"]
+
+        # Tworzenie nowego pliku PDF
+        c = canvas.Canvas(pdf_path, pagesize=letter)
+        width, height = letter
+
+        # Dodanie logo
+        logo_image = ImageReader(io.BytesIO(self._image_bytes(self.logo_path)["data"]))
+        c.drawImage(logo_image, (width - 150) /2, height - 100, width=150, height=100, preserveAspectRatio=True)
+
+        # Tytuł raportu
+        c.setFont("CenturySchoolbook-Bold", 24)
+        c.drawCentredString(width / 2, height - 130, "Ranking Twoich zwierzęcych bliźniaków")
+
+        # Dodanie dnia i godziny generowania raportu
+        c.setFont("CenturySchoolbook", 15)
+        c.drawCentredString(width / 2, height - 150, f"Data: {report['date']}")
+
+        # Zdjęcie top 1 zwierzęcia
+        top_animal_name = top_animals[0][0]
+        c.setFont("CenturySchoolbook-Bold", 16)
+        c.drawCentredString(width / 2, height - 190, f"1. {self._display_name(top_animal_name)}")
+
+        animal_image_path = self._animal_image_path(top_animal_name)
+        if os.path.exists(animal_image_path):
+            animal_image = ImageReader(io.BytesIO(self._image_bytes(animal_image_path)["data"]))
+            c.drawImage(animal_image, (width - 220) / 2, height - 420, width=220, height=220, preserveAspectRatio=True, anchor='nw')
+
+        # Dodanie opisu top 1 zwierzęcia
+        frame = Frame(50, height - 520, width - 100, 100, showBoundary=0)
+        paragraph = Paragraph(report["description"], self._description_style())
+        frame.addFromList([paragraph], c)
+
+        # Dodanie pozostałych zwierząt
+        c.setFont("CenturySchoolbook", 14)
+        y_offset = 480
+        for idx, animal in enumerate(top_animals[1:], start=2):
+            c.drawCentredString(width / 2, height - y_offset - (idx * 20), f"{idx}. {self._display_name(animal[0])}")
+
+        # Zakończenie tworzenia PDF
+        c.save()
+
+    def render_html(self, report: dict, html_path: str):
+        """
+        Generuje raport z analizy do pliku html.
+        """
+        top_animals = report["top_animals"]
+        top_animal_name = top_animals[0][0]
+
+        # Lista pozostałych zwierząt
+        other_animals = "".join(
+            f"<p style='text-align: center'>{idx}. {self._display_name(animal[0])}</p>"
+            for idx, animal in enumerate(top_animals[1:], start=2)
+        )
+
+        html_content = HTML_TEMPLATE.safe_substitute(
+            logo=self._image_bytes(self.logo_path)["base64"],
+            date=report["date"],
+            top_animal=self._display_name(top_animal_name),
+            animal_image=self._image_bytes(self._animal_image_path(top_animal_name))["base64"],
+            description=report["description"],
+            other_animals=other_animals,
+        )
+
+        # Zapis pliku HTML
+        with open(html_path, "w", encoding="utf-8") as html_file:
+            html_file.write(html_content)
+
+    def shutdown(self):
+        """
+        Zamyka pulę wątków (bez czekania na generowane raporty).
+        """
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,144 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class ResultCache:
+    def __init__(self, logger: logging.Logger, max_entries: int = 256, ttl_seconds: float = 24 * 3600, persist_path: str = None,
+                 flush_interval: float = 5.0):
+        """
+        Pamięć podręczna wyników predykcji typu LRU, z limitem liczby wpisów i czasem ważności.
+        args:
+            logger: logging.Logger - Wspólny logger
+            max_entries: int - Największa liczba przechowywanych wyników (najdawniej użyte są usuwane)
+            ttl_seconds: float - Czas ważności wyniku w sekundach (None - bez limitu)
+            persist_path: str - Plik JSON, w którym wyniki są zachowywane między uruchomieniami (None - tylko w pamięci)
+            flush_interval: float - Co ile sekund zapisywać zmienione wyniki do pliku (w osobnym wątku, poza ścieżką predykcji)
+        """
+        self.logger = logger
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self.flush_interval = flush_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._flusher = None
+        self._stop_flusher = threading.Event()
+        self._load()
+        if self.persist_path:
+            atexit.register(self.close)
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError) as e:
+            self.logger.warning("Nie udało się wczytać zapisanych wyników predykcji: %s", str(e))
+            return
+
+        now = time.time()
+        for key, created, value in entries[-self.max_entries:]:
+            if not self._expired(created, now):
+                self._entries[key] = (created, [tuple(item) for item in value])
+        self.logger.info("Wczytano %d zapisanych wyników predykcji.", len(self._entries))
+
+    def flush(self):
+        """
+        Zapisuje wyniki do pliku, jeśli zmieniły się od ostatniego zapisu.
+        """
+        with self._save_lock:  # Migawka i zapis pod jedną blokadą - starsza migawka nie nadpisze nowszej
+            with self._lock:
+                if not self.persist_path or not self._dirty:
+                    return
+                entries = [[key, created, [[animal, float(score)] for animal, score in value]] for key, (created, value) in self._entries.items()]
+                self._dirty = False
+            try:
+                self._save(entries)
+            except OSError as e:
+                with self._lock:
+                    self._dirty = True
+                self.logger.warning("Nie udało się zapisać wyników predykcji: %s", str(e))
+
+    def close(self):
+        """
+        Zatrzymuje wątek zapisujący i zapisuje ostatnie zmiany.
+        """
+        if self._flusher is not None:
+            self._stop_flusher.set()
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._stop_flusher.wait(self.flush_interval):
+            self.flush()
+
+    def _save(self, entries: list):
+        os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+        temp_path = self.persist_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as cache_file:
+            json.dump(entries, cache_file, ensure_ascii=False)
+        os.replace(temp_path, self.persist_path)
+
+    def get(self, key: str):
+        """
+        Zwraca zapisany wynik lub None, jeśli go nie ma albo jest przeterminowany.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0], time.time()):
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key: str, value: list):
+        """
+        Zapisuje wynik, usuwając najdawniej użyte wpisy ponad limit.
+        args:
+            key: str - Klucz wyniku
+            value: list - Lista [(zwierzę, prawdopodobieństwo)]
+        """
+        with self._lock:
+            self._entries[key] = (time.time(), list(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.persist_path:
+                # Plik jest zapisywany w tle przez wątek zapisujący, a nie przy każdej predykcji
+                self._dirty = True
+                if self._flusher is None:
+                    self._stop_flusher.clear()
+                    self._flusher = threading.Thread(target=self._flush_loop, name="result-cache-flush", daemon=True)
+                    self._flusher.start()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = False
+            if self.persist_path and os.path.exists(self.persist_path):
+                os.remove(self.persist_path)
+
+    def stats(self) -> dict:
+        """
+        Zwraca liczniki trafień i chybień oraz liczbę wpisów.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,298 @@
+import json
+import logging
+import os
+import struct
+import zlib
+
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+CENTRAL_DIRECTORY_SIGNATURE = b"PK\x01\x02"
+END_OF_CENTRAL_DIRECTORY_SIGNATURE = b"PK\x05\x06"
+DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+CHUNK_SIZE = 256 * 1024
+
+class _StreamBuffer:
+    def __init__(self, stream):
+        self.stream = stream
+        self._buffer = b""
+
+    def read(self, size: int) -> bytes:
+        """
+        Czyta dokładnie size bajtów (mniej tylko na końcu strumienia).
+        """
+        parts = [self._buffer[:size]]
+        self._buffer = self._buffer[size:]
+        missing = size - len(parts[0])
+        while missing > 0:
+            chunk = self.stream.read(max(missing, CHUNK_SIZE))
+            if not chunk:
+                break
+            parts.append(chunk[:missing])
+            self._buffer = chunk[missing:]
+            missing -= len(parts[-1])
+        return b"".join(parts)
+
+    def read_some(self, limit: int = CHUNK_SIZE) -> bytes:
+        if self._buffer:
+            chunk, self._buffer = self._buffer[:limit], self._buffer[limit:]
+            return chunk
+        return self.stream.read(limit)
+
+    def unread(self, data: bytes):
+        self._buffer = data + self._buffer
+
+class ZipEntry:
+    def __init__(self, name: str, method: int, flags: int, crc: int, compressed_size: int, size: int, source: _StreamBuffer):
+        """
+        Pozycja archiwum ZIP odczytana z nagłówka lokalnego. Dane trzeba odczytać (read) albo pominąć (skip)
+        przed przejściem do następnej pozycji.
+        args:
+            name: str - Ścieżka pliku w archiwum
+            method: int - Metoda kompresji (0 - bez kompresji, 8 - deflate)
+            flags: int - Flagi nagłówka
+            crc: int - Suma CRC-32 (None, jeśli jest dopiero w deskryptorze po danych)
+            compressed_size: int - Rozmiar skompresowany (None, jeśli jest dopiero w deskryptorze)
+            size: int - Rozmiar po rozpakowaniu (None, jeśli jest dopiero w deskryptorze)
+        """
+        self.name = name
+        self.method = method
+        self.flags = flags
+        self.crc = crc
+        self.compressed_size = compressed_size
+        self.size = size
+        self._source = source
+        self._consumed = False
+
+    @property
+    def is_dir(self) -> bool:
+        return self.name.endswith("/")
+
+    @property
+    def has_descriptor(self) -> bool:
+        return bool(self.flags & 0x08)
+
+    def read(self) -> bytes:
+        """
+        Rozpakowuje dane pozycji i sprawdza sumę CRC-32.
+        """
+        data = self._consume(keep=True)
+        if zlib.crc32(data) & 0xFFFFFFFF != self.crc or len(data) != self.size:
+            raise ValueError(f"Błędna suma kontrolna CRC pliku {self.name} w archiwum.")
+        return data
+
+    def skip(self):
+        """
+        Pomija dane pozycji (bez rozpakowywania, jeśli rozmiar skompresowany jest znany).
+        """
+        if self._consumed:
+            return
+        if not self.has_descriptor:
+            remaining = self.compressed_size
+            while remaining:
+                chunk = self._source.read(min(remaining, CHUNK_SIZE))
+                if not chunk:
+                    raise ValueError("Archiwum ZIP jest niekompletne.")
+                remaining -= len(chunk)
+            self._consumed = True
+        else:
+            self._consume(keep=False)
+
+    def _consume(self, keep: bool) -> bytes:
+        if self._consumed:
+            raise RuntimeError(f"Dane pliku {self.name} zostały już odczytane.")
+        self._consumed = True
+
+        if self.method not in (0, 8):
+            raise ValueError(f"Nieobsługiwana metoda kompresji {self.method} pliku {self.name}.")
+
+        if not self.has_descriptor:
+            raw = self._source.read(self.compressed_size)
+            if len(raw) != self.compressed_size:
+                raise ValueError("Archiwum ZIP jest niekompletne.")
+            return zlib.decompress(raw, -15) if self.method == 8 else raw
+
+        if self.method == 0:
+            raise ValueError(f"Plik {self.name} bez kompresji i z deskryptorem danych nie może być czytany strumieniowo.")
+
+        # Rozmiar danych jest znany dopiero z deskryptora - dekompresja do końca strumienia deflate
+        decompressor = zlib.decompressobj(-15)
+        parts = []
+        crc = 0
+        size = 0
+        while not decompressor.eof:
+            chunk = self._source.read_some()
+            if not chunk:
+                raise ValueError("Archiwum ZIP jest niekompletne.")
+            data = decompressor.decompress(chunk)
+            crc = zlib.crc32(data, crc)
+            size += len(data)
+            if keep:
+                parts.append(data)
+        self._source.unread(decompressor.unused_data)
+
+        # Deskryptor: [sygnatura] crc, rozmiary 4- lub 8-bajtowe (ZIP64)
+        header = self._source.read(4)
+        if header != DATA_DESCRIPTOR_SIGNATURE:
+            self._source.unread(header)
+        self.crc = struct.unpack("<I", self._source.read(4))[0]
+        descriptor = self._source.read(16)
+        next_signature = descriptor[8:12]
+        if next_signature in (LOCAL_HEADER_SIGNATURE, CENTRAL_DIRECTORY_SIGNATURE) or len(descriptor) < 16:
+            self.compressed_size, self.size = struct.unpack("<II", descriptor[:8])
+            self._source.unread(descriptor[8:])
+        else:
+            self.compressed_size, self.size = struct.unpack("<QQ", descriptor)
+
+        if crc & 0xFFFFFFFF != self.crc or size != self.size:
+            raise ValueError(f"Błędna suma kontrolna CRC pliku {self.name} w archiwum.")
+        return b"".join(parts)
+
+def iter_zip_entries(stream):
+    """
+    Odczytuje kolejne pozycje archiwum ZIP ze strumienia (bez przewijania), np. w trakcie pobierania.
+    args:
+        stream: plik binarny - Strumień z archiwum ZIP
+    return:
+        generator - Obiekty ZipEntry; pozycja nieodczytana przez wywołującego jest pomijana
+    """
+    source = _StreamBuffer(stream)
+    while True:
+        signature = source.read(4)
+        if signature in (CENTRAL_DIRECTORY_SIGNATURE, END_OF_CENTRAL_DIRECTORY_SIGNATURE):
+            return  # Koniec plików - dalej jest tylko katalog centralny
+        if signature != LOCAL_HEADER_SIGNATURE:
+            raise ValueError("Archiwum ZIP jest niekompletne lub uszkodzone.")
+
+        header = source.read(26)
+        _, flags, method, _, _, crc, compressed_size, size, name_length, extra_length = struct.unpack("<HHHHHIIIHH", header)
+        raw_name = source.read(name_length)
+        extra = source.read(extra_length)
+        name = raw_name.decode("utf-8" if flags & 0x800 else "cp437")
+
+        # Rozmiary ZIP64 są w polu dodatkowym 0x0001
+        offset = 0
+        while offset + 4 <= len(extra):
+            field_id, field_length = struct.unpack("<HH", extra[offset:offset + 4])
+            if field_id == 0x0001:
+                values = list(struct.unpack(f"<{field_length // 8}Q", extra[offset + 4:offset + 4 + field_length // 8 * 8]))
+                if size == 0xFFFFFFFF and values:
+                    size = values.pop(0)
+                if compressed_size == 0xFFFFFFFF and values:
+                    compressed_size = values.pop(0)
+            offset += 4 + field_length
+
+        if flags & 0x08:
+            crc = compressed_size = size = None
+        entry = ZipEntry(name, method, flags, crc, compressed_size, size, source)
+        yield entry
+        entry.skip()
+
+class StreamingZipExtractor:
+    def __init__(self, target_dir: str, logger: logging.Logger, state_name: str = None):
+        """
+        Przyrostowe rozpakowywanie archiwum ZIP czytanego strumieniowo: pliki są zapisywane w miarę
+        napływu danych, pliki o tej samej zawartości (CRC-32 i rozmiar) są pomijane, a pliki usunięte
+        z archiwum są usuwane z dysku. Stan rozpakowanych plików jest zapisywany w pliku JSON.
+        args:
+            target_dir: str - Folder docelowy
+            logger: logging.Logger - Wspólny logger
+            state_name: str - Nazwa pliku stanu w folderze docelowym (osobny dla każdego archiwum)
+        """
+        self.target_dir = target_dir
+        self.logger = logger
+        self.state_path = os.path.join(target_dir, state_name or ".extracted.json")
+
+    def _load_state(self) -> dict:
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as state_file:
+                    return json.load(state_file)
+            except (OSError, ValueError) as e:
+                self.logger.warning("Nie udało się wczytać stanu rozpakowanych plików: %s", str(e))
+        return {}
+
+    def _save_state(self, state: dict):
+        os.makedirs(self.target_dir, exist_ok=True)
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file)
+        os.replace(temp_path, self.state_path)
+
+    def _target_path(self, name: str) -> str:
+        target_root = os.path.abspath(self.target_dir)
+        path = os.path.abspath(os.path.join(target_root, *name.split("/")))
+        if os.path.commonpath([target_root, path]) != target_root:
+            raise ValueError(f"Niedozwolona ścieżka w archiwum: {name}")
+        return path
+
+    @staticmethod
+    def _file_crc(path: str) -> int:
+        crc = 0
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                crc = zlib.crc32(chunk, crc)
+        return crc & 0xFFFFFFFF
+
+    def _matches(self, path: str, known: dict, crc: int, size: int) -> bool:
+        if crc is None or not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        if stat.st_size != size:
+            return False
+        if known and known["crc"] == crc and known["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        return self._file_crc(path) == crc
+
+    def extract(self, stream) -> dict:
+        """
+        Rozpakowuje archiwum ze strumienia do folderu docelowego.
+        args:
+            stream: plik binarny - Strumień z archiwum ZIP
+        return:
+            dict - Liczba plików rozpakowanych, niezmienionych i usuniętych
+        """
+        previous = self._load_state()
+        state = {}
+        extracted = unchanged = 0
+
+        for entry in iter_zip_entries(stream):
+            if entry.is_dir:
+                continue
+            path = self._target_path(entry.name)
+            known = previous.get(entry.name)
+
+            if self._matches(path, known, entry.crc, entry.size):
+                entry.skip()
+                unchanged += 1
+            else:
+                data = entry.read()
+                if self._matches(path, known, entry.crc, entry.size):
+                    unchanged += 1  # Zawartość znana dopiero po rozpakowaniu (deskryptor danych)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    temp_path = path + ".tmp"
+                    with open(temp_path, "wb") as file:
+                        file.write(data)
+                    os.replace(temp_path, path)
+                    extracted += 1
+            state[entry.name] = {"crc": entry.crc, "size": entry.size, "mtime_ns": os.stat(path).st_mtime_ns}
+
+        # Usuwanie plików, które zniknęły z archiwum (tylko po przeczytaniu całego archiwum)
+        removed = 0
+        for name in previous:
+            if name not in state:
+                path = self._target_path(name)
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed += 1
+                self._remove_empty_dirs(os.path.dirname(path))
+
+        self._save_state(state)
+        stats = {"extracted": extracted, "unchanged": unchanged, "removed": removed}
+        self.logger.info("Rozpakowywanie archiwum: %s", stats)
+        return stats
+
+    def _remove_empty_dirs(self, directory: str):
+        target_root = os.path.abspath(self.target_dir)
+        while os.path.abspath(directory) != target_root and os.path.isdir(directory) and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
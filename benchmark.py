@@ -0,0 +1,334 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from AssetStore import get_asset_store
+from ImagePipeline import ImagePipeline
+from ReportEngine import ReportEngine
+
+FEATURES = ["lojalnosc", "towarzyskosc", "lenistwo", "troskliwosc", "pozytywnosc", "niezaleznosc",
+            "agresywnosc", "spryt", "odwaga", "pracowitosc"]
+ANIMALS = ["delfin", "jelen", "jez", "koala", "kon", "kot", "krolik", "lew", "lis", "mrowka",
+           "panda", "papuga", "pies", "pszczola", "rekin", "sowa", "surykatka", "tygrys", "wilk", "zolw", "zyrafa"]
+
+def synthetic_image(rng: random.Random, color: tuple, size: tuple) -> Image.Image:
+    """
+    Tworzy zdjęcie z tłem w kolorze klasy i losowymi figurami (zbliżony rozmiar pliku JPEG do prawdziwych zdjęć).
+    """
+    image = Image.new("RGB", size, color)
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        radius = rng.randrange(10, 80)
+        fill = tuple(min(255, max(0, channel + rng.randrange(-60, 60))) for channel in color)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=fill)
+    return image
+
+def create_synthetic_data(mirror_dir: str, data_dir: str, num_classes: int, images_per_class: int, rows_per_class: int,
+                          image_size: tuple = (640, 480), seed: int = 42) -> dict:
+    """
+    Tworzy syntetyczne dane w miejsce plików z Google Drive: bazę cech SQLite i archiwum zdjęć w folderze lustra
+    oraz logo, czcionki i najlepsze zdjęcia potrzebne do raportów w folderze danych aplikacji.
+    args:
+        mirror_dir: str - Folder lustra (źródło plików dla AssetStore)
+        data_dir: str - Lokalna ścieżka do danych aplikacji
+        num_classes: int - Liczba zwierząt
+        images_per_class: int - Liczba zdjęć każdego zwierzęcia
+        rows_per_class: int - Liczba wierszy bazy cech dla każdego zwierzęcia
+        image_size: tuple - Rozmiar zdjęć (szerokość, wysokość)
+        seed: int - Ziarno generatora liczb losowych
+    return:
+        dict - Opis wygenerowanych danych
+    """
+    rng = random.Random(seed)
+    animals = ANIMALS[:num_classes]
+    colors = {animal: tuple(rng.randrange(256) for _ in range(3)) for animal in animals}
+    os.makedirs(mirror_dir, exist_ok=True)
+    os.makedirs(data_dir, exist_ok=True)
+
+    # Baza cech: każde zwierzę ma własny profil cech, wiersze to profil z szumem i brakami danych
+    conn = sqlite3.connect(os.path.join(mirror_dir, "animal_db.sqlite"))
+    columns = ", ".join(f"{feature} REAL" for feature in FEATURES)
+    conn.execute(f"CREATE TABLE cechy (id INTEGER PRIMARY KEY, zwierze TEXT, {columns})")
+    rows = []
+    for animal in animals:
+        profile = [rng.uniform(0, 100) for _ in FEATURES]
+        for _ in range(rows_per_class):
+            values = [None if rng.random() < 0.05 else min(100.0, max(0.0, rng.gauss(mean, 10))) for mean in profile]
+            rows.append((animal, *values))
+    conn.executemany(f"INSERT INTO cechy (zwierze, {', '.join(FEATURES)}) VALUES ({', '.join('?' * (len(FEATURES) + 1))})", rows)
+    conn.commit()
+    conn.close()
+
+    # Archiwa zdjęć w takim układzie jak na Google Drive
+    image_paths = []
+    with zipfile.ZipFile(os.path.join(mirror_dir, "drive_images.zip"), "w") as images_zip:
+        for animal in animals:
+            for i in range(images_per_class):
+                image_path = os.path.join(data_dir, "benchmark_images", animal, f"{animal}_{i}.jpg")
+                os.makedirs(os.path.dirname(image_path), exist_ok=True)
+                synthetic_image(rng, colors[animal], image_size).save(image_path, quality=90)
+                images_zip.write(image_path, f"baza_zdjecia/{animal}/{animal}_{i}.jpg")
+                image_paths.append(image_path)
+
+    best_images_dir = os.path.join(data_dir, "najlepsze_zdjecia")
+    os.makedirs(best_images_dir, exist_ok=True)
+    for animal in animals:
+        synthetic_image(rng, colors[animal], (400, 400)).save(os.path.join(best_images_dir, f"naj_{animal}.jpg"), quality=90)
+    synthetic_image(rng, (255, 253, 236), (300, 200)).save(os.path.join(data_dir, "logo.png"))
+
+    # Czcionki raportu PDF zastąpione czcionkami dołączonymi do reportlab
+    import reportlab
+    fonts_dir = os.path.join(data_dir, "fonts")
+    os.makedirs(fonts_dir, exist_ok=True)
+    reportlab_fonts = os.path.join(os.path.dirname(reportlab.__file__), "fonts")
+    shutil.copy(os.path.join(reportlab_fonts, "Vera.ttf"), os.path.join(fonts_dir, "CENSCBK.ttf"))
+    shutil.copy(os.path.join(reportlab_fonts, "VeraBd.ttf"), os.path.join(fonts_dir, "SCHLBKB.TTF"))
+
+    return {"animals": animals, "image_paths": image_paths, "rows": len(rows)}
+
+class Benchmark:
+    def __init__(self, logger: logging.Logger, repeat: int):
+        """
+        Pomiar czasu kolejnych etapów działania aplikacji.
+        args:
+            logger: logging.Logger - Wspólny logger
+            repeat: int - Domyślna liczba powtórzeń każdego etapu
+        """
+        self.logger = logger
+        self.repeat = repeat
+        self.stages = {}
+
+    def record(self, name: str, times: list):
+        """
+        Zapisuje zmierzone czasy etapu (w sekundach) jako statystyki w milisekundach.
+        """
+        times_ms = [value * 1000 for value in times]
+        self.stages[name] = {
+            "runs": len(times_ms),
+            "median_ms": statistics.median(times_ms),
+            "mean_ms": statistics.fmean(times_ms),
+            "min_ms": min(times_ms),
+            "max_ms": max(times_ms),
+        }
+        self.logger.info("%s: mediana %.2f ms (%d powtórzeń).", name, self.stages[name]["median_ms"], len(times_ms))
+
+    def measure(self, name: str, function, repeat: int = None, warmup: int = 1):
+        """
+        Mierzy czas wywołania funkcji; pierwsze wywołania (rozgrzewka) nie są liczone.
+        return:
+            Wynik ostatniego wywołania funkcji
+        """
+        result = None
+        for _ in range(warmup):
+            result = function()
+        times = []
+        for _ in range(repeat or self.repeat):
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+        self.record(name, times)
+        return result
+
+    def measure_once(self, name: str, function):
+        """
+        Mierzy czas pojedynczego wywołania (np. treningu modelu).
+        """
+        return self.measure(name, function, repeat=1, warmup=0)
+
+    def skip(self, name: str, reason: str):
+        self.stages[name] = {"skipped": reason}
+        self.logger.warning("Pominięto etap %s: %s", name, reason)
+
+def git_revision(directory: str) -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=directory, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(args, logger: logging.Logger) -> dict:
+    """
+    Generuje dane syntetyczne, trenuje na nich małe modele i mierzy czas poszczególnych etapów.
+    return:
+        dict - Wyniki (konfiguracja, środowisko i statystyki etapów)
+    """
+    workdir = args.workdir or tempfile.mkdtemp(prefix="blizniaki_benchmark_")
+    mirror_dir = os.path.join(workdir, "mirror")
+    data_dir = os.path.join(workdir, "data")
+    if os.path.exists(data_dir):
+        shutil.rmtree(data_dir)  # Trening zawsze od zera, tak aby wyniki były porównywalne
+    if os.path.exists(mirror_dir):
+        shutil.rmtree(mirror_dir)
+
+    start = time.perf_counter()
+    dataset = create_synthetic_data(mirror_dir, data_dir, args.classes, args.images_per_class, args.rows_per_class)
+    logger.info("Dane syntetyczne wygenerowano w %.1f s: %s", time.perf_counter() - start, workdir)
+    get_asset_store(data_dir, logger, source=mirror_dir)
+
+    benchmark = Benchmark(logger, args.repeat)
+    rng = random.Random(42)
+    sample_features = {feature: rng.randint(0, 100) for feature in FEATURES}
+    image_path = dataset["image_paths"][0]
+
+    # Przetwarzanie zdjęcia (wspólne dla wykrywania twarzy i klasyfikatora obrazów)
+    pipeline = ImagePipeline(logger)
+    decoded = benchmark.measure("image_preprocessing", lambda: pipeline.load(image_path))
+    try:
+        import cv2  # noqa: F401
+        benchmark.measure("detect_face", lambda: pipeline.count_faces(decoded))
+    except ImportError as e:
+        benchmark.skip("detect_face", str(e))
+
+    # Klasyfikator cech: trening na bazie z lustra, wczytanie z dysku i predykcja
+    features_predictions = []
+    try:
+        from AnimalFeaturesClassifier import AnimalFeaturesClassifier
+        benchmark.measure_once("features_training", lambda: AnimalFeaturesClassifier(drive_file_id=None, local_path=data_dir, logger=logger))
+        features_classifier = benchmark.measure("features_model_load", lambda: AnimalFeaturesClassifier(drive_file_id=None, local_path=data_dir, logger=logger),
+                                                repeat=args.load_repeat)
+        features_predictions = benchmark.measure("features_predict_top_10", lambda: features_classifier.predict_top_10(sample_features))
+
+        # Predykcja wielu wierszy: jedno wywołanie predict_batch i pętla predict_top_10 na tych samych danych
+        batch_rows = [{feature: rng.randint(0, 100) for feature in FEATURES} for _ in range(args.batch_rows)]
+        benchmark.measure("features_predict_batch", lambda: features_classifier.predict_batch(batch_rows), repeat=args.load_repeat)
+        benchmark.measure("features_predict_loop", lambda: [features_classifier.predict_top_10(row) for row in batch_rows],
+                          repeat=args.load_repeat, warmup=0)
+        logger.info("predict_batch jest %.1fx szybsze od pętli predict_top_10 (%d wierszy).",
+                    benchmark.stages["features_predict_loop"]["median_ms"] / benchmark.stages["features_predict_batch"]["median_ms"], args.batch_rows)
+    except ImportError as e:
+        features_classifier = None
+        for name in ("features_training", "features_model_load", "features_predict_top_10", "features_predict_batch", "features_predict_loop"):
+            benchmark.skip(name, str(e))
+
+    # Klasyfikator obrazów: trening małego modelu, wczytanie z dysku i predykcja
+    image_predictions = []
+    try:
+        from AnimalImageClassifier import AnimalImageClassifier
+        trained = benchmark.measure_once("image_training", lambda: AnimalImageClassifier(drive_folder_id=None, local_path=data_dir, logger=logger,
+                                                                                         batch_size=args.batch_size, epochs=args.epochs))
+        if trained.epoch_times:
+            benchmark.record("image_training_epoch", trained.epoch_times)
+        image_classifier = benchmark.measure("image_model_load", lambda: AnimalImageClassifier(drive_folder_id=None, local_path=data_dir, logger=logger),
+                                             repeat=args.load_repeat)
+        image_predictions = benchmark.measure("image_predict_top_10", lambda: image_classifier.predict_top_10(image_array=decoded.array))
+    except ImportError as e:
+        image_classifier = None
+        for name in ("image_training", "image_training_epoch", "image_model_load", "image_predict_top_10"):
+            benchmark.skip(name, str(e))
+
+    # Łączenie predykcji obu klasyfikatorów (bez pamięci podręcznej wyników)
+    if features_classifier is not None:
+        from AnimalPredictor import AnimalPredictor
+        predictor = AnimalPredictor(features_classifier, image_classifier, logger)
+        top_animals = benchmark.measure("combine_predictions", lambda: predictor.combine_top_5(features_predictions, image_predictions))
+    else:
+        benchmark.skip("combine_predictions", "brak klasyfikatora cech")
+        top_animals = [(animal, 1.0 / len(dataset["animals"])) for animal in dataset["animals"][:5]]
+
+    # Raporty PDF i HTML
+    report_engine = ReportEngine(data_dir, logger, {}, lambda animal: f"Opis zwierzęcia {animal}.")
+    report = {"date": "2000-01-01 00:00", "top_animals": top_animals, "description": f"Opis zwierzęcia {top_animals[0][0]}."}
+    reports_dir = os.path.join(workdir, "reports")
+    os.makedirs(reports_dir, exist_ok=True)
+    benchmark.measure("report_pdf", lambda: report_engine.render_pdf(report, os.path.join(reports_dir, "raport.pdf")))
+    benchmark.measure("report_html", lambda: report_engine.render_html(report, os.path.join(reports_dir, "raport.html")))
+    report_engine.shutdown()
+
+    if not args.workdir and not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "schema": 1,
+        "revision": git_revision(os.path.dirname(os.path.abspath(__file__))),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor(),
+                        "cpu_count": os.cpu_count(), "numpy": np.__version__},
+        "config": {"classes": args.classes, "images_per_class": args.images_per_class, "rows_per_class": args.rows_per_class,
+                   "repeat": args.repeat, "load_repeat": args.load_repeat, "batch_size": args.batch_size,
+                   "epochs": args.epochs, "batch_rows": args.batch_rows},
+        "stages": benchmark.stages,
+    }
+
+def compare_results(results: dict, baseline: dict, threshold: float, logger: logging.Logger) -> list:
+    """
+    Porównuje mediany czasów etapów z wcześniejszym wynikiem.
+    args:
+        results: dict - Bieżące wyniki
+        baseline: dict - Wcześniejsze wyniki (np. z poprzedniej wersji)
+        threshold: float - Dopuszczalny stosunek mediany bieżącej do wcześniejszej
+        logger: logging.Logger - Wspólny logger
+    return:
+        list - Nazwy etapów, których czas wzrósł ponad próg
+    """
+    regressions = []
+    for name, stage in results["stages"].items():
+        previous = baseline.get("stages", {}).get(name, {})
+        if "median_ms" not in stage or not previous.get("median_ms"):
+            continue
+        ratio = stage["median_ms"] / previous["median_ms"]
+        stage["baseline_median_ms"] = previous["median_ms"]
+        stage["ratio"] = ratio
+        if ratio > threshold:
+            regressions.append(name)
+            logger.warning("Regresja %s: %.2f ms -> %.2f ms (x%.2f).", name, previous["median_ms"], stage["median_ms"], ratio)
+        else:
+            logger.info("%s: %.2f ms -> %.2f ms (x%.2f).", name, previous["median_ms"], stage["median_ms"], ratio)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pomiar czasu etapów aplikacji na danych syntetycznych, bez dostępu do Google Drive.")
+    parser.add_argument("--output", "-o", default="-", help="Plik JSON z wynikami (domyślnie standardowe wyjście)")
+    parser.add_argument("--compare", help="Plik JSON z wcześniejszymi wynikami do porównania")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Dopuszczalny wzrost mediany czasu etapu przy porównaniu (x)")
+    parser.add_argument("--workdir", help="Folder roboczy na dane i modele (domyślnie folder tymczasowy)")
+    parser.add_argument("--keep", action="store_true", help="Nie usuwaj tymczasowego folderu roboczego")
+    parser.add_argument("--classes", type=int, default=3, help="Liczba zwierząt w danych syntetycznych")
+    parser.add_argument("--images-per-class", type=int, default=10, help="Liczba zdjęć każdego zwierzęcia")
+    parser.add_argument("--rows-per-class", type=int, default=40, help="Liczba wierszy bazy cech dla każdego zwierzęcia")
+    parser.add_argument("--repeat", type=int, default=20, help="Liczba powtórzeń szybkich etapów")
+    parser.add_argument("--load-repeat", type=int, default=3, help="Liczba powtórzeń wczytywania modeli")
+    parser.add_argument("--batch-size", type=int, default=10, help="Rozmiar paczki podczas treningu modelu obrazów")
+    parser.add_argument("--batch-rows", type=int, default=2000, help="Liczba wierszy przy pomiarze predykcji wsadowej klasyfikatora cech")
+    parser.add_argument("--epochs", type=int, default=3, help="Liczba epok treningu modelu obrazów")
+    args = parser.parse_args(argv)
+
+    if not 2 <= args.classes <= len(ANIMALS):
+        parser.error(f"Liczba zwierząt musi być z zakresu 2-{len(ANIMALS)}.")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", stream=sys.stderr)
+    logger = logging.getLogger("AnimalClassifierLog")
+
+    results = run_benchmark(args, logger)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        results["baseline_revision"] = baseline.get("revision")
+        if compare_results(results, baseline, args.threshold, logger):
+            exit_code = 1
+
+    results_json = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(results_json)
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(results_json)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+
+from AnimalImageClassifier import IMAGE_EXTENSIONS
+from AssetStore import get_asset_store
+from ModelRegistry import get_model_registry
+
+def find_images(directory: str, recursive: bool = False) -> list:
+    """
+    Wyszukuje zdjęcia w podanym folderze.
+    args:
+        directory: str - Folder ze zdjęciami
+        recursive: bool - Czy przeszukiwać również podfoldery
+    return:
+        list - Posortowana lista ścieżek do zdjęć
+    """
+    image_paths = []
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                image_paths.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(image_paths)
+
+def write_results(results, output, output_format: str):
+    """
+    Zapisuje wyniki na bieżąco do pliku CSV lub JSONL.
+    args:
+        results: generator - Krotki (ścieżka, lista [(nazwa_zwierzęcia, prawdopodobieństwo)])
+        output: plik tekstowy - Plik wyjściowy
+        output_format: str - "csv" lub "jsonl"
+    """
+    if output_format == "csv":
+        writer = csv.writer(output)
+        writer.writerow(["path", "rank", "animal", "probability"])
+        for image_path, top_k in results:
+            if not top_k:
+                writer.writerow([image_path, "", "", ""])
+            for rank, (animal, probability) in enumerate(top_k, start=1):
+                writer.writerow([image_path, rank, animal, f"{float(probability):.6f}"])
+            output.flush()
+    else:
+        for image_path, top_k in results:
+            record = {
+                "path": image_path,
+                "predictions": [{"animal": animal, "probability": float(probability)} for animal, probability in top_k],
+            }
+            if not top_k:
+                record["error"] = "Nie udało się wczytać zdjęcia."
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Klasyfikacja wszystkich zdjęć z folderu bez uruchamiania GUI.")
+    parser.add_argument("directory", help="Folder ze zdjęciami")
+    parser.add_argument("--path", default=os.getcwd(), help="Lokalna ścieżka do danych i modeli")
+    parser.add_argument("--output", "-o", default="-", help="Plik wynikowy (domyślnie standardowe wyjście)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Format wyników (domyślnie wg rozszerzenia pliku)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Liczba zdjęć w jednym przebiegu modelu")
+    parser.add_argument("--top-k", type=int, default=10, help="Liczba zwierząt zwracanych dla każdego zdjęcia")
+    parser.add_argument("--workers", type=int, default=None, help="Liczba wątków dekodujących zdjęcia")
+    parser.add_argument("--recursive", "-r", action="store_true", help="Przeszukuj również podfoldery")
+    parser.add_argument("--storage", default="drive", help="Źródło danych: drive, adres lustra HTTP lub folder z lustrem")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", stream=sys.stderr)
+    logger = logging.getLogger("AnimalClassifierLog")
+    get_asset_store(args.path, logger, source=args.storage)
+
+    output_format = args.format or ("jsonl" if args.output.endswith(".jsonl") else "csv")
+
+    image_paths = find_images(args.directory, recursive=args.recursive)
+    if not image_paths:
+        logger.error("W folderze %s nie znaleziono zdjęć.", args.directory)
+        return 1
+    logger.info("Znaleziono %d zdjęć.", len(image_paths))
+
+    image_classifier = get_model_registry(args.path, logger).get_image_classifier()
+    results = image_classifier.iter_predict_batch(image_paths, batch_size=args.batch_size, top_k=args.top_k, num_workers=args.workers)
+
+    if args.output == "-":
+        write_results(results, sys.stdout, output_format)
+    else:
+        with open(args.output, "w", encoding="utf-8", newline="") as output:
+            write_results(results, output, output_format)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
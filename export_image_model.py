@@ -0,0 +1,35 @@
+import argparse
+import json
+import logging
+import sys
+
+from AnimalImageClassifier import AnimalImageClassifier
+from ModelRegistry import IMAGES_DRIVE_FOLDER_ID
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Eksport modelu obrazów do skwantyzowanego TFLite i porównanie z modelem Keras.")
+    parser.add_argument("--path", required=True, help="Lokalna ścieżka do danych i modeli")
+    parser.add_argument("--quantization", choices=["float16", "int8", "dynamic"], default="float16", help="Rodzaj kwantyzacji")
+    parser.add_argument("--compare-images", type=int, default=50, help="Liczba zdjęć z baza_zdjecia użytych do porównania (0 - bez porównania)")
+    parser.add_argument("--report", help="Plik JSON z raportem porównania (domyślnie standardowe wyjście)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", stream=sys.stderr)
+    logger = logging.getLogger("AnimalClassifierLog")
+
+    image_classifier = AnimalImageClassifier(drive_folder_id=IMAGES_DRIVE_FOLDER_ID, local_path=args.path, logger=logger)
+    image_classifier.export_tflite(args.quantization)
+
+    if args.compare_images > 0:
+        image_paths = image_classifier.sample_training_images(args.compare_images)
+        report = image_classifier.compare_engines(image_paths, quantization=args.quantization)
+        report_json = json.dumps(report, indent=2)
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as report_file:
+                report_file.write(report_json)
+        else:
+            print(report_json)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,76 @@
-from GUI import AnimalClassifierApp 
+import time
+startup_start = time.perf_counter()
+
+import argparse
 import logging
 import os
+import sys
 import tkinter as tk
-
-# Konfiguracja loggera
-path = r'C:\Users\marta\OneDrive - biurox365ml\Pulpit\studia\sem5\inzynieria_oprogramowania\coding'  # Ścieżka do zapisu danych
-log_file = os.path.join(path, "animal_classifier.log")
-
-for handler in logging.root.handlers[:]:
-    logging.root.removeHandler(handler)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(log_file, mode="w", encoding="UTF-8"),
-    ]
-)
+from LoggingConfig import configure_logging, stop_logging
+
+parser = argparse.ArgumentParser(description="Bliźniaki - aplikacja wskazująca zwierzę najbardziej podobne do użytkownika.")
+parser.add_argument("--path", default=os.environ.get("BLIZNIAKI_PATH", os.path.join(os.path.expanduser("~"), "blizniaki")),
+                    help="Ścieżka do zapisu danych (domyślnie zmienna BLIZNIAKI_PATH lub ~/blizniaki)")
+parser.add_argument("--log-file", default=os.environ.get("BLIZNIAKI_LOG_FILE"),
+                    help="Plik logu (domyślnie zmienna BLIZNIAKI_LOG_FILE lub animal_classifier.log w folderze danych)")
+parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], help="Poziom logowania")
+parser.add_argument("--storage", default="drive", help="Źródło danych: drive, adres lustra HTTP lub folder z lustrem (np. dla kiosku bez internetu)")
+parser.add_argument("--image-training-mode", default="full", choices=["full", "head"],
+                    help="Trening modelu obrazów, gdy nie ma zapisanego modelu: full - cała sieć, head - głowica na zamrożonym MobileNetV2")
+args = parser.parse_args()
+
+path = args.path  # Ścieżka do zapisu danych
+log_file = args.log_file or os.path.join(path, "animal_classifier.log")
+storage_source = args.storage
+metrics_file = os.path.join(path, "metrics.prom")  # Metryki dla lokalnego scrapera (.prom - Prometheus, .json - JSON, None - wyłączone)
+
+# Konfiguracja loggera: zapis do pliku (z rotacją) w osobnym wątku, poza wątkiem interfejsu i predykcji
+log_listener = configure_logging(log_file, level=getattr(logging, args.log_level))
 logger = logging.getLogger("AnimalClassifierLog")
+startup_times = {"logger": time.perf_counter()}
+
+# Ciężkie biblioteki (TensorFlow, OpenCV, reportlab) są importowane dopiero przy pierwszym użyciu
+from GUI import AnimalClassifierApp
+from AssetStore import get_asset_store
+from Metrics import get_metrics
+from ModelRegistry import get_model_registry
+get_asset_store(path, logger, source=storage_source)
+get_model_registry(path, logger, image_training_mode=args.image_training_mode)  # GUI korzysta z tego samego rejestru
+if metrics_file:
+    get_metrics().enable(logger, export_path=metrics_file)
+startup_times["import"] = time.perf_counter()
 
 # Tworzenie głównego okna Tkinter
 root = tk.Tk()
 root.title("Klasyfikator Zwierząt")
 root.attributes("-fullscreen", True)
+startup_times["window"] = time.perf_counter()
 
 # Tworzenie aplikacji
 app = AnimalClassifierApp(root, logger, path)
+startup_times["start_page"] = time.perf_counter()
+heavy_modules = [module for module in ("tensorflow", "cv2", "reportlab", "sklearn") if module in sys.modules]
+
+def log_startup_times():
+    """
+    Zapisuje w logu czasy kolejnych etapów uruchamiania aplikacji (do pierwszego wyświetlenia strony startowej).
+    """
+    root.update_idletasks()
+    shown = time.perf_counter()
+    previous = startup_start
+    stages = []
+    for stage, timestamp in list(startup_times.items()) + [("display", shown)]:
+        stages.append(f"{stage} {timestamp - previous:.3f} s")
+        previous = timestamp
+    logger.info("Uruchamianie aplikacji: %s (razem %.3f s). Ciężkie biblioteki wczytane przed stroną startową: %s",
+                ", ".join(stages), shown - startup_start, ", ".join(heavy_modules) or "brak")
+
+root.after_idle(log_startup_times)
 
 # Uruchomienie aplikacji GUI
 root.mainloop()
+get_metrics().disable()  # Ostatni zapis metryk po zamknięciu aplikacji
+stop_logging(log_listener)
 
 # from AnimalFeaturesClassifier import AnimalFeaturesClassifier
 # from AnimalImageClassifier import AnimalImageClassifier
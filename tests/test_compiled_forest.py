@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from CompiledForest import CompiledForest
+
+@pytest.fixture(scope="module")
+def forest_and_data():
+    X, y = make_classification(n_samples=300, n_features=8, n_informative=5, n_classes=4, random_state=0)
+    forest = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0).fit(X, y)
+    X_test, _ = make_classification(n_samples=100, n_features=8, n_informative=5, n_classes=4, random_state=1)
+    return forest, X_test
+
+def test_predict_proba_matches_sklearn(forest_and_data):
+    forest, X = forest_and_data
+    compiled = CompiledForest.from_sklearn(forest)
+    np.testing.assert_array_equal(compiled.predict_proba(X), forest.predict_proba(X))
+
+def test_predict_proba_row_matches_sklearn(forest_and_data):
+    forest, X = forest_and_data
+    compiled = CompiledForest.from_sklearn(forest)
+    expected = forest.predict_proba(X)
+    for i, row in enumerate(X):
+        np.testing.assert_array_equal(compiled.predict_proba_row(row), expected[i])
+
+def test_arrays_round_trip(forest_and_data):
+    forest, X = forest_and_data
+    compiled = CompiledForest.from_sklearn(forest)
+    restored = CompiledForest.from_arrays(compiled.to_arrays(), compiled.classes_, compiled.max_depth, compiled.n_features)
+    np.testing.assert_array_equal(restored.predict_proba(X), forest.predict_proba(X))
+    assert restored.verify(forest, X) == 0.0
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import logging
+from AnimalPredictor import AnimalPredictor
+from InferenceServer import InferenceServer
+
+class StubFeaturesClassifier:
+    def predict_top_10(self, input_features):
+        if not isinstance(input_features, dict):
+            raise ValueError("Cechy muszą być słownikiem.")
+        return [("kot", 0.6), ("pies", 0.4)]
+
+class StubImageClassifier:
+    def __init__(self):
+        self.batches = []
+
+    def predict_batch(self, sources, batch_size=None):
+        self.batches.append(list(sources))
+        return [None if source == "uszkodzone.jpg" else [("pies", 0.9), ("kot", 0.1)] for source in sources]
+
+def make_server(**options):
+    logger = logging.getLogger("test_inference_server")
+    image_classifier = StubImageClassifier()
+    predictor = AnimalPredictor(StubFeaturesClassifier(), image_classifier, logger)
+    return InferenceServer(predictor, logger, port=0, **options), image_classifier
+
+async def request(server, method, path, payload=None):
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), json.loads(body)
+
+def run(server, scenario):
+    async def main():
+        await server.start()
+        try:
+            return await scenario()
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+def test_features_endpoint():
+    server, _ = make_server()
+    status, response = run(server, lambda: request(server, "POST", "/predict/features", {"features": {"odwaga": 50}}))
+    assert status == 200
+    assert response["predictions"] == [["kot", 0.6], ["pies", 0.4]]
+
+def test_features_endpoint_rejects_invalid_payload():
+    server, _ = make_server()
+    status, response = run(server, lambda: request(server, "POST", "/predict/features", {"features": [1, 2]}))
+    assert status == 400
+    assert "error" in response
+
+def test_concurrent_images_are_micro_batched():
+    server, image_classifier = make_server(max_batch_size=8, max_wait_ms=200)
+
+    async def scenario():
+        return await asyncio.gather(*(request(server, "POST", "/predict/image", {"image_path": path})
+                                      for path in ["a.jpg", "b.jpg", "uszkodzone.jpg", "c.jpg"]))
+
+    responses = run(server, scenario)
+    assert len(image_classifier.batches) == 1
+    assert sorted(image_classifier.batches[0]) == ["a.jpg", "b.jpg", "c.jpg", "uszkodzone.jpg"]
+    assert [status for status, _ in responses] == [200, 200, 400, 200]
+    assert responses[0][1]["predictions"][0] == ["pies", 0.9]
+
+def test_metrics_endpoint():
+    server, _ = make_server(max_wait_ms=1)
+
+    async def scenario():
+        await request(server, "POST", "/predict/image", {"image_path": "a.jpg"})
+        await request(server, "POST", "/predict/features", {"features": {"odwaga": 50}})
+        return await request(server, "GET", "/metrics")
+
+    status, metrics = run(server, scenario)
+    assert status == 200
+    assert metrics["queue_depth"] == 0
+    assert metrics["batches"] == {"count": 1, "mean_size": 1.0, "max_size": 1}
+    assert metrics["latency"]["/predict/image"]["count"] == 1
+    assert metrics["latency"]["/predict/features"]["count"] == 1
+    assert metrics["latency"]["/predict"] == {"count": 0}
+
+def test_unknown_path_and_wrong_method():
+    server, _ = make_server()
+
+    async def scenario():
+        return await request(server, "GET", "/nieznana"), await request(server, "GET", "/predict/image")
+
+    (missing_status, _), (method_status, _) = run(server, scenario)
+    assert missing_status == 404
+    assert method_status == 405